@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+pytest配置：网页服务模块之间按 web/ 目录平级导入（如 from result_cache import ...），测试时加入导入路径
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web'))
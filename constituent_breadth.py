@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+成分股宽度模块 - 统计沪深300、中证500等指数成分股中站上自身均线的比例
+成分股名单与最新价通过东方财富板块列表一次批量获取；日线收盘价存入共享的
+float32面板（交易日 x 股票，多个指数重叠的成分股只存一份），缺失的历史并发回补；
+均线对整个面板用累计和一次向量化计算；收盘前运行时当日最新价只参与本次计算，不写入面板
+"""
+import os
+import io
+import logging
+import numpy as np
+import pandas as pd
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dtime
+from file_utils import write_bytes_atomic
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('constituent_breadth')
+
+EASTMONEY_CLIST_URL = "http://push2.eastmoney.com/api/qt/clist/get"
+EASTMONEY_KLINE_URL = "http://push2his.eastmoney.com/api/qt/stock/kline/get"
+# A股收盘时间（北京时间），之前的当日价格不是收盘价
+MARKET_CLOSE = dtime(15, 0)
+
+
+class ConstituentPanel:
+    """成分股日线收盘价面板：secids(股票) / dates(交易日) / closes(float32, 交易日 x 股票)"""
+
+    def __init__(self, path='data/constituents/close_panel.npz'):
+        self.path = path
+        self.secids = np.empty(0, dtype='U12')
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.closes = np.empty((0, 0), dtype=np.float32)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                self.secids = data['secids']
+                self.dates = data['dates'].astype('datetime64[D]')
+                self.closes = data['closes']
+        except Exception as e:
+            logger.warning(f"读取成分股面板失败: {str(e)}")
+
+    def save(self):
+        """原子写入面板文件"""
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, secids=self.secids, dates=self.dates.astype('int64'), closes=self.closes)
+        write_bytes_atomic(self.path, buffer.getvalue())
+
+    def upsert(self, secids, dates, closes):
+        """
+        批量写入收盘价（同一股票同一交易日以新值为准），日期与股票按需扩展
+        :param secids: 股票secid数组
+        :param dates: 交易日数组
+        :param closes: 收盘价数组（三者等长）
+        """
+        secids = np.asarray(secids, dtype='U12')
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        if len(secids) == 0:
+            return
+        all_secids = np.union1d(self.secids, secids)
+        all_dates = np.union1d(self.dates, dates)
+        if len(all_secids) != len(self.secids) or len(all_dates) != len(self.dates):
+            panel = np.full((len(all_dates), len(all_secids)), np.nan, dtype=np.float32)
+            if self.closes.size:
+                rows = np.searchsorted(all_dates, self.dates)
+                cols = np.searchsorted(all_secids, self.secids)
+                panel[np.ix_(rows, cols)] = self.closes
+            self.secids, self.dates, self.closes = all_secids, all_dates, panel
+        self.closes[np.searchsorted(self.dates, dates), np.searchsorted(self.secids, secids)] = closes
+
+    def columns(self, secids):
+        """股票在面板中的列下标，不存在的为-1"""
+        secids = np.asarray(secids, dtype='U12')
+        if len(self.secids) == 0:
+            return np.full(len(secids), -1)
+        cols = np.minimum(np.searchsorted(self.secids, secids), len(self.secids) - 1)
+        return np.where(self.secids[cols] == secids, cols, -1)
+
+    def trim(self, keep_days):
+        """只保留最近keep_days个交易日"""
+        if len(self.dates) > keep_days:
+            self.dates = self.dates[-keep_days:]
+            self.closes = self.closes[-keep_days:]
+
+
+def above_ma(closes, ma_period):
+    """
+    面板最新交易日各股票是否站上自身均线（停牌日沿用前收盘价）
+    :param closes: 收盘价面板（交易日 x 股票）
+    :return: (above布尔数组, valid布尔数组) valid为均线窗口内有完整数据的股票
+    """
+    filled = pd.DataFrame(closes).ffill().to_numpy(dtype=float)
+    if len(filled) < ma_period:
+        count = filled.shape[1]
+        return np.zeros(count, dtype=bool), np.zeros(count, dtype=bool)
+    # 累计和求滑动均线，NaN按0累计并单独计数
+    finite = np.isfinite(filled)
+    csum = np.cumsum(np.where(finite, filled, 0.0), axis=0)
+    ccount = np.cumsum(finite, axis=0)
+    window_sum = csum[-1] - (csum[-ma_period - 1] if len(filled) > ma_period else 0)
+    window_count = ccount[-1] - (ccount[-ma_period - 1] if len(filled) > ma_period else 0)
+    valid = window_count == ma_period
+    ma = np.where(valid, window_sum / ma_period, np.nan)
+    return valid & (filled[-1] >= ma), valid
+
+
+class ConstituentBreadth:
+    """指数成分股宽度"""
+
+    def __init__(self, boards, ma_period=20, max_workers=8, panel_path='data/constituents/close_panel.npz'):
+        """
+        :param boards: 指数代码 -> 东方财富板块筛选串，如 {'399300': 'b:BK0500'}
+        :param ma_period: 成分股均线周期
+        :param max_workers: 回补历史的并发数
+        :param panel_path: 收盘价面板文件
+        """
+        self.boards = boards
+        self.ma_period = ma_period
+        self.max_workers = max_workers
+        self.panel = ConstituentPanel(panel_path)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+
+    def fetch_members(self, fs):
+        """
+        一次请求获取板块全部成分股及最新价
+        :return: DataFrame [secid, price, trade_date]
+        """
+        params = {
+            'fs': fs,
+            'fields': 'f2,f12,f13,f124',
+            'pn': 1, 'pz': 5000, 'po': 1, 'np': 1, 'fltt': 2, 'invt': 2
+        }
+        response = self.session.get(EASTMONEY_CLIST_URL, params=params, timeout=10)
+        rows = (response.json().get('data') or {}).get('diff') or []
+        members = pd.DataFrame(rows, columns=['f2', 'f12', 'f13', 'f124'])
+        members['secid'] = members['f13'].astype(str) + '.' + members['f12'].astype(str)
+        members['price'] = pd.to_numeric(members['f2'], errors='coerce')
+        # f124为最新行情时间戳（秒），停牌或无时间时视为当日
+        stamp = pd.to_numeric(members['f124'], errors='coerce')
+        members['trade_date'] = (pd.to_datetime(stamp, unit='s', utc=True).dt.tz_convert('Asia/Shanghai')
+                                 .dt.tz_localize(None).dt.normalize().fillna(pd.Timestamp(datetime.now().date())))
+        return members[['secid', 'price', 'trade_date']]
+
+    def _fetch_closes(self, secid):
+        """获取单只股票最近若干根日线收盘价"""
+        params = {
+            'secid': secid,
+            'fields1': 'f1',
+            'fields2': 'f51,f53',
+            'klt': '101',
+            'fqt': '1',
+            'end': '20500101',
+            'lmt': str(self.ma_period + 5)
+        }
+        try:
+            response = self.session.get(EASTMONEY_KLINE_URL, params=params, timeout=10)
+            klines = (response.json().get('data') or {}).get('klines') or []
+            return secid, [k.split(',') for k in klines]
+        except Exception as e:
+            logger.warning(f"获取成分股{secid}日线失败: {str(e)}")
+            return secid, []
+
+    def update(self, calendar):
+        """
+        刷新成分股名单与收盘价面板
+        :param calendar: A股交易日序列（取自指数日线历史），用于判断各股票均线窗口是否完整
+        :return: 指数代码 -> 成分股secid数组
+        """
+        members_by_index, quotes = {}, []
+        for index_code, fs in self.boards.items():
+            try:
+                members = self.fetch_members(fs)
+            except Exception as e:
+                logger.error(f"获取{index_code}成分股失败: {str(e)}")
+                continue
+            members_by_index[index_code] = members['secid'].to_numpy()
+            quotes.append(members.dropna(subset=['price']))
+        if not quotes:
+            return members_by_index
+
+        # 收盘后最新价即为当日收盘价，批量写入面板；收盘前的当日价格只在保存面板后临时加入本次计算
+        latest = pd.concat(quotes).drop_duplicates('secid')
+        now = datetime.now()
+        today = pd.Timestamp(now.date())
+        intraday = now.time() < MARKET_CLOSE
+        live = (latest['trade_date'] >= today).to_numpy() if intraday else np.zeros(len(latest), dtype=bool)
+        closed = latest[~live]
+        self.panel.upsert(closed['secid'], closed['trade_date'], closed['price'])
+
+        # 逐交易日逐股票检查均线窗口，有缺失的股票并发回补（新进成分股、漏跑的交易日）
+        last_day = today - pd.Timedelta(days=1) if live.any() else latest['trade_date'].max()
+        needed = pd.DatetimeIndex(calendar).normalize()
+        needed = needed[needed <= last_day][-self.ma_period:].to_numpy(dtype='datetime64[D]')
+        secids = latest['secid'].to_numpy()
+        missing = secids[~self._window_complete(secids, needed)]
+
+        if len(missing):
+            logger.info(f"回补{len(missing)}只成分股日线，并发{self.max_workers}")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                fetched = list(executor.map(self._fetch_closes, missing))
+            records = [(secid, day, close) for secid, bars in fetched for day, close in bars]
+            if records:
+                secids, days, closes = zip(*records)
+                days = pd.to_datetime(list(days))
+                closes = pd.to_numeric(list(closes), errors='coerce')
+                # 收盘前日线接口的当日K线同样不是收盘价
+                keep = days < today if intraday else np.ones(len(days), dtype=bool)
+                self.panel.upsert(np.asarray(secids)[keep], days[keep], np.asarray(closes)[keep])
+
+        self.panel.trim(self.ma_period * 3)
+        try:
+            self.panel.save()
+        except Exception as e:
+            logger.warning(f"保存成分股面板失败: {str(e)}")
+        if live.any():
+            current = latest[live]
+            self.panel.upsert(current['secid'], current['trade_date'], current['price'])
+        return members_by_index
+
+    def _window_complete(self, secids, needed):
+        """
+        各股票在均线窗口的每个交易日是否都有收盘价
+        :param secids: 股票secid数组
+        :param needed: 均线窗口内的交易日数组
+        :return: 布尔数组；面板整体缺少的交易日计为所有股票缺失，其余按股票逐日判断
+        """
+        cols = self.panel.columns(secids)
+        have = np.zeros((len(needed), len(secids)), dtype=bool)
+        if len(self.panel.dates) and len(needed):
+            rows = np.searchsorted(self.panel.dates, needed)
+            rows_clipped = np.minimum(rows, len(self.panel.dates) - 1)
+            present = (rows < len(self.panel.dates)) & (self.panel.dates[rows_clipped] == needed)
+            known = cols >= 0
+            have[np.ix_(present, known)] = np.isfinite(self.panel.closes[np.ix_(rows_clipped[present], cols[known])])
+        return have.all(axis=0)
+
+    def compute(self, members_by_index):
+        """
+        计算各指数成分股站上均线比例
+        :return: 指数代码 -> {'constituent_breadth': 百分比, 'constituent_count': 有效成分股数}
+        """
+        above, valid = above_ma(self.panel.closes, self.ma_period)
+        breadth = {}
+        for index_code, secids in members_by_index.items():
+            cols = self.panel.columns(secids)
+            cols = cols[cols >= 0]
+            cols = cols[valid[cols]] if len(cols) else cols
+            if not len(cols):
+                continue
+            breadth[index_code] = {
+                'constituent_breadth': round(float(above[cols].mean() * 100), 2),
+                'constituent_count': int(len(cols))
+            }
+        return breadth
+
+    def attach(self, results, calendar):
+        """刷新数据并把成分股宽度写入对应的结果行"""
+        breadth = self.compute(self.update(calendar))
+        for result in results:
+            result.update(breadth.get(result['index_code'], {}))
+        return breadth
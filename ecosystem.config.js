@@ -3,7 +3,7 @@ module.exports = {
     name: "fishbowl_trend",
     cwd: "./web",
     script: "../venv/bin/gunicorn",
-    args: "server:app -b 127.0.0.1:5000 -w 3",
+    args: "server:app -b 127.0.0.1:5000 -w 3 -k gthread --threads 16",
     interpreter: "/root/fishbowl_trend/venv/bin/python",
     env: {
       "PYTHONPATH": ".",
@@ -17,5 +17,23 @@ module.exports = {
     error_file: "../logs/err.log",
     out_file: "../logs/out.log",
     log_date_format: "YYYY-MM-DD HH:mm:ss"
+  }, {
+    name: "fishbowl_trend_daemon",
+    cwd: "./",
+    script: "main_trend.py",
+    args: "--task daemon",
+    interpreter: "/root/fishbowl_trend/venv/bin/python",
+    env: {
+      "PYTHONIOENCODING": "utf-8",
+      "TZ": "Asia/Shanghai"
+    },
+    exec_mode: "fork",
+    instances: 1,
+    autorestart: true,
+    watch: false,
+    max_memory_restart: "500M",
+    error_file: "./logs/daemon_err.log",
+    out_file: "./logs/daemon_out.log",
+    log_date_format: "YYYY-MM-DD HH:mm:ss"
   }]
 }
\ No newline at end of file
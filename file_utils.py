@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+文件工具模块 - 原子写入等公共文件操作
+"""
+import os
+import json
+import tempfile
+
+
+def write_bytes_atomic(path, data):
+    """
+    原子写入二进制文件：先写同目录临时文件，再用os.replace替换
+    读取方任何时候看到的都是完整的旧文件或新文件
+    :param path: 目标文件路径
+    :param data: 字节内容
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix=os.path.basename(path), dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_text_atomic(path, text, encoding='utf-8'):
+    """
+    原子写入文本文件
+    :param path: 目标文件路径
+    :param text: 文本内容
+    :param encoding: 文件编码
+    """
+    write_bytes_atomic(path, text.encode(encoding))
+
+
+def write_json_atomic(path, data, indent=None):
+    """
+    原子写入JSON文件
+    :param path: 目标文件路径
+    :param data: 可JSON序列化的对象
+    :param indent: 缩进，默认紧凑输出
+    """
+    write_text_atomic(path, json.dumps(data, ensure_ascii=False, indent=indent))
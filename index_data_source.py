@@ -10,6 +10,9 @@ import requests
 import time
 from datetime import datetime, timedelta
 from market_data_source import MarketDataSource
+from file_utils import write_text_atomic
+from minute_bar_store import MinuteBarStore, make_bars
+from quote_cache import QuoteMemoryCache
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,14 +21,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger('index_data_source')
 
+# 雅虎财经代码映射（港股指数、贵金属）
+YAHOO_SYMBOLS = {
+    'AUUSDO': 'GC=F',       # 黄金期货
+    'HSI00001': '^HSI',     # 恒生指数
+    'HSCEI00': '^HSCE',     # 国企指数
+    'HST00011': '3032.HK'   # 恒生科技ETF (更可靠的数据源)
+}
+# 支持的分钟K线周期（东方财富klt -> 雅虎interval）
+MINUTE_KLTS = {1: '1m', 5: '5m', 15: '15m', 30: '30m', 60: '60m'}
+
 class IndexDataSource:
     """指数数据源"""
     
-    def __init__(self):
+    def __init__(self, memory_cache_bytes=None):
+        """
+        :param memory_cache_bytes: 行情内存缓存字节上限；常驻进程中开启，None为不使用内存缓存
+        """
         self.cache_path = 'data/index_quote'
         os.makedirs(self.cache_path, exist_ok=True)
+        # 按指数累积的日线历史库（跨日合并，供状态推导等离线计算使用）
+        self.history_path = os.path.join(self.cache_path, 'history')
+        os.makedirs(self.history_path, exist_ok=True)
         self.cache_ttl = 3600  # 缓存1小时
         self.market_data = MarketDataSource()
+        # 分钟K线按日分块存储；盘中同一周期的重复请求在minute_ttl内直接读本地
+        self.minute_store = MinuteBarStore(os.path.join(self.cache_path, 'minute'))
+        self.minute_ttl = 60
+        self._minute_fetched = {}
+        # 磁盘缓存之前的内存LRU缓存，避免常驻进程每次重新读取解析CSV
+        self.memory_cache = QuoteMemoryCache(memory_cache_bytes) if memory_cache_bytes else None
     
     def get_index_quote(self, index_code, start_date, end_date, force_refresh=False):
         """
@@ -38,6 +63,12 @@ class IndexDataSource:
         """
         # 检查缓存
         cache_file = os.path.join(self.cache_path, f"{index_code}_{end_date.replace('-', '')}.csv")
+        memory_key = (index_code, start_date, end_date)
+        if not force_refresh and self.memory_cache is not None:
+            df = self.memory_cache.get(memory_key, cache_file, max_age=self.cache_ttl)
+            if df is not None:
+                df.attrs['provider'] = 'memory'
+                return df
         if not force_refresh and os.path.exists(cache_file):
             # 检查缓存时间
             cache_time = os.path.getmtime(cache_file)
@@ -45,29 +76,240 @@ class IndexDataSource:
                 try:
                     df = pd.read_csv(cache_file, parse_dates=['trade_date'])
                     logger.info(f"从缓存加载{index_code}数据，共{len(df)}条")
+                    if self.memory_cache is not None:
+                        self.memory_cache.put(memory_key, cache_file, df)
+                    df.attrs['provider'] = 'cache'
                     return df
                 except Exception as e:
                     logger.warning(f"缓存读取失败: {str(e)}")
         
-        # 从数据源获取（优先级：东方财富 -> 新浪 -> 网易）
-        df = self._fetch_from_eastmoney(index_code, start_date, end_date)
-        if df is None or df.empty:
-            logger.warning(f"东方财富获取{index_code}失败，尝试新浪财经")
-            df = self._fetch_from_sina(index_code, start_date, end_date)
-        if df is None or df.empty:
-            logger.warning(f"新浪财经获取{index_code}失败，尝试网易财经")
-            df = self._fetch_from_netease(index_code, start_date, end_date)
+        df = self._fetch_quote(index_code, start_date, end_date)
         
         # 保存缓存
         if df is not None and not df.empty:
+            if self.memory_cache is not None:
+                self.memory_cache.invalidate(index_code)
             try:
                 df.to_csv(cache_file, index=False)
                 logger.info(f"{index_code}数据已保存至缓存，共{len(df)}条")
+                if self.memory_cache is not None:
+                    self.memory_cache.put(memory_key, cache_file, df)
             except Exception as e:
                 logger.error(f"保存缓存失败: {str(e)}")
+            # 合成数据不进入历史库，避免覆盖真实K线
+            if not df.attrs.get('synthetic'):
+                self._update_history(index_code, df)
         
         return df if df is not None else pd.DataFrame()
     
+    def _fetch_quote(self, index_code, start_date, end_date):
+        """从数据源获取（优先级：东方财富 -> 新浪 -> 网易），df.attrs['provider']记录实际数据源"""
+        df = self._fetch_from_eastmoney(index_code, start_date, end_date)
+        provider = 'eastmoney'
+        if df is None or df.empty:
+            logger.warning(f"东方财富获取{index_code}失败，尝试新浪财经")
+            df = self._fetch_from_sina(index_code, start_date, end_date)
+            provider = 'sina'
+        if df is None or df.empty:
+            logger.warning(f"新浪财经获取{index_code}失败，尝试网易财经")
+            df = self._fetch_from_netease(index_code, start_date, end_date)
+            provider = 'netease'
+        if df is not None and 'provider' not in df.attrs:
+            df.attrs['provider'] = provider
+        return df
+    
+    def ensure_history(self, index_code, start_date):
+        """
+        确保历史库覆盖到start_date：不足时一次性回补日线（每个起始日期只尝试一次）
+        :param index_code: 指数代码
+        :param start_date: 需要覆盖的最早日期 (YYYY-MM-DD)
+        :return: DataFrame，历史库全部日线
+        """
+        history = self.load_history(index_code)
+        if not history.empty and history['trade_date'].min() <= pd.to_datetime(start_date) + timedelta(days=7):
+            return history
+        
+        marker_file = os.path.join(self.history_path, f"{index_code}.backfill")
+        if os.path.exists(marker_file):
+            with open(marker_file, 'r', encoding='utf-8') as f:
+                if f.read().strip() <= start_date:
+                    return history
+        
+        logger.info(f"回补{index_code}历史日线，起始{start_date}")
+        df = self._fetch_quote(index_code, start_date, datetime.now().strftime('%Y-%m-%d'))
+        with open(marker_file, 'w', encoding='utf-8') as f:
+            f.write(start_date)
+        if df is not None and not df.empty and not df.attrs.get('synthetic'):
+            self._update_history(index_code, df)
+            history = self.load_history(index_code)
+        return history
+    
+    def _history_file(self, index_code):
+        """历史库文件路径"""
+        return os.path.join(self.history_path, f"{index_code}.csv")
+    
+    def load_history(self, index_code):
+        """
+        读取本地累积的日线历史
+        :param index_code: 指数代码
+        :return: DataFrame，按trade_date升序；无数据时为空DataFrame
+        """
+        history_file = self._history_file(index_code)
+        if not os.path.exists(history_file):
+            return pd.DataFrame()
+        memory_key = (index_code, 'history')
+        if self.memory_cache is not None:
+            history = self.memory_cache.get(memory_key, history_file)
+            if history is not None:
+                return history
+        try:
+            history = pd.read_csv(history_file, parse_dates=['trade_date'])
+            if self.memory_cache is not None:
+                self.memory_cache.put(memory_key, history_file, history)
+            return history
+        except Exception as e:
+            logger.warning(f"读取{index_code}历史库失败: {str(e)}")
+            return pd.DataFrame()
+    
+    @staticmethod
+    def merge_quotes(old_df, new_df):
+        """
+        合并两段行情，按交易日去重（新数据优先），日期统一归一到日
+        :return: DataFrame，按trade_date升序
+        """
+        frames = [f for f in (old_df, new_df) if f is not None and not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        merged = pd.concat(frames, ignore_index=True)
+        merged['trade_date'] = pd.to_datetime(merged['trade_date']).dt.normalize()
+        merged = merged.drop_duplicates(subset='trade_date', keep='last')
+        return merged.sort_values('trade_date').reset_index(drop=True)
+    
+    def _update_history(self, index_code, df):
+        """将新获取的行情合并进历史库（原子替换写入）"""
+        try:
+            merged = self.merge_quotes(self.load_history(index_code), df)
+            history_file = self._history_file(index_code)
+            write_text_atomic(history_file, merged.to_csv(index=False))
+            logger.info(f"{index_code}历史库已更新，共{len(merged)}条")
+            if self.memory_cache is not None:
+                # 写穿内存缓存：旧条目因文件修改时间变化已失效，直接换成合并后的结果
+                self.memory_cache.put((index_code, 'history'), history_file, merged)
+        except Exception as e:
+            logger.error(f"更新{index_code}历史库失败: {str(e)}")
+    
+    def get_minute_bars(self, index_code, klt=1, days=5, force_refresh=False):
+        """
+        获取分钟K线（按交易日分块存入本地，盘中超过minute_ttl后增量刷新）
+        :param index_code: 指数代码
+        :param klt: K线分钟数，取值见MINUTE_KLTS
+        :param days: 最近交易日数
+        :param force_refresh: 是否强制刷新
+        :return: K线列数组 {day, minute, open, high, low, close, volume}
+        """
+        if klt not in MINUTE_KLTS:
+            raise ValueError(f"不支持的分钟K线周期: {klt}，可选{sorted(MINUTE_KLTS)}")
+        
+        fetched_at = self._minute_fetched.get((index_code, klt))
+        if force_refresh or fetched_at is None or time.time() - fetched_at >= self.minute_ttl:
+            if index_code in YAHOO_SYMBOLS:
+                bars = self._fetch_minute_from_yahoo(index_code, klt, days)
+            else:
+                bars = self._fetch_minute_from_eastmoney(index_code, klt, days)
+            if bars is not None and len(bars['minute']):
+                written = self.minute_store.save(index_code, klt, bars)
+                self._minute_fetched[(index_code, klt)] = time.time()
+                logger.info(f"{index_code} {klt}分钟K线共{len(bars['minute'])}根，更新{written}个交易日")
+        
+        return self.minute_store.load(index_code, klt, last_days=days)
+    
+    def _fetch_minute_from_eastmoney(self, index_code, klt, days):
+        """从东方财富获取分钟K线（K线以结束时刻标记）"""
+        try:
+            params = {
+                'secid': self._eastmoney_secid(index_code),
+                'fields1': 'f1,f2,f3,f4,f5,f6',
+                'fields2': 'f51,f52,f53,f54,f55,f56',
+                'klt': str(klt),
+                'fqt': '1',
+                'beg': (datetime.now() - timedelta(days=days * 2 + 7)).strftime('%Y%m%d'),
+                'end': '20500101',
+                '_': str(int(time.time() * 1000))
+            }
+            response = requests.get("http://push2his.eastmoney.com/api/qt/stock/kline/get", params=params, timeout=10)
+            data = response.json()
+            klines = (data.get('data') or {}).get('klines')
+            if not klines:
+                logger.warning(f"东方财富分钟K线为空: {index_code}")
+                return None
+            
+            # 列顺序：时间,开,收,高,低,量
+            parts = [kline.split(',') for kline in klines]
+            times = [p[0] for p in parts]
+            values = pd.DataFrame([p[1:6] for p in parts]).apply(pd.to_numeric, errors='coerce').to_numpy()
+            return make_bars(times, values[:, 0], values[:, 2], values[:, 3], values[:, 1], values[:, 4])
+            
+        except Exception as e:
+            logger.error(f"东方财富获取{index_code}分钟K线失败: {str(e)}")
+            return None
+    
+    def _fetch_minute_from_yahoo(self, index_code, klt, days):
+        """从雅虎财经获取分钟K线（雅虎以开始时刻标记，转为交易所当地时间的结束时刻）"""
+        try:
+            url = f"https://query1.finance.yahoo.com/v8/finance/chart/{YAHOO_SYMBOLS[index_code]}"
+            params = {
+                "range": f"{min(days + 2, 7)}d" if klt == 1 else f"{days + 2}d",  # 1分钟线最多7天
+                "interval": MINUTE_KLTS[klt],
+                "includePrePost": "false"
+            }
+            headers = {
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+            }
+            response = requests.get(url, params=params, headers=headers, timeout=15)
+            result = (response.json().get('chart', {}).get('result') or [None])[0]
+            if not result or not result.get('timestamp'):
+                logger.warning(f"雅虎财经分钟K线为空: {index_code}")
+                return None
+            
+            quote = result['indicators']['quote'][0]
+            offset = result.get('meta', {}).get('gmtoffset', 0)
+            times = (pd.to_datetime(result['timestamp'], unit='s') + pd.Timedelta(seconds=offset + klt * 60))
+            frame = pd.DataFrame({field: quote.get(field) for field in ('open', 'high', 'low', 'close', 'volume')},
+                                 index=times).apply(pd.to_numeric, errors='coerce')
+            frame = frame.dropna(subset=['open', 'high', 'low', 'close'])
+            return make_bars(frame.index, frame['open'], frame['high'], frame['low'], frame['close'],
+                             frame['volume'].fillna(0))
+            
+        except Exception as e:
+            logger.error(f"雅虎财经获取{index_code}分钟K线失败: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _eastmoney_secid(index_code):
+        """常规A股指数代码转换为东方财富secid"""
+        if index_code.startswith('399'):  # 深证指数
+            return f"0.{index_code}"
+        elif index_code.startswith('000'):  # 上证指数
+            return f"1.{index_code}"
+        elif index_code == '883418':  # 微盘股
+            return "1.000852"  # 暂时使用中证1000代替
+        elif index_code.startswith('1B0688'):  # 科创50
+            return "1.000688"
+        elif index_code.startswith('1B0016'):  # 上证50
+            return "1.000016"
+        elif index_code.startswith('1B0852'):  # 中证1000
+            return "1.000852"
+        elif index_code == '932000':  # 中证2000
+            return "1.000985"
+        elif index_code.startswith('88'):  # 北证指数
+            return f"0.{index_code}"
+        elif index_code.startswith('899'):  # 北证指数
+            return f"0.{index_code}"
+        elif index_code.startswith('159'):  # ETF基金
+            return f"0.{index_code}"  # 深交所ETF
+        else:
+            return index_code
+    
     def _fetch_from_eastmoney(self, index_code, start_date, end_date):
         """从东方财富获取指数数据"""
         try:
@@ -76,6 +318,8 @@ class IndexDataSource:
                 # 使用华尔街见闻API
                 logger.info(f"从华尔街见闻获取{index_code}数据")
                 df = self._fetch_from_wsj(index_code, start_date, end_date)
+                if df is not None:
+                    df.attrs['provider'] = 'wallstreetcn'
                 return df
             elif index_code in ['HSI00001', 'HSCEI00', 'HST00011']:  # 港股指数
                 # 使用港股专门API
@@ -88,29 +332,7 @@ class IndexDataSource:
                 df = self._fetch_etf_data(index_code, start_date, end_date)
                 return df
             
-            # 常规A股指数代码转换
-            if index_code.startswith('399'):  # 深证指数
-                em_code = f"0.{index_code}"
-            elif index_code.startswith('000'):  # 上证指数
-                em_code = f"1.{index_code}"
-            elif index_code == '883418':  # 微盘股
-                em_code = "1.000852"  # 暂时使用中证1000代替
-            elif index_code.startswith('1B0688'):  # 科创50
-                em_code = "1.000688"
-            elif index_code.startswith('1B0016'):  # 上证50
-                em_code = "1.000016"
-            elif index_code.startswith('1B0852'):  # 中证1000
-                em_code = "1.000852"
-            elif index_code == '932000':  # 中证2000
-                em_code = "1.000985"
-            elif index_code.startswith('88'):  # 北证指数
-                em_code = f"0.{index_code}"
-            elif index_code.startswith('899'):  # 北证指数
-                em_code = f"0.{index_code}"
-            elif index_code.startswith('159'):  # ETF基金
-                em_code = f"0.{index_code}"  # 深交所ETF
-            else:
-                em_code = index_code
+            em_code = self._eastmoney_secid(index_code)
             
             url = "http://push2his.eastmoney.com/api/qt/stock/kline/get"
             params = {
@@ -207,24 +429,30 @@ class IndexDataSource:
         # 先尝试雅虎财经
         df = self._fetch_hk_from_yahoo(index_code, start_date, end_date)
         if df is not None and not df.empty:
+            df.attrs['provider'] = 'yahoo'
             return df
         
         # 如果雅虎失败，尝试新浪财经
         logger.warning(f"雅虎财经获取{index_code}失败，尝试新浪财经")
         df = self._fetch_hk_from_sina(index_code, start_date, end_date)
         if df is not None and not df.empty:
+            df.attrs['provider'] = 'sina'
             return df
         
         # 如果都失败，尝试腾讯财经
         logger.warning(f"新浪财经获取{index_code}失败，尝试腾讯财经")
         df = self._fetch_hk_from_tencent(index_code, start_date, end_date)
         if df is not None and not df.empty:
+            df.attrs['provider'] = 'tencent'
             return df
         
         # 最后尝试生成合成数据（仅对特定指数）
         if index_code in ['HST00011']:
             logger.warning(f"所有数据源失败，生成{index_code}合成数据")
-            return self._generate_synthetic_hk_data(index_code, start_date, end_date)
+            df = self._generate_synthetic_hk_data(index_code, start_date, end_date)
+            if df is not None:
+                df.attrs['provider'] = 'synthetic'
+            return df
         
         return None
     
@@ -232,13 +460,7 @@ class IndexDataSource:
         """从雅虎财经获取港股数据"""
         try:
             # 映射指数代码到雅虎财经代码
-            yahoo_code_map = {
-                'HSI00001': '^HSI',    # 恒生指数
-                'HSCEI00': '^HSCE',    # 国企指数
-                'HST00011': '3032.HK'  # 恒生科技ETF (更可靠的数据源)
-            }
-            
-            symbol = yahoo_code_map.get(index_code)
+            symbol = YAHOO_SYMBOLS.get(index_code)
             if not symbol:
                 logger.error(f"未知的港股指数代码: {index_code}")
                 return None
@@ -445,6 +667,7 @@ class IndexDataSource:
                 df.loc[df.index[-1], 'open'] = current_data.get('open', current_price)
                 df.loc[df.index[-1], 'high'] = current_data.get('high', current_price)
                 df.loc[df.index[-1], 'low'] = current_data.get('low', current_price)
+                df.attrs['synthetic'] = True
                 
                 logger.info(f"基于实时数据创建模拟历史数据，共{len(df)}条")
                 return df
@@ -587,6 +810,7 @@ class IndexDataSource:
                 
                 df = pd.DataFrame(records)
                 df = df.sort_values('trade_date').reset_index(drop=True)
+                df.attrs['synthetic'] = True
                 logger.info(f"生成{index_code}合成数据成功，共{len(df)}条")
                 return df
             
@@ -9,6 +9,11 @@ import logging
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from file_utils import write_json_atomic
+from status_journal import StatusJournal
+from minute_bar_store import resample_bars, daily_bars
+from trend_result import TrendResult
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,59 +22,365 @@ logging.basicConfig(
 )
 logger = logging.getLogger('index_trend_analyzer')
 
+
+def format_change_date(date):
+    """状态转换日期格式化为 2025.7.8 形式（与历史记录保持一致）"""
+    date = pd.Timestamp(date)
+    return f"{date.year}.{date.month}.{date.day}"
+
+
+def scan_status_flips(closes, ma_period, prev_status=None):
+    """
+    向量化扫描收盘价序列的YES/NO状态及状态翻转位置
+    :param closes: 收盘价数组（已含均线计算所需的前置窗口）
+    :param ma_period: 均线周期
+    :param prev_status: 序列之前的已知状态（True=YES），用于识别首根K线上的翻转
+    :return: (status, flips) status为每根可计算均线K线的布尔状态（前ma_period-1根为无效，
+             以-1填充的int8数组），flips为发生翻转的K线下标数组
+    """
+    closes = np.asarray(closes, dtype=float)
+    status = np.full(len(closes), -1, dtype=np.int8)
+    if len(closes) < ma_period:
+        return status, np.array([], dtype=int)
+    
+    # 滑动窗口均线：累计和差分，O(n)
+    csum = np.cumsum(np.insert(closes, 0, 0.0))
+    ma = (csum[ma_period:] - csum[:-ma_period]) / ma_period
+    valid = closes[ma_period - 1:] >= ma
+    status[ma_period - 1:] = valid
+    
+    seq = valid.astype(np.int8)
+    if prev_status is not None:
+        seq = np.insert(seq, 0, 1 if prev_status else 0)
+        flips = np.flatnonzero(seq[1:] != seq[:-1]) + ma_period - 1
+    else:
+        flips = np.flatnonzero(seq[1:] != seq[:-1]) + ma_period
+    return status, flips
+
+
+# 多周期状态：配置名 -> (pandas周期, 回补历史时每周期按多少自然日估算)
+TIMEFRAMES = {
+    'weekly': ('W-FRI', 7),
+    'monthly': ('M', 31)
+}
+
+
+def compute_flip_price(prior_closes):
+    """
+    状态翻转价：均线包含当日收盘价，令 close == (前N-1根收盘价之和 + close) / N
+    解得 close = 前N-1根收盘价均值。当日价格 >= 翻转价 即为YES，盘中判断只需一次比较
+    :param prior_closes: 当前K线之前的N-1根收盘价
+    """
+    return float(np.mean(prior_closes))
+
+
+def status_at_price(price, flip_price):
+    """按翻转价判断某一价格下的YES/NO状态"""
+    return 'YES' if price >= flip_price else 'NO'
+
+
 class IndexTrendAnalyzer:
     """指数趋势分析器"""
     
-    def __init__(self, data_source, ma_period=20):
+    def __init__(self, data_source, ma_period=20, derive_status=False, timeframes=None):
         """
         初始化趋势分析器
         :param data_source: 数据源实例
         :param ma_period: 均线周期，默认20日
+        :param derive_status: 是否从行情历史推导状态转换时间/价格（不依赖历史状态文件）
+        :param timeframes: 多周期状态配置，如 {'weekly': 20, 'monthly': 20}（周期名 -> 均线周期）
         """
         self.data_source = data_source
         self.ma_period = ma_period
+        self.derive_status = derive_status
+        self.timeframes = {k: v for k, v in (timeframes or {}).items() if k in TIMEFRAMES}
         self.status_path = 'data/trend_status'
         os.makedirs(self.status_path, exist_ok=True)
+        self.flip_cache_path = os.path.join(self.status_path, 'flip_cache')
+        if self.derive_status:
+            os.makedirs(self.flip_cache_path, exist_ok=True)
+        self.timeframe_cache_path = os.path.join(self.status_path, 'timeframe_cache')
+        if self.timeframes:
+            os.makedirs(self.timeframe_cache_path, exist_ok=True)
         
         # 加载历史状态
         self.history_status = self._load_history_status()
     
     def _load_history_status(self):
-        """加载历史状态记录"""
+        """加载历史状态记录（来自状态转换日志的快照与尾部）"""
+        self.journal = StatusJournal(self.status_path)
+        if not self.journal.latest:
+            self._migrate_legacy_history()
+        return self.journal.latest_status()
+    
+    def refresh_history_status(self):
+        """重新读取状态转换日志的新增部分（常驻进程中其他进程可能已追加记录）"""
+        self.journal.refresh()
+        self.history_status = self.journal.latest_status()
+    
+    def _migrate_legacy_history(self):
+        """首次使用日志时，导入旧版 trend_status_history.json"""
         status_file = os.path.join(self.status_path, 'trend_status_history.json')
-        if os.path.exists(status_file):
+        if not os.path.exists(status_file):
+            return
+        try:
+            with open(status_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+            count = self.journal.append([dict(info, index_code=code) for code, info in legacy.items()])
+            logger.info(f"已从旧版历史状态文件导入{count}条记录")
+        except Exception as e:
+            logger.error(f"导入旧版历史状态失败: {str(e)}")
+    
+    def _save_history_status(self):
+        """保存历史状态记录：只向日志追加发生变化的指数"""
+        try:
+            self.journal.refresh()
+            latest = self.journal.latest_status()
+            changed = [
+                dict(info, index_code=code)
+                for code, info in self.history_status.items()
+                if info['status_change_time'] and (
+                    latest.get(code, {}).get('status') != info['status']
+                    or latest.get(code, {}).get('status_change_time') != info['status_change_time'])
+            ]
+            count = self.journal.append(changed) if changed else 0
+            logger.info(f"历史状态已保存，新增{count}条状态转换")
+        except Exception as e:
+            logger.error(f"保存历史状态失败: {str(e)}")
+    
+    def _load_flip_cache(self, index_code):
+        """读取单个指数的状态翻转扫描缓存"""
+        cache_file = os.path.join(self.flip_cache_path, f"{index_code}.json")
+        if os.path.exists(cache_file):
             try:
-                with open(status_file, 'r', encoding='utf-8') as f:
+                with open(cache_file, 'r', encoding='utf-8') as f:
                     return json.load(f)
             except Exception as e:
-                logger.error(f"加载历史状态失败: {str(e)}")
-                return {}
-        return {}
+                logger.warning(f"读取{index_code}翻转缓存失败: {str(e)}")
+        return None
     
-    def _save_history_status(self):
-        """保存历史状态记录"""
-        status_file = os.path.join(self.status_path, 'trend_status_history.json')
+    def derive_status_change(self, index_code, quote_df):
+        """
+        从本地行情历史推导最近一次状态翻转（K线日期与收盘价）
+        结果按指数缓存，只扫描缓存之后新增的K线；历史数据被修正时自动全量重扫
+        :param index_code: 指数代码
+        :param quote_df: 本次获取的行情（与历史库合并后扫描）
+        :return: dict {'status', 'flip_date', 'flip_price', 'since_date'}，数据不足时返回None；
+                 历史内未出现翻转时flip_date/flip_price为None（翻转早于本地历史），since_date为首根可计算均线的K线日期
+        """
+        history = self.data_source.merge_quotes(self.data_source.load_history(index_code), quote_df)
+        if len(history) < self.ma_period:
+            return None
+        
+        dates = history['trade_date'].dt.strftime('%Y-%m-%d').to_numpy()
+        closes = history['close'].to_numpy(dtype=float)
+        
+        # 校验缓存：周期一致（旧格式缓存无since_date，需重扫），且缓存截止日的收盘价与截止日前的累计和都未变
+        cache = self._load_flip_cache(index_code)
+        start = 0
+        if cache and cache.get('ma_period') == self.ma_period and 'since_date' in cache:
+            pos = np.searchsorted(dates, cache['last_date'])
+            if (pos < len(dates) and dates[pos] == cache['last_date']
+                    and np.isclose(closes[pos], cache['last_close'])
+                    and np.isclose(closes[:pos + 1].sum(), cache['checksum'])):
+                start = pos + 1
+        if start == 0:
+            cache = None
+        elif start == len(dates):
+            return cache
+        
+        # 只扫描新增K线（带上均线所需的前置窗口）
+        offset = max(0, start - (self.ma_period - 1))
+        prev_status = (cache['status'] == 'YES') if cache else None
+        status, flips = scan_status_flips(closes[offset:], self.ma_period, prev_status)
+        flips = flips + offset
+        flips = flips[flips >= start]
+        
+        since_date = cache.get('since_date') if cache else dates[self.ma_period - 1]
+        if len(flips):
+            flip_idx = flips[-1]
+            flip_date, flip_price = dates[flip_idx], float(closes[flip_idx])
+        elif cache:
+            flip_date, flip_price = cache['flip_date'], cache['flip_price']
+        else:
+            # 整段历史未出现翻转：翻转日期未知（早于本地历史），不以首根K线冒充翻转点
+            flip_date, flip_price = None, None
+        
+        cache = {
+            'ma_period': self.ma_period,
+            'last_date': dates[-1],
+            'last_close': float(closes[-1]),
+            'checksum': float(closes.sum()),
+            'status': 'YES' if status[-1] == 1 else 'NO',
+            'flip_date': flip_date,
+            'flip_price': flip_price,
+            'since_date': since_date
+        }
         try:
-            with open(status_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history_status, f, ensure_ascii=False, indent=2)
-            logger.info(f"历史状态已保存")
+            write_json_atomic(os.path.join(self.flip_cache_path, f"{index_code}.json"), cache)
         except Exception as e:
-            logger.error(f"保存历史状态失败: {str(e)}")
+            logger.warning(f"保存{index_code}翻转缓存失败: {str(e)}")
+        return cache
+    
+    def analyze_timeframes(self, index_code, quote_df):
+        """
+        计算周线/月线等多周期状态：由本地日线历史重采样，不单独请求周K/月K
+        已完成周期的收盘价按指数缓存，每次只重采样缓存之后的日线，当前周期用最新日线作为临时收盘
+        :param index_code: 指数代码
+        :param quote_df: 本次获取的日线行情（与历史库合并）
+        :return: dict，如 {'weekly_status': 'YES', 'weekly_threshold': 3500.12, ...}，数据不足的周期为None
+        """
+        longest = max(TIMEFRAMES[name][1] * (period + 1) for name, period in self.timeframes.items())
+        start_date = (datetime.now() - timedelta(days=longest)).strftime('%Y-%m-%d')
+        history = self.data_source.merge_quotes(self.data_source.ensure_history(index_code, start_date), quote_df)
+        
+        cache_file = os.path.join(self.timeframe_cache_path, f"{index_code}.json")
+        cache = {}
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+            except Exception as e:
+                logger.warning(f"读取{index_code}多周期缓存失败: {str(e)}")
+        
+        result = {}
+        for name, period in self.timeframes.items():
+            freq = TIMEFRAMES[name][0]
+            result[f'{name}_status'] = None
+            result[f'{name}_threshold'] = None
+            if history.empty:
+                continue
+            
+            periods = history['trade_date'].dt.to_period(freq)
+            current = periods.iloc[-1]
+            
+            # 缓存有效：均线周期一致，且缓存的最后完成周期收盘价未被修正
+            entry = cache.get(name)
+            completed = []
+            new_rows = periods < current
+            if entry and entry.get('ma_period') == period:
+                last_period = pd.Period(entry['last_period_end'], freq=freq)
+                last_rows = history['close'][periods == last_period]
+                if last_period < current and len(last_rows) and np.isclose(last_rows.iloc[-1], entry['last_close']):
+                    completed = entry['closes']
+                    new_rows &= periods > last_period
+            
+            # 只重采样缓存之后已完成周期的日线：每周期取最后一根日线收盘
+            new_closes = history.loc[new_rows, 'close'].groupby(periods[new_rows]).last()
+            if len(new_closes):
+                completed = completed + new_closes.tolist()
+                cache[name] = {
+                    'ma_period': period,
+                    'last_period_end': new_closes.index[-1].end_time.strftime('%Y-%m-%d'),
+                    'last_close': float(new_closes.iloc[-1]),
+                    'closes': completed[-(period - 1):] if period > 1 else []
+                }
+            elif not completed:
+                cache.pop(name, None)
+            completed = completed[-(period - 1):] if period > 1 else []
+            
+            if len(completed) < period - 1:
+                continue
+            current_close = float(history['close'].iloc[-1])
+            threshold = (sum(completed) + current_close) / period
+            result[f'{name}_status'] = 'YES' if current_close >= threshold else 'NO'
+            result[f'{name}_threshold'] = round(threshold, 2)
+        
+        try:
+            write_json_atomic(cache_file, cache)
+        except Exception as e:
+            logger.warning(f"保存{index_code}多周期缓存失败: {str(e)}")
+        return result
     
-    def analyze_index_trend(self, index_code, index_name, rank=None, force_refresh=False):
+    def analyze_minute_trend(self, index_code, bar_minutes=60, days=None):
+        """
+        盘中N分钟K线趋势：由分钟K线重采样后按同样的均线逻辑判断状态（默认60分钟线）
+        基础周期取能整除bar_minutes的最大分钟K线周期，请求量最小
+        :param index_code: 指数代码
+        :param bar_minutes: 目标K线分钟数
+        :param days: 使用的最近交易日数，默认按均线所需根数估算
+        :return: dict {bar_minutes, bar_time, status, threshold, flip_price, current_price, day_open, day_high, day_low}，数据不足时为None
+        """
+        klt = max(k for k in (1, 5, 15, 30, 60) if bar_minutes % k == 0)
+        if days is None:
+            # A股每日240分钟，多取2日以覆盖非交易日与当日未完成K线
+            days = -(-self.ma_period * bar_minutes // 240) + 2
+        bars = resample_bars(self.data_source.get_minute_bars(index_code, klt=klt, days=days), bar_minutes, klt)
+        if len(bars['close']) < self.ma_period:
+            logger.warning(f"{index_code} {bar_minutes}分钟K线不足{self.ma_period}根")
+            return None
+        
+        closes = bars['close'][-self.ma_period:].astype(float)
+        current_price = float(closes[-1])
+        threshold = float(closes.mean())
+        flip_price = compute_flip_price(closes[:-1])
+        # 当日临时日K线
+        today = daily_bars(bars)
+        bar_time = pd.Timestamp(bars['day'][-1]) + pd.Timedelta(minutes=int(bars['minute'][-1]))
+        return {
+            'bar_minutes': bar_minutes,
+            'bar_time': bar_time.strftime('%Y-%m-%d %H:%M'),
+            'status': status_at_price(current_price, flip_price),
+            'threshold': round(threshold, 2),
+            'flip_price': round(flip_price, 2),
+            'current_price': round(current_price, 2),
+            'day_open': round(float(today['open'][-1]), 2),
+            'day_high': round(float(today['high'][-1]), 2),
+            'day_low': round(float(today['low'][-1]), 2)
+        }
+    
+    def fetch_quote(self, index_code, force_refresh=False):
+        """获取单个指数的分析用行情（最近90天，确保有足够数据计算20日均线）"""
+        end_date = datetime.now().strftime('%Y-%m-%d')
+        start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
+        return self.data_source.get_index_quote(index_code, start_date, end_date, force_refresh=force_refresh)
+    
+    def iter_quotes(self, index_list, force_refresh=False, max_workers=4):
+        """
+        并发获取分析用行情，按完成先后依次产出，慢数据源不阻塞其他指数
+        :return: 生成器 (index_info, DataFrame)
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.fetch_quote, info['code'], force_refresh): info for info in index_list}
+            for future in as_completed(futures):
+                index_info = futures[future]
+                try:
+                    quote_df = future.result()
+                except Exception as e:
+                    logger.error(f"获取{index_info['name']}({index_info['code']})行情失败: {str(e)}")
+                    quote_df = pd.DataFrame()
+                yield index_info, quote_df
+    
+    @staticmethod
+    def quote_fingerprint(quotes):
+        """
+        行情指纹：每个指数最后一根K线的日期与收盘价，用于判断是否有新K线
+        :param quotes: dict {指数代码: DataFrame}
+        :return: dict {指数代码: 'YYYY-MM-DD|收盘价'}，无数据的为None
+        """
+        fingerprint = {}
+        for code, df in quotes.items():
+            if df is None or df.empty:
+                fingerprint[code] = None
+                continue
+            latest = df.iloc[-1]
+            fingerprint[code] = f"{pd.Timestamp(latest['trade_date']):%Y-%m-%d}|{float(latest['close']):.4f}"
+        return fingerprint
+    
+    def analyze_index_trend(self, index_code, index_name, rank=None, force_refresh=False, quote_df=None):
         """
         分析单个指数的趋势状态
         :param index_code: 指数代码
         :param index_name: 指数名称
         :param rank: 趋势强度排名（可选）
         :param force_refresh: 是否强制刷新行情缓存
-        :return: dict, 包含状态、偏离率等信息
+        :param quote_df: 已获取的行情（可选，不传则自动获取）
+        :return: TrendResult（可按dict读写）, 包含状态、偏离率等信息
         """
         try:
-            # 获取指数行情数据（最近90天，确保有足够数据计算20日均线）
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-            quote_df = self.data_source.get_index_quote(index_code, start_date, end_date, force_refresh=force_refresh)
+            if quote_df is None:
+                quote_df = self.fetch_quote(index_code, force_refresh=force_refresh)
+            quote_df = quote_df.copy()
             
             if quote_df.empty or len(quote_df) < self.ma_period:
                 logger.warning(f"{index_name}({index_code})数据不足，当前{len(quote_df)}条，需要{self.ma_period}条")
@@ -78,6 +389,11 @@ class IndexTrendAnalyzer:
             # 计算20日均线作为临界值
             quote_df['ma20'] = quote_df['close'].rolling(window=self.ma_period).mean()
             
+            # 翻转价：当前K线取其之前N-1根收盘价均值；下一根K线取最近N-1根收盘价均值
+            closes = quote_df['close'].to_numpy(dtype=float)
+            flip_price = compute_flip_price(closes[-self.ma_period:-1])
+            next_flip_price = compute_flip_price(closes[-(self.ma_period - 1):])
+            
             # 过滤掉均线为NaN的行
             quote_df = quote_df[quote_df['ma20'].notna()]
             
@@ -109,8 +425,22 @@ class IndexTrendAnalyzer:
             status_change_time = prev_status_info.get('status_change_time', None)
             status_change_price = prev_status_info.get('status_change_price', current_price)
             
+            status_change_before = None
+            derived = self.derive_status_change(index_code, quote_df) if self.derive_status else None
+            if derived:
+                # 从行情历史推导：使用真实K线日期与收盘价，重复运行结果一致
+                if derived['flip_date'] is not None:
+                    status_change_time = format_change_date(derived['flip_date'])
+                    status_change_price = derived['flip_price']
+                elif prev_status != current_status or not status_change_time:
+                    # 本地历史内无翻转且无同状态的历史记录：转换时间与价格未知（不计区间涨幅），
+                    # 只另记转换早于哪一天（status_change_before），不写入转换时间字段
+                    status_change_time, status_change_price = None, None
+                    status_change_before = format_change_date(derived['since_date'])
+                if prev_status and prev_status != current_status:
+                    logger.info(f"{index_name}状态变化: {prev_status} -> {current_status}，价格: {current_price}")
             # 如果状态发生变化，更新转换时间和价格
-            if prev_status and prev_status != current_status:
+            elif prev_status and prev_status != current_status:
                 status_change_time = datetime.now().strftime('%Y.%m.%d').replace('.0', '.')
                 status_change_price = current_price
                 logger.info(f"{index_name}状态变化: {prev_status} -> {current_status}，价格: {current_price}")
@@ -119,6 +449,9 @@ class IndexTrendAnalyzer:
                 status_change_time = datetime.now().strftime('%Y.%m.%d').replace('.0', '.')
                 status_change_price = current_price
             
+            if not status_change_time and status_change_before is None:
+                status_change_time = datetime.now().strftime('%Y.%m.%d').replace('.0', '.')
+            
             # 计算区间涨幅（从状态转换时的价格到现在）
             if status_change_price and status_change_price > 0:
                 interval_change_pct = ((current_price - status_change_price) / status_change_price) * 100
@@ -126,7 +459,7 @@ class IndexTrendAnalyzer:
                 interval_change_pct = 0
             
             # 构建结果
-            result = {
+            result = TrendResult({
                 'rank': rank if rank is not None else 0,
                 'index_code': index_code,
                 'index_name': index_name,
@@ -135,15 +468,23 @@ class IndexTrendAnalyzer:
                 'current_price': round(current_price, 2),
                 'threshold': round(threshold, 2),
                 'deviation_rate': round(deviation_rate, 2),
-                'status_change_time': status_change_time if status_change_time else datetime.now().strftime('%Y.%m.%d').replace('.0', '.'),
+                'status_change_time': status_change_time,
                 'interval_change_pct': round(interval_change_pct, 2),
+                'flip_price': round(flip_price, 2),
+                'flip_distance_pct': round((current_price - flip_price) / flip_price * 100, 2),
+                'next_flip_price': round(next_flip_price, 2),
+                'trade_date': pd.Timestamp(latest['trade_date']).strftime('%Y-%m-%d'),
                 'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
+            })
+            if status_change_before:
+                result['status_change_before'] = status_change_before
+            if self.timeframes:
+                result.update(self.analyze_timeframes(index_code, quote_df))
             
-            # 更新历史状态
+            # 更新历史状态（转换时间未知的不写入状态转换日志）
             self.history_status[index_code] = {
                 'status': current_status,
-                'status_change_time': status_change_time if status_change_time else datetime.now().strftime('%Y.%m.%d').replace('.0', '.'),
+                'status_change_time': status_change_time,
                 'status_change_price': status_change_price
             }
             
@@ -153,25 +494,42 @@ class IndexTrendAnalyzer:
             logger.error(f"分析{index_name}({index_code})趋势失败: {str(e)}", exc_info=True)
             return None
     
-    def analyze_all_indices(self, index_list, force_refresh=False):
+    def analyze_all_indices(self, index_list, force_refresh=False, quote_stream=None, on_result=None):
         """
         批量分析所有指数
         :param index_list: 指数列表 [{'code': 'xxx', 'name': 'xxx'}, ...]
         :param force_refresh: 是否强制刷新行情缓存
+        :param quote_stream: 已获取行情的可迭代对象 (index_info, DataFrame)，如iter_quotes（可选，不传则逐个获取）
+        :param on_result: 每个指数分析完成时的回调 on_result(index_info, result)，失败时result为None
         :return: list, 分析结果列表
         """
-        results = []
-        for index_info in index_list:
-            result = self.analyze_index_trend(index_info['code'], index_info['name'], force_refresh=force_refresh)
+        if quote_stream is None:
+            quote_stream = ((index_info, None) for index_info in index_list)
+        
+        results = {}
+        for index_info, quote_df in quote_stream:
+            result = self.analyze_index_trend(index_info['code'], index_info['name'], force_refresh=force_refresh,
+                                              quote_df=quote_df)
             if result:
-                results.append(result)
+                results[index_info['code']] = result
+            if on_result:
+                on_result(index_info, result)
         
-        # 保存历史状态
-        self._save_history_status()
+        # 保存历史状态（追加写入状态转换日志，重复记录自动去重）；
+        # 推导模式下状态完全由行情决定，不写共享的状态转换日志，可并行运行
+        if not self.derive_status:
+            self._save_history_status()
         
-        # 按趋势强度排序
-        # YES状态的按偏离率降序（偏离率越大越强）
-        # NO状态的按偏离率升序（偏离率越小（负值越大）越弱）
+        # 按配置顺序排序，偏离率相同时保持配置顺序
+        return self.rank_results([results[info['code']] for info in index_list if info['code'] in results])
+    
+    @staticmethod
+    def rank_results(results):
+        """
+        按趋势强度排序并写入排名
+        YES状态的按偏离率降序（偏离率越大越强）
+        NO状态的按偏离率升序（偏离率越小（负值越大）越弱）
+        """
         results.sort(key=lambda x: (x['status'] == 'NO', -x['deviation_rate']))
         
         # 添加排名
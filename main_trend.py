@@ -7,6 +7,7 @@ import os
 import sys
 import json
 import argparse
+import itertools
 import logging
 from datetime import datetime
 
@@ -24,6 +25,15 @@ logger = logging.getLogger('main_trend')
 from index_data_source import IndexDataSource
 from index_trend_analyzer import IndexTrendAnalyzer
 from trend_reporter import TrendReporter
+from results_store import ResultsStore
+from trend_watcher import TrendWatcher
+from market_breadth import MarketBreadth
+from constituent_breadth import ConstituentBreadth
+from file_utils import write_json_atomic, write_text_atomic, write_bytes_atomic
+from trend_result import ResultTable, dumps_document
+from result_publisher import ProgressivePublisher, RunProgress
+from trend_daemon import TrendDaemon, DEFAULT_HOST, DEFAULT_PORT
+import trend_panel
 
 # 可选：导入原有的微信通知器
 WECHAT_AVAILABLE = False
@@ -37,6 +47,16 @@ try:
 except Exception as e:
     logger.warning(f"微信通知器不可用: {str(e)}")
 
+RESULT_FILE = 'data/trend_status/latest_trend_result.json'
+# 分析过程中的中间快照（partial=true），最终结果写入后或运行中止时删除，不覆盖上次的完整结果
+PARTIAL_FILE = 'data/trend_status/latest_trend_result.partial.json'
+# 最终结果的列式二进制表（ResultTable.to_bytes），网页按列输出时直接读取
+RESULT_TABLE_FILE = 'data/trend_status/latest_trend_result.npz'
+# 运行进度（已完成数、正在获取的指数与数据源），网页刷新任务据此报告进度
+PROGRESS_FILE = 'data/trend_status/run_progress.json'
+# 上次分析的输入指纹（配置 + 各指数最后一根K线），用于跳过无新K线的重复运行
+FINGERPRINT_FILE = 'data/trend_status/run_fingerprint.json'
+
 def load_index_config():
     """加载指数配置"""
     config_file = 'config/index_config.json'
@@ -53,50 +73,130 @@ def load_index_config():
         logger.error(f"配置加载失败: {str(e)}")
         return None
 
-def main():
-    """主程序"""
-    parser = argparse.ArgumentParser(description='鱼盆趋势模型 - 实时信号分析系统')
-    parser.add_argument('--task', default='analyze', 
-                       choices=['analyze', 'report', 'push', 'html'],
-                       help='任务类型: analyze-分析并保存, report-生成文本报告, push-推送微信, html-生成HTML报告')
-    parser.add_argument('--output', default='console',
-                       choices=['console', 'file', 'both'],
-                       help='输出方式: console-控制台, file-文件, both-两者都输出')
-    parser.add_argument('--force-refresh', action='store_true',
-                       help='强制刷新数据，忽略缓存')
-    args = parser.parse_args()
-    
-    logger.info("="*50)
-    logger.info(f"鱼盆趋势模型启动 - 任务类型: {args.task}")
-    logger.info("="*50)
-    
-    # 加载配置
-    config = load_index_config()
-    if not config:
-        logger.error("配置加载失败，程序退出")
+def parse_date(value):
+    """命令行日期参数（YYYY-MM-DD），格式无效时由argparse报错退出"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效日期: {value}（格式应为YYYY-MM-DD）") from None
+
+def run_as_of(args, config, data_source, reporter):
+    """
+    按历史日期重建排名表：只读本地行情历史库，不联网
+    多个日期在一次向量化计算中完成
+    """
+    index_list = config['indices']
+    quotes = trend_panel.load_quote_panel(data_source, index_list)
+    if quotes.empty:
+        logger.error("本地行情历史库为空，无法重建历史结果")
         return
+    metrics = trend_panel.compute_trend_metrics(quotes, config.get('ma_period', 20))
     
-    # 初始化组件
-    logger.info("初始化数据源...")
-    data_source = IndexDataSource()
-    
-    logger.info("初始化趋势分析器...")
-    analyzer = IndexTrendAnalyzer(data_source, ma_period=config.get('ma_period', 20))
-    
-    notifier = None
-    if WECHAT_AVAILABLE and config.get('notification', {}).get('wechat_enabled', False):
-        logger.info("初始化微信通知器...")
-        notifier = WechatNotifier()
-    
-    reporter = TrendReporter(notifier)
+    if args.as_of_range:
+        as_of_dates = trend_panel.trading_days(metrics, *args.as_of_range)
+    else:
+        as_of_dates = [args.as_of]
+    if not as_of_dates:
+        logger.error("指定区间内没有交易日")
+        return
     
-    # 执行分析
-    logger.info(f"开始分析{len(config['indices'])}个指数...")
-    results = analyzer.analyze_all_indices(config['indices'])
+    tables = trend_panel.rank_as_of(metrics, index_list, as_of_dates)
+    logger.info(f"已重建{len(tables)}个交易日的排名表")
     
+    store = ResultsStore()
+    for as_of_date, results in tables.items():
+        day = as_of_date.strftime('%Y%m%d')
+        if not results:
+            logger.warning(f"{as_of_date:%Y-%m-%d}无有效结果")
+            continue
+        summary = trend_panel.summarize_as_of(results, as_of_date)
+        store.save_run(results, summary)
+        
+        if args.task == 'analyze':
+            result_file = f"data/trend_status/trend_result_{day}.json"
+            write_text_atomic(result_file, dumps_document({
+                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'as_of': as_of_date.strftime('%Y-%m-%d'),
+                'summary': summary,
+                'results': results
+            }))
+            logger.info(f"{as_of_date:%Y-%m-%d}结果已保存至{result_file}")
+            if len(tables) == 1:
+                print("\n" + reporter.generate_text_report(results, title="鱼盆趋势模型v2.0", report_date=as_of_date))
+        
+        elif args.task == 'report':
+            report = reporter.generate_text_report(results, report_date=as_of_date)
+            if args.output in ['console', 'both']:
+                print("\n" + report)
+            if args.output in ['file', 'both']:
+                report_file = f"data/trend_status/trend_report_{day}.txt"
+                with open(report_file, 'w', encoding='utf-8') as f:
+                    f.write(report)
+                logger.info(f"报告已保存至{report_file}")
+        
+        elif args.task == 'html':
+            html_file = f"data/trend_status/trend_report_{day}.html"
+            with open(html_file, 'w', encoding='utf-8') as f:
+                f.write(reporter.generate_html_report(results, report_date=as_of_date))
+            logger.info(f"HTML报告已保存至{html_file}")
+        
+        elif args.task == 'push':
+            logger.warning("历史日期重建不支持微信推送")
+            break
+
+def run_settings(config, analyzer):
+    """影响分析结果的运行参数（配置变化时必须重算）"""
+    return {'config': config, 'derive_status': analyzer.derive_status}
+
+def load_last_run():
+    """
+    上次分析的输入指纹 {'update_time', 'fingerprint': {'settings', 'quotes'}}
+    结果文件已被盘中监控等覆盖时返回None
+    """
+    if not os.path.exists(FINGERPRINT_FILE) or not os.path.exists(RESULT_FILE):
+        return None
+    try:
+        with open(FINGERPRINT_FILE, 'r', encoding='utf-8') as f:
+            last_run = json.load(f)
+        with open(RESULT_FILE, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        if result.get('update_time') != last_run.get('update_time') or 'fingerprint' not in last_run:
+            return None
+        last_run['result'] = result
+        return last_run
+    except Exception as e:
+        logger.warning(f"读取上次运行指纹失败: {str(e)}")
+        return None
+
+def detect_changes(quote_stream, last_run, settings):
+    """
+    边获取行情边与上次指纹比较，发现第一个有新K线的指数即停止
+    :return: (changed, buffered) buffered为已取出的行情，变化时需与剩余行情一起分析
+    """
+    buffered = []
+    if last_run is None or last_run['fingerprint']['settings'] != settings:
+        return True, buffered
+    last_quotes = last_run['fingerprint']['quotes']
+    for index_info, quote_df in quote_stream:
+        buffered.append((index_info, quote_df))
+        code = index_info['code']
+        if IndexTrendAnalyzer.quote_fingerprint({code: quote_df})[code] != last_quotes.get(code):
+            logger.info(f"{index_info['name']}有新K线，重新分析")
+            return True, buffered
+    return False, buffered
+
+def compute_results(config, data_source, analyzer, quote_stream, force_refresh=False, on_result=None):
+    """
+    分析全部指数并计算摘要、市场宽度等附加指标，结果追加存入历史结果库
+    :param quote_stream: 行情 (index_info, DataFrame) 的可迭代对象
+    :param on_result: 每个指数完成时的回调（渐进发布）
+    :return: (results, summary, market)，分析失败时为None
+    """
+    results = analyzer.analyze_all_indices(config['indices'], force_refresh=force_refresh,
+                                           quote_stream=quote_stream, on_result=on_result)
     if not results:
         logger.error("分析失败，无结果")
-        return
+        return None
     
     logger.info(f"分析完成，共{len(results)}个指数有效")
     
@@ -108,18 +208,118 @@ def main():
     if summary['new_no']:
         logger.info(f"新转NO: {', '.join(summary['new_no'])}")
     
+    # 市场宽度与相关性（基于本地行情历史库，按交易日增量计算）
+    market = None
+    breadth_config = config.get('breadth')
+    if breadth_config:
+        try:
+            market = MarketBreadth(data_source, ma_period=config.get('ma_period', 20),
+                                   correlation_window=breadth_config.get('correlation_window', 60)
+                                   ).compute(config['indices'], series_days=breadth_config.get('series_days', 60))
+            if market and market['breadth']['latest']:
+                latest = market['breadth']['latest']
+                logger.info(f"市场宽度: {latest['above']}/{latest['total']}站上均线({latest['pct_above']}%)，"
+                            f"平均相关系数{market['correlation']['average']}")
+        except Exception as e:
+            logger.error(f"市场宽度计算失败: {str(e)}")
+    
+    # 可选：成分股站上均线比例，写入对应指数的结果行
+    constituent_config = config.get('constituent_breadth', {})
+    if constituent_config.get('enabled', False):
+        try:
+            boards = constituent_config['boards']
+            calendar = data_source.load_history(next(iter(boards)))['trade_date']
+            breadth = ConstituentBreadth(boards, ma_period=constituent_config.get('ma_period', 20),
+                                         max_workers=constituent_config.get('max_workers', 8)).attach(results, calendar)
+            logger.info(f"成分股宽度计算完成，共{len(breadth)}个指数")
+        except Exception as e:
+            logger.error(f"成分股宽度计算失败: {str(e)}")
+    
+    # 每次运行的完整结果追加存入历史结果库
+    try:
+        ResultsStore().save_run(results, summary)
+    except Exception as e:
+        logger.error(f"保存历史结果失败: {str(e)}")
+    
+    return results, summary, market
+
+def run_analysis(args, config, data_source, analyzer, reporter):
+    """
+    执行一次分析并按任务类型输出（命令行与常驻进程共用）
+    :return: dict {'update_time', 'unchanged', 'count'}，分析失败或推送不可用时为None
+    """
+    # 执行分析：并发获取行情，与上次输入指纹逐个比较；所有指数均无新K线时直接沿用上次结果
+    logger.info(f"开始分析{len(config['indices'])}个指数...")
+    progress = RunProgress(PROGRESS_FILE, getattr(args, 'job_id', None), len(config['indices']))
+    quotes = {}
+    def record(stream):
+        for index_info, quote_df in stream:
+            quotes[index_info['code']] = quote_df
+            yield index_info, quote_df
+    quote_stream = progress.track(record(analyzer.iter_quotes(config['indices'], force_refresh=args.force_refresh,
+                                                              max_workers=config.get('fetch_workers', 4))))
+    settings = run_settings(config, analyzer)
+    last_run = None if args.force_refresh else load_last_run()
+    changed, buffered = detect_changes(quote_stream, last_run, settings)
+    
+    unchanged = not changed
+    publisher = None
+    if unchanged:
+        logger.info("所有指数均无新K线，沿用上次结果（--force-refresh可强制重算）")
+        previous = last_run['result']
+        results, summary = previous['results'], previous['summary']
+        market = {key: previous[key] for key in ('breadth', 'correlation') if key in previous}
+        # 跨日沿用时按今天重新判断新转YES/NO，上一交易日的翻转不再算新转；摘要变化时重新保存结果
+        if last_run['update_time'][:10] != datetime.now().strftime('%Y-%m-%d'):
+            summary = analyzer.get_status_change_summary(results)
+            if summary != previous.get('summary'):
+                logger.info("日期已变化，更新新转YES/NO摘要")
+                unchanged = False
+    else:
+        # 分析任务边完成边发布中间快照，网页可先展示已完成的指数
+        publisher = ProgressivePublisher(PARTIAL_FILE, config['indices']) if args.task == 'analyze' else None
+        def on_result(index_info, result):
+            progress.add(index_info, result)
+            if publisher:
+                publisher.add(index_info, result)
+        computed = None
+        try:
+            computed = compute_results(config, data_source, analyzer, itertools.chain(buffered, quote_stream),
+                                       force_refresh=args.force_refresh, on_result=on_result)
+        finally:
+            # 中止时丢弃中间快照，上次的完整结果保持不变
+            if publisher and not computed:
+                publisher.discard()
+        if not computed:
+            progress.stage('failed')
+            return None
+        results, summary, market = computed
+    fingerprint = {'settings': settings, 'quotes': IndexTrendAnalyzer.quote_fingerprint(quotes)}
+    checked_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
     # 根据任务类型处理结果
     if args.task == 'analyze':
         # 仅分析，保存结果
-        result_file = 'data/trend_status/latest_trend_result.json'
-        os.makedirs(os.path.dirname(result_file), exist_ok=True)
-        with open(result_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        if unchanged:
+            # 结果不重写，只记录本次检查时间（网页据此结束等待）
+            write_json_atomic(FINGERPRINT_FILE, {'update_time': last_run['update_time'], 'checked_time': checked_time,
+                                                 'fingerprint': fingerprint})
+        else:
+            table = ResultTable.from_records(results)
+            write_text_atomic(RESULT_FILE, dumps_document({
+                'update_time': checked_time,
+                'partial': False,
                 'summary': summary,
-                'results': results
-            }, f, ensure_ascii=False, indent=2)
-        logger.info(f"分析结果已保存至{result_file}")
+                'results': table,
+                **(market or {})
+            }))
+            # 列式表在JSON之后写入：其修改时间不早于JSON即表示两者对应同一次结果
+            write_bytes_atomic(RESULT_TABLE_FILE, table.to_bytes())
+            write_json_atomic(FINGERPRINT_FILE, {'update_time': checked_time, 'checked_time': checked_time,
+                                                 'fingerprint': fingerprint})
+            if publisher:
+                publisher.discard()
+            logger.info(f"分析结果已保存至{RESULT_FILE}")
         
         # 输出文本报告到控制台
         print("\n" + reporter.generate_text_report(results, title="鱼盆趋势模型v2.0"))
@@ -133,19 +333,25 @@ def main():
         
         if args.output in ['file', 'both']:
             report_file = f"data/trend_status/trend_report_{datetime.now().strftime('%Y%m%d')}.txt"
-            os.makedirs(os.path.dirname(report_file), exist_ok=True)
-            with open(report_file, 'w', encoding='utf-8') as f:
-                f.write(report)
-            logger.info(f"报告已保存至{report_file}")
+            if unchanged and os.path.exists(report_file):
+                logger.info(f"结果未变化，沿用已有报告{report_file}")
+            else:
+                os.makedirs(os.path.dirname(report_file), exist_ok=True)
+                with open(report_file, 'w', encoding='utf-8') as f:
+                    f.write(report)
+                logger.info(f"报告已保存至{report_file}")
     
     elif args.task == 'html':
-        # 生成HTML报告
-        html_report = reporter.generate_html_report(results)
+        # 生成HTML报告（结果未变化且当日报告已存在时不重复生成）
         html_file = f"data/trend_status/trend_report_{datetime.now().strftime('%Y%m%d')}.html"
-        os.makedirs(os.path.dirname(html_file), exist_ok=True)
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_report)
-        logger.info(f"HTML报告已保存至{html_file}")
+        if unchanged and os.path.exists(html_file):
+            logger.info(f"结果未变化，沿用已有HTML报告{html_file}")
+        else:
+            html_report = reporter.generate_html_report(results)
+            os.makedirs(os.path.dirname(html_file), exist_ok=True)
+            with open(html_file, 'w', encoding='utf-8') as f:
+                f.write(html_report)
+            logger.info(f"HTML报告已保存至{html_file}")
         
         if args.output == 'console':
             print(f"\nHTML报告已生成: {html_file}")
@@ -156,18 +362,134 @@ def main():
         if not WECHAT_AVAILABLE:
             logger.error("微信通知器不可用，无法推送")
             print("❌ 微信通知器不可用，请检查配置")
-            return
+            return None
         
         if not config.get('notification', {}).get('wechat_enabled', False):
             logger.warning("微信推送未启用")
             print("⚠️ 微信推送未启用，请在配置文件中启用")
-            return
+            return None
         
         logger.info("开始推送微信报告...")
         reporter.send_wechat_report(results, summary)
         logger.info("微信推送完成")
         print("✅ 微信推送完成")
     
+    progress.stage('unchanged' if unchanged else 'finished')
+    return {
+        'update_time': last_run['update_time'] if unchanged else checked_time,
+        'unchanged': unchanged,
+        'count': len(results)
+    }
+
+def build_analyzer(args, config, data_source):
+    """按配置创建趋势分析器"""
+    return IndexTrendAnalyzer(data_source, ma_period=config.get('ma_period', 20),
+                              derive_status=args.derive_status or config.get('derive_status', False),
+                              timeframes=config.get('timeframes'))
+
+def run_daemon(args, config, data_source, analyzer, reporter):
+    """
+    常驻进程：数据源、分析器及其缓存常驻内存，通过本地端口接收运行请求
+    每次运行重新读取配置，影响分析器的参数变化时重建分析器
+    """
+    state = {'analyzer': analyzer, 'settings': run_settings(config, analyzer)}
+    
+    def handle(request):
+        run_config = load_index_config() or config
+        run_args = argparse.Namespace(**vars(args))
+        run_args.task = request['task']
+        run_args.force_refresh = bool(request.get('force_refresh', False))
+        run_args.job_id = request.get('job_id')
+        run_args.output = request.get('output', 'file' if run_args.task == 'report' else 'console')
+        
+        current = build_analyzer(run_args, run_config, data_source) \
+            if run_settings(run_config, state['analyzer']) != state['settings'] else state['analyzer']
+        if current is not state['analyzer']:
+            logger.info("配置已变化，重建趋势分析器")
+            state['analyzer'], state['settings'] = current, run_settings(run_config, current)
+        else:
+            # 其他进程（定时任务等）可能已追加状态转换日志
+            current.refresh_history_status()
+        result = run_analysis(run_args, run_config, data_source, current, reporter)
+        if result is not None and data_source.memory_cache is not None:
+            result['memory_cache'] = data_source.memory_cache.stats()
+            logger.info(f"行情内存缓存: {result['memory_cache']}")
+        return result
+    
+    daemon_config = config.get('daemon', {})
+    TrendDaemon(handle, host=daemon_config.get('host', DEFAULT_HOST),
+                port=daemon_config.get('port', DEFAULT_PORT)).serve_forever()
+
+def main():
+    """主程序"""
+    parser = argparse.ArgumentParser(description='鱼盆趋势模型 - 实时信号分析系统')
+    parser.add_argument('--task', default='analyze', 
+                       choices=['analyze', 'report', 'push', 'html', 'watch', 'daemon'],
+                       help='任务类型: analyze-分析并保存, report-生成文本报告, push-推送微信, html-生成HTML报告, watch-交易时段盘中监控, daemon-常驻进程')
+    parser.add_argument('--output', default='console',
+                       choices=['console', 'file', 'both'],
+                       help='输出方式: console-控制台, file-文件, both-两者都输出')
+    parser.add_argument('--force-refresh', action='store_true',
+                       help='强制刷新数据，忽略缓存')
+    parser.add_argument('--derive-status', action='store_true',
+                       help='从行情历史推导状态转换时间/价格，不写入状态转换日志，可并行运行（也可在配置中设置derive_status）')
+    parser.add_argument('--job-id', default=None,
+                       help='网页刷新任务ID（写入运行进度文件，由网页服务传入）')
+    parser.add_argument('--interval', type=int, default=None,
+                       help='盘中监控轮询间隔（秒），默认取配置watch.interval或10秒')
+    as_of_group = parser.add_mutually_exclusive_group()
+    as_of_group.add_argument('--as-of', metavar='DATE', type=parse_date,
+                       help='按历史日期(YYYY-MM-DD)从本地行情库重建排名表，不联网')
+    as_of_group.add_argument('--as-of-range', nargs=2, metavar=('START', 'END'), type=parse_date,
+                       help='按日期区间内的每个交易日重建排名表，不联网')
+    args = parser.parse_args()
+    
+    logger.info("="*50)
+    logger.info(f"鱼盆趋势模型启动 - 任务类型: {args.task}")
+    logger.info("="*50)
+    
+    # 加载配置
+    config = load_index_config()
+    if not config:
+        logger.error("配置加载失败，程序退出")
+        return
+    
+    # 初始化组件
+    logger.info("初始化数据源...")
+    # 常驻进程（盘中监控/daemon）在磁盘缓存前加一层按字节限额的内存缓存
+    memory_cache_bytes = config.get('memory_cache_mb', 64) * 1024 * 1024 if args.task in ('watch', 'daemon') else None
+    data_source = IndexDataSource(memory_cache_bytes=memory_cache_bytes)
+    
+    logger.info("初始化趋势分析器...")
+    analyzer = build_analyzer(args, config, data_source)
+    
+    notifier = None
+    if WECHAT_AVAILABLE and config.get('notification', {}).get('wechat_enabled', False):
+        logger.info("初始化微信通知器...")
+        notifier = WechatNotifier()
+    
+    reporter = TrendReporter(notifier)
+    
+    if args.as_of or args.as_of_range:
+        run_as_of(args, config, data_source, reporter)
+        logger.info("程序执行完成")
+        print("\n✅ 任务执行完成!")
+        return
+    
+    if args.task == 'watch':
+        # 盘中监控：批量实时行情增量更新，有变化时发布结果
+        watch_config = config.get('watch', {})
+        interval = args.interval or watch_config.get('interval', 10)
+        TrendWatcher(analyzer, config['indices'], interval=interval,
+                     minute_bars=watch_config.get('minute_bars')).run(force_refresh=args.force_refresh)
+        logger.info("程序执行完成")
+        return
+    
+    if args.task == 'daemon':
+        run_daemon(args, config, data_source, analyzer, reporter)
+        return
+    
+    run_analysis(args, config, data_source, analyzer, reporter)
     logger.info("程序执行完成")
     print("\n✅ 任务执行完成!")
 
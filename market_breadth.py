@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+市场宽度与相关性模块 - 基于本地行情历史库的对齐价格面板，向量化计算：
+每日站上均线的指数占比、每日新转YES/NO数量，最近窗口的收益率相关矩阵，
+以及逐日滚动窗口的平均两两相关系数序列
+宽度序列按交易日增量缓存，每次只计算缓存之后的新交易日
+"""
+import os
+import json
+import warnings
+import logging
+import numpy as np
+import pandas as pd
+import trend_panel
+from file_utils import write_json_atomic
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('market_breadth')
+
+
+def breadth_series(metrics):
+    """
+    按交易日汇总宽度：各指数状态按自身K线计算后对齐到统一日历并前向填充（休市沿用上一状态）
+    :param metrics: trend_panel.compute_trend_metrics返回的指标表
+    :return: DataFrame，索引为交易日，列 total/above/pct_above/new_yes/new_no
+    """
+    valid = metrics[metrics['threshold'].notna()]
+    is_yes = (valid['status'] == 'YES').astype(float)
+    prev_yes = is_yes.groupby(valid['index_code'], sort=False).shift(1)
+    flipped = prev_yes.notna() & (is_yes != prev_yes)
+
+    frame = pd.DataFrame({
+        'trade_date': valid['trade_date'],
+        'index_code': valid['index_code'],
+        'yes': is_yes,
+        'new_yes': (flipped & (is_yes == 1)).astype(int),
+        'new_no': (flipped & (is_yes == 0)).astype(int)
+    })
+    status = frame.pivot(index='trade_date', columns='index_code', values='yes').sort_index().ffill()
+    new_yes = frame.pivot(index='trade_date', columns='index_code', values='new_yes').reindex(status.index)
+    new_no = frame.pivot(index='trade_date', columns='index_code', values='new_no').reindex(status.index)
+
+    total = status.notna().sum(axis=1)
+    above = status.sum(axis=1)
+    return pd.DataFrame({
+        'total': total.astype(int),
+        'above': above.astype(int),
+        'pct_above': (above / total * 100).round(2),
+        'new_yes': new_yes.sum(axis=1).astype(int),
+        'new_no': new_no.sum(axis=1).astype(int)
+    })
+
+
+def return_panel(quotes):
+    """各指数按自身K线计算的日收益率，对齐为 交易日 x 指数 的宽表（无K线处为NaN）"""
+    returns = quotes.assign(ret=quotes.groupby('index_code', sort=False)['close'].pct_change())
+    return returns.pivot(index='trade_date', columns='index_code', values='ret').sort_index()
+
+
+def correlation_matrix(returns, window):
+    """
+    最近window个交易日的收益率相关矩阵（成对剔除缺失值）
+    :return: (相关矩阵DataFrame, 截止日期)
+    """
+    recent = returns.iloc[-window:]
+    return recent.corr(min_periods=max(window // 2, 2)), recent.index[-1]
+
+
+def average_correlation(matrix):
+    """相关矩阵的平均两两相关系数（不含对角线、忽略缺失值），无有效值时为None"""
+    values = matrix[~np.eye(len(matrix), dtype=bool)]
+    values = values[~np.isnan(values)]
+    return round(float(values.mean()), 3) if len(values) else None
+
+
+def rolling_average_correlation(returns, window, days):
+    """
+    逐日滚动相关：每个交易日以其前window个交易日的收益率计算相关矩阵，取平均两两相关系数（不含对角线）
+    :param days: 返回最近多少个交易日
+    :return: list of {'date', 'average'}，样本不足的日期average为None
+    """
+    n = returns.shape[1]
+    if n < 2 or returns.empty:
+        return []
+    recent = returns.iloc[-(days + window - 1):]
+    corr = recent.rolling(window, min_periods=max(window // 2, 2)).corr()
+    values = corr.to_numpy().reshape(len(recent), n, n)[:, ~np.eye(n, dtype=bool)]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全部缺失的日期
+        average = np.nanmean(values, axis=1)
+    return [{'date': date.strftime('%Y-%m-%d'), 'average': None if np.isnan(v) else round(float(v), 3)}
+            for date, v in zip(recent.index[-days:], average[-days:])]
+
+
+class MarketBreadth:
+    """市场宽度与相关性分析"""
+
+    def __init__(self, data_source, ma_period=20, correlation_window=60,
+                 cache_file='data/trend_status/breadth_cache.json'):
+        """
+        :param data_source: IndexDataSource实例（只读本地历史库）
+        :param ma_period: 均线周期
+        :param correlation_window: 相关矩阵的滚动窗口（交易日）
+        :param cache_file: 宽度序列缓存文件
+        """
+        self.data_source = data_source
+        self.ma_period = ma_period
+        self.correlation_window = correlation_window
+        self.cache_file = cache_file
+
+    def _load_cache(self, codes):
+        """读取缓存；均线周期或指数列表变化时失效"""
+        if not os.path.exists(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except Exception as e:
+            logger.warning(f"读取宽度缓存失败: {str(e)}")
+            return None
+        if cache.get('ma_period') != self.ma_period or cache.get('codes') != codes:
+            return None
+        return cache
+
+    def _tail_quotes(self, quotes, last_date):
+        """只保留缓存日期之后的K线，以及每个指数之前ma_period根（均线与前一状态所需）"""
+        is_new = quotes['trade_date'] > last_date
+        new_count = is_new.groupby(quotes['index_code'], sort=False).transform('sum')
+        from_end = quotes.groupby('index_code', sort=False).cumcount(ascending=False)
+        return quotes[from_end < new_count + self.ma_period]
+
+    def compute(self, index_list, series_days=60):
+        """
+        计算宽度序列与相关性
+        :param index_list: 指数列表 [{'code': 'xxx', 'name': 'xxx'}, ...]
+        :param series_days: 返回的宽度序列与滚动相关序列天数
+        :return: dict {'breadth': {'latest', 'series'}, 'correlation': {'as_of', 'matrix', 'average', 'series', ...}}，
+                 无数据时为None；matrix为截至as_of的最近窗口相关矩阵，series为逐日滚动的平均两两相关系数
+        """
+        codes = [info['code'] for info in index_list]
+        quotes = trend_panel.load_quote_panel(self.data_source, index_list)
+        if quotes.empty:
+            return None
+
+        cache = self._load_cache(codes)
+        series = cache['series'] if cache else []
+        last_date = pd.Timestamp(series[-1]['date']) if series else None
+
+        if last_date is None or quotes['trade_date'].max() > last_date:
+            window = self._tail_quotes(quotes, last_date) if last_date is not None else quotes
+            daily = breadth_series(trend_panel.compute_trend_metrics(window, self.ma_period))
+            if last_date is not None:
+                daily = daily[daily.index > last_date]
+            series = series + [dict(date=date.strftime('%Y-%m-%d'), **{k: (int(v) if k != 'pct_above' else float(v))
+                                                                       for k, v in row.items()})
+                               for date, row in daily.iterrows()]
+            logger.info(f"市场宽度新增{len(daily)}个交易日")
+
+        # 历史不足均线周期时宽度序列为空，相关性仍按收益率计算
+        latest_date = series[-1]['date'] if series else None
+        correlation = cache.get('correlation') if cache else None
+        if (correlation is None or correlation['as_of'] != latest_date
+                or correlation.get('series_days') != series_days):
+            returns = return_panel(quotes)
+            matrix, as_of = correlation_matrix(returns, self.correlation_window)
+            matrix = matrix.reindex(index=codes, columns=codes)
+            correlation = {
+                'window': self.correlation_window,
+                'as_of': as_of.strftime('%Y-%m-%d'),
+                'codes': codes,
+                'matrix': [[None if np.isnan(v) else round(float(v), 3) for v in row] for row in matrix.to_numpy()],
+                # 平均两两相关系数（不含对角线），样本不足时为None
+                'average': average_correlation(matrix.to_numpy()),
+                'series_days': series_days,
+                'series': rolling_average_correlation(returns.reindex(columns=codes), self.correlation_window,
+                                                      series_days)
+            }
+
+        try:
+            write_json_atomic(self.cache_file, {
+                'ma_period': self.ma_period,
+                'codes': codes,
+                'series': series,
+                'correlation': correlation
+            })
+        except Exception as e:
+            logger.warning(f"保存宽度缓存失败: {str(e)}")
+
+        return {
+            'breadth': {'latest': series[-1] if series else None, 'series': series[-series_days:]},
+            'correlation': correlation
+        }
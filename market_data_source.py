@@ -11,6 +11,20 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('market_data_source')
 
+# 新浪实时行情代码映射：指数代码 -> (新浪代码, 现价字段下标)
+SINA_REALTIME_SYMBOLS = {
+    'AUUSDO': ('hf_GC', 0),            # 与历史数据一致使用COMEX黄金
+    'HSI00001': ('rt_hkHSI', 6),
+    'HSCEI00': ('rt_hkHSCEI', 6),
+    'HST00011': ('rt_hkHSTECH', 6),
+    '1B0688': ('s_sh000688', 1),
+    '1B0016': ('s_sh000016', 1),
+    '1B0852': ('s_sh000852', 1),
+    '883418': ('s_sh000852', 1),       # 与历史数据一致，暂用中证1000代替
+    '932000': ('s_sh000985', 1),
+}
+
+
 class MarketDataSource:
     """市场数据源"""
 
@@ -92,4 +106,50 @@ class MarketDataSource:
             return None
         except Exception as e:
             logger.error(f"获取A股{code}价格失败: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    @staticmethod
+    def sina_realtime_symbol(index_code):
+        """
+        指数代码转换为新浪实时行情代码
+        :return: (新浪代码, 现价字段下标)，无法映射时返回None
+        """
+        if index_code in SINA_REALTIME_SYMBOLS:
+            return SINA_REALTIME_SYMBOLS[index_code]
+        if index_code.startswith(('399', '159')):
+            return f"s_sz{index_code}", 1
+        if index_code.startswith('000'):
+            return f"s_sh{index_code}", 1
+        if index_code.startswith('899'):
+            return f"s_bj{index_code}", 1
+        return None
+
+    @staticmethod
+    def get_batch_quotes(symbols):
+        """
+        批量获取新浪实时行情（一次请求）
+        :param symbols: 新浪代码列表
+        :return: dict {新浪代码: 字段列表}，失败返回空dict
+        """
+        try:
+            url = f"https://hq.sinajs.cn/list={','.join(symbols)}"
+            headers = {
+                "Referer": "https://finance.sina.com.cn",
+                "User-Agent": "Mozilla/5.0"
+            }
+            response = requests.get(url, headers=headers, timeout=10)
+            response.encoding = 'gbk'
+
+            # 每行格式：var hq_str_s_sh000688="科创50,1410.12,...";
+            quotes = {}
+            for line in response.text.splitlines():
+                if not line.startswith('var hq_str_') or '"' not in line:
+                    continue
+                symbol = line[len('var hq_str_'):line.index('=')]
+                content = line.split('"')[1]
+                if content:
+                    quotes[symbol] = content.split(',')
+            return quotes
+        except Exception as e:
+            logger.error(f"批量获取实时行情失败: {str(e)}")
+            return {}
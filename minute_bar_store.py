@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+分钟K线存储模块 - 按指数、按交易日分块保存分钟K线，并向量化重采样
+K线以列数组表示：day(datetime64[D]) / minute(int32，当日0点起的分钟数，K线结束时刻) /
+open/high/low/close/volume(float32)；每日一个npz文件，避免逐行DataFrame的内存开销
+"""
+import io
+import os
+import logging
+import numpy as np
+import pandas as pd
+from file_utils import write_bytes_atomic
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('minute_bar_store')
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+# 1分钟K线连续交易时段内相邻K线的最大间隔（分钟），超过视为新时段（如午休）；
+# 较长的基础周期按 max(SESSION_GAP, 基础周期) 判断
+SESSION_GAP = 30
+
+
+def empty_bars():
+    """空K线列数组"""
+    bars = {'day': np.empty(0, dtype='datetime64[D]'), 'minute': np.empty(0, dtype=np.int32)}
+    bars.update({field: np.empty(0, dtype=np.float32) for field in PRICE_FIELDS})
+    return bars
+
+
+def make_bars(times, open_, high, low, close, volume=None):
+    """
+    由时间与价格序列构造K线列数组（按时间排序、同一时刻保留最后一条）
+    :param times: K线结束时刻（可被pd.to_datetime解析）
+    """
+    times = pd.to_datetime(pd.Series(times)).to_numpy(dtype='datetime64[m]')
+    if volume is None:
+        volume = np.zeros(len(times))
+    columns = [np.asarray(values, dtype=np.float32) for values in (open_, high, low, close, volume)]
+    order = np.argsort(times, kind='stable')
+    times = times[order]
+    keep = np.r_[times[1:] != times[:-1], True] if len(times) else np.empty(0, dtype=bool)
+    times = times[keep]
+    day = times.astype('datetime64[D]')
+    bars = {'day': day, 'minute': (times - day).astype(np.int32)}
+    for field, values in zip(PRICE_FIELDS, columns):
+        bars[field] = values[order][keep]
+    return bars
+
+
+def concat_bars(parts):
+    """拼接多段K线列数组"""
+    parts = [p for p in parts if p is not None and len(p['minute'])]
+    if not parts:
+        return empty_bars()
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def slice_bars(bars, mask_or_index):
+    """按布尔掩码或下标选取K线"""
+    return {key: values[mask_or_index] for key, values in bars.items()}
+
+
+def _aggregate(bars, starts):
+    """按分组起点聚合：开盘取首根、收盘取末根、高低取极值、成交量求和"""
+    ends = np.r_[starts[1:], len(bars['minute'])] - 1
+    return {
+        'day': bars['day'][ends],
+        'minute': bars['minute'][ends],
+        'open': bars['open'][starts],
+        'high': np.maximum.reduceat(bars['high'], starts),
+        'low': np.minimum.reduceat(bars['low'], starts),
+        'close': bars['close'][ends],
+        'volume': np.add.reduceat(bars['volume'], starts)
+    }
+
+
+def base_interval(bars):
+    """推断基础K线周期（分钟）：同一交易日内相邻K线的最小间隔，无法推断时为1"""
+    same_day = bars['day'][1:] == bars['day'][:-1]
+    diffs = np.diff(bars['minute'])[same_day]
+    diffs = diffs[diffs > 0]
+    return int(diffs.min()) if len(diffs) else 1
+
+
+def resample_bars(bars, bar_minutes, base_minutes=None):
+    """
+    重采样为N分钟K线（K线以结束时刻标记）
+    每个连续交易时段从其开盘时刻（首根K线的开始时刻向上取整到半点）起按N分钟分段，
+    午休等间隔自动断开，与东方财富60分钟线（10:30/11:30/14:00/15:00）一致；
+    9:30集合竞价K线并入第一根
+    :param bars: 基础K线列数组（分钟数需能整除bar_minutes）
+    :param bar_minutes: 目标K线分钟数
+    :param base_minutes: 基础K线周期，默认由相邻K线间隔推断
+    """
+    n = len(bars['minute'])
+    if n == 0:
+        return empty_bars()
+    if base_minutes is None:
+        base_minutes = base_interval(bars)
+    day, minute = bars['day'], bars['minute']
+    gap = max(SESSION_GAP, base_minutes)
+    new_session = np.r_[True, (day[1:] != day[:-1]) | (np.diff(minute) > gap)]
+
+    session_id = np.cumsum(new_session) - 1
+    session_open = (-(-(minute[new_session] - base_minutes) // 30) * 30)[session_id]
+    bucket = np.maximum(-(-(minute - session_open) // bar_minutes), 1)
+    boundary = new_session | np.r_[True, bucket[1:] != bucket[:-1]]
+    return _aggregate(bars, np.flatnonzero(boundary))
+
+
+def daily_bars(bars):
+    """按交易日聚合为日K线；当日未收盘时最后一根即为临时日K线"""
+    if len(bars['minute']) == 0:
+        return empty_bars()
+    day = bars['day']
+    return _aggregate(bars, np.flatnonzero(np.r_[True, day[1:] != day[:-1]]))
+
+
+class MinuteBarStore:
+    """分钟K线本地存储：{path}/{指数代码}/{YYYYMMDD}_{klt}m.npz"""
+
+    def __init__(self, path='data/index_quote/minute'):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    def _day_file(self, index_code, day, klt):
+        """单日分块文件路径"""
+        return os.path.join(self.path, index_code, f"{pd.Timestamp(day):%Y%m%d}_{klt}m.npz")
+
+    def days(self, index_code, klt):
+        """已存储的交易日（升序）"""
+        code_path = os.path.join(self.path, index_code)
+        if not os.path.isdir(code_path):
+            return []
+        suffix = f"_{klt}m.npz"
+        return sorted(pd.Timestamp(name[:8]) for name in os.listdir(code_path)
+                      if name.endswith(suffix) and name[:8].isdigit())
+
+    def load_day(self, index_code, day, klt):
+        """读取单日分块，不存在时为None"""
+        day_file = self._day_file(index_code, day, klt)
+        if not os.path.exists(day_file):
+            return None
+        try:
+            with np.load(day_file) as data:
+                minute = data['minute']
+                bars = {'day': np.full(len(minute), np.datetime64(pd.Timestamp(day).date(), 'D')),
+                        'minute': minute}
+                bars.update({field: data[field] for field in PRICE_FIELDS})
+                return bars
+        except Exception as e:
+            logger.warning(f"读取{index_code}分钟K线{day_file}失败: {str(e)}")
+            return None
+
+    def load(self, index_code, klt, start_day=None, end_day=None, last_days=None):
+        """
+        读取区间内的分钟K线
+        :param start_day: 起始日（含），None为不限
+        :param end_day: 结束日（含），None为不限
+        :param last_days: 只取最近若干个交易日
+        :return: K线列数组
+        """
+        days = self.days(index_code, klt)
+        if start_day is not None:
+            days = [d for d in days if d >= pd.Timestamp(start_day).normalize()]
+        if end_day is not None:
+            days = [d for d in days if d <= pd.Timestamp(end_day).normalize()]
+        if last_days:
+            days = days[-last_days:]
+        return concat_bars([self.load_day(index_code, d, klt) for d in days])
+
+    def save(self, index_code, klt, bars):
+        """
+        按交易日分块合并写入（同一时刻新数据优先），已完整且无变化的分块不重写
+        :return: 写入的分块数
+        """
+        if len(bars['minute']) == 0:
+            return 0
+        day = bars['day']
+        starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+        ends = np.r_[starts[1:], len(day)]
+        written = 0
+        for start, end in zip(starts, ends):
+            part = slice_bars(bars, slice(start, end))
+            existing = self.load_day(index_code, day[start], klt)
+            if existing is not None:
+                keep = ~np.isin(existing['minute'], part['minute'])
+                part = concat_bars([slice_bars(existing, keep), part])
+                order = np.argsort(part['minute'], kind='stable')
+                part = slice_bars(part, order)
+                if all(np.array_equal(part[key], existing[key]) for key in ('minute',) + PRICE_FIELDS):
+                    continue
+            buffer = io.BytesIO()
+            np.savez_compressed(buffer, minute=part['minute'].astype(np.int32),
+                                **{field: part[field].astype(np.float32) for field in PRICE_FIELDS})
+            write_bytes_atomic(self._day_file(index_code, day[start], klt), buffer.getvalue())
+            written += 1
+        return written
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+行情内存缓存模块 - 常驻进程（daemon/watch）中位于磁盘缓存之前的LRU缓存
+按占用字节数（而非条目数）限制总大小；条目与其来源磁盘文件的修改时间绑定，
+文件被本进程或其他进程更新后自动失效
+"""
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('quote_cache')
+
+
+class QuoteMemoryCache:
+    """按字节限额的LRU行情缓存，键为 (指数代码, ...)"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        :param max_bytes: 缓存总字节数上限
+        """
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (DataFrame, 文件修改时间, 字节数)
+        self._lock = threading.Lock()
+
+    def get(self, key, path, max_age=None):
+        """
+        读取缓存：来源文件不存在、已被改写或超过max_age秒时视为未命中
+        :return: DataFrame副本，未命中为None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    mtime = None
+                if mtime != entry[1]:
+                    self._remove(key)
+                    entry = None
+                elif max_age is not None and time.time() - mtime >= max_age:
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].copy()
+
+    def put(self, key, path, df):
+        """写入缓存（记录来源文件当前的修改时间），超出上限时淘汰最久未使用的条目"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (df.copy(), mtime, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, index_code):
+        """删除某指数的全部条目（磁盘数据已更新）"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == index_code]:
+                self._remove(key)
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def stats(self):
+        """命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+结果发布模块 - 分析过程中每完成一个指数就原子写入一次中间快照
+快照顶层 partial=true，已完成的行按当前排名在前（done=true），未完成的行只有代码与名称（done=false）；
+快照写入单独的文件，不覆盖上次的完整结果：全部完成后由主程序写入最终排名结果（partial=false）并删除快照，
+运行中止时只删除快照，上次的完整结果保持不变
+另有运行进度文件，记录网页刷新任务的进度（已完成数、正在获取的指数与数据源）
+"""
+import os
+import logging
+from datetime import datetime
+from index_trend_analyzer import IndexTrendAnalyzer
+from file_utils import write_text_atomic, write_json_atomic
+from trend_result import TrendResult, dumps_document
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('result_publisher')
+
+
+class ProgressivePublisher:
+    """逐个指数发布结果快照"""
+
+    def __init__(self, snapshot_file, index_list):
+        """
+        :param snapshot_file: 中间快照文件（不能是最终结果文件）
+        :param index_list: 指数列表 [{'code': 'xxx', 'name': 'xxx'}, ...]
+        """
+        self.snapshot_file = snapshot_file
+        self.index_list = index_list
+        self.finished = {}  # 指数代码 -> 结果（失败为None）
+
+    def add(self, index_info, result):
+        """一个指数分析完成（可作为analyze_all_indices的on_result回调）"""
+        self.finished[index_info['code']] = result
+        try:
+            self.publish()
+        except Exception as e:
+            logger.warning(f"发布中间结果失败: {str(e)}")
+
+    def snapshot(self):
+        """当前快照：已完成的行按排名在前，未完成的行在后"""
+        done = IndexTrendAnalyzer.rank_results([TrendResult(r) for r in self.finished.values() if r])
+        for row in done:
+            row['done'] = True
+        pending = [TrendResult(index_code=info['code'], index_name=info['name'], done=False)
+                   for info in self.index_list if info['code'] not in self.finished]
+        return {
+            'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'partial': True,
+            'completed': len(self.finished),
+            'total': len(self.index_list),
+            'results': done + pending
+        }
+
+    def publish(self):
+        """原子写入当前快照"""
+        write_text_atomic(self.snapshot_file, dumps_document(self.snapshot()))
+
+    def discard(self):
+        """删除中间快照（最终结果已写入或运行中止）"""
+        try:
+            os.remove(self.snapshot_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"删除中间结果失败: {str(e)}")
+
+
+class RunProgress:
+    """运行进度文件，供网页的任务状态接口读取"""
+
+    def __init__(self, progress_file, job_id, total):
+        """
+        :param progress_file: 进度文件
+        :param job_id: 网页刷新任务ID（命令行运行为None）
+        :param total: 指数总数
+        """
+        self.progress_file = progress_file
+        self.state = {'job_id': job_id, 'stage': 'fetching', 'done': 0, 'total': total,
+                      'current': None, 'provider': None}
+        self._write()
+
+    def _write(self):
+        try:
+            write_json_atomic(self.progress_file, dict(self.state, update_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        except Exception as e:
+            logger.warning(f"写入运行进度失败: {str(e)}")
+
+    def track(self, quote_stream):
+        """包装行情流，记录每个指数行情的实际数据源"""
+        for index_info, df in quote_stream:
+            self.state.update(current=index_info['name'],
+                              provider=df.attrs.get('provider') if df is not None else None)
+            self._write()
+            yield index_info, df
+
+    def add(self, index_info, result):
+        """一个指数分析完成"""
+        self.state['done'] += 1
+        self._write()
+
+    def stage(self, stage):
+        """进入下一阶段（breadth/saving/finished/unchanged）"""
+        self.state.update(stage=stage, current=None)
+        self._write()
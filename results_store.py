@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+历史结果库模块 - 每次分析的完整结果追加存入本地SQLite（WAL模式）
+按运行时间与交易日建索引，支持按日期区间、按指数快速查询历史排名
+"""
+import os
+import json
+import sqlite3
+import logging
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('results_store')
+
+# 结果中有独立列的字段，其余字段存入extra（JSON），新增字段无需改表
+RESULT_COLUMNS = [
+    'rank', 'index_code', 'index_name', 'status', 'price_change_pct', 'current_price',
+    'threshold', 'deviation_rate', 'status_change_time', 'interval_change_pct',
+    'trade_date', 'update_time'
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_time TEXT NOT NULL,
+    trade_date TEXT,
+    summary TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    rank INTEGER,
+    index_code TEXT NOT NULL,
+    index_name TEXT,
+    status TEXT,
+    price_change_pct REAL,
+    current_price REAL,
+    threshold REAL,
+    deviation_rate REAL,
+    status_change_time TEXT,
+    interval_change_pct REAL,
+    trade_date TEXT,
+    update_time TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_trade_date ON runs(trade_date, run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_run_time ON runs(run_time);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id, rank);
+CREATE INDEX IF NOT EXISTS idx_results_code_date ON results(index_code, trade_date, run_id);
+"""
+
+
+class ResultsStore:
+    """历史结果库"""
+
+    def __init__(self, db_path='data/trend_status/trend_results.db'):
+        """
+        :param db_path: SQLite数据库文件路径
+        """
+        self.db_path = str(db_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        """WAL模式连接：写入不阻塞并发读取"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @staticmethod
+    def _row_to_result(row):
+        result = {col: row[col] for col in RESULT_COLUMNS}
+        if row['extra']:
+            result.update(json.loads(row['extra']))
+        return result
+
+    def save_run(self, results, summary=None, run_time=None):
+        """
+        追加一次运行的完整结果
+        :param results: 分析结果列表
+        :param summary: 摘要信息
+        :param run_time: 运行时间，默认当前时间
+        :return: run_id
+        """
+        run_time = run_time or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        trade_dates = [r.get('trade_date') for r in results if r.get('trade_date')]
+        trade_date = max(trade_dates) if trade_dates else run_time[:10]
+
+        rows = []
+        for r in results:
+            extra = {k: v for k, v in r.items() if k not in RESULT_COLUMNS}
+            rows.append([r.get(col) for col in RESULT_COLUMNS] + [json.dumps(extra, ensure_ascii=False) if extra else None])
+
+        conn = self._connect()
+        try:
+            with conn:
+                cur = conn.execute(
+                    'INSERT INTO runs (run_time, trade_date, summary) VALUES (?, ?, ?)',
+                    (run_time, trade_date, json.dumps(summary, ensure_ascii=False) if summary else None)
+                )
+                run_id = cur.lastrowid
+                conn.executemany(
+                    f"INSERT INTO results (run_id, {', '.join(RESULT_COLUMNS)}, extra) "
+                    f"VALUES (?, {', '.join('?' * len(RESULT_COLUMNS))}, ?)",
+                    [[run_id] + row for row in rows]
+                )
+        finally:
+            conn.close()
+        logger.info(f"结果已存入历史库，run_id={run_id}，交易日{trade_date}，共{len(rows)}条")
+        return run_id
+
+    def get_runs(self, start_date=None, end_date=None):
+        """
+        按交易日区间列出运行记录
+        :param start_date: 开始交易日 (YYYY-MM-DD)，可选
+        :param end_date: 结束交易日 (YYYY-MM-DD)，可选
+        :return: list of {'run_id', 'run_time', 'trade_date', 'summary'}
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT run_id, run_time, trade_date, summary FROM runs '
+                'WHERE trade_date >= ? AND trade_date <= ? ORDER BY trade_date, run_id',
+                (start_date or '0000-00-00', end_date or '9999-99-99')
+            ).fetchall()
+        finally:
+            conn.close()
+        return [{
+            'run_id': row['run_id'],
+            'run_time': row['run_time'],
+            'trade_date': row['trade_date'],
+            'summary': json.loads(row['summary']) if row['summary'] else None
+        } for row in rows]
+
+    def get_run(self, run_id):
+        """
+        读取某次运行的完整结果
+        :return: dict {'run_id', 'run_time', 'trade_date', 'summary', 'results'}，不存在时返回None
+        """
+        conn = self._connect()
+        try:
+            run = conn.execute('SELECT * FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+            if run is None:
+                return None
+            rows = conn.execute('SELECT * FROM results WHERE run_id = ? ORDER BY rank', (run_id,)).fetchall()
+        finally:
+            conn.close()
+        return {
+            'run_id': run['run_id'],
+            'run_time': run['run_time'],
+            'trade_date': run['trade_date'],
+            'summary': json.loads(run['summary']) if run['summary'] else None,
+            'results': [self._row_to_result(row) for row in rows]
+        }
+
+    def get_results_by_date(self, trade_date):
+        """
+        某交易日的排名（取该交易日最后一次运行）
+        :param trade_date: 交易日 (YYYY-MM-DD)
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT MAX(run_id) AS run_id FROM runs WHERE trade_date = ?', (trade_date,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return self.get_run(row['run_id']) if row and row['run_id'] is not None else None
+
+    def get_index_history(self, index_code, start_date=None, end_date=None):
+        """
+        某指数在交易日区间内的历史结果（每个交易日取最后一次运行）
+        :param index_code: 指数代码
+        :param start_date: 开始交易日 (YYYY-MM-DD)，可选
+        :param end_date: 结束交易日 (YYYY-MM-DD)，可选
+        :return: list of 结果dict，按交易日升序
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT r.* FROM results r JOIN ('
+                '  SELECT trade_date, MAX(run_id) AS run_id FROM results'
+                '  WHERE index_code = ? AND trade_date >= ? AND trade_date <= ?'
+                '  GROUP BY trade_date'
+                ') last ON r.run_id = last.run_id AND r.trade_date = last.trade_date '
+                'WHERE r.index_code = ? ORDER BY r.trade_date',
+                (index_code, start_date or '0000-00-00', end_date or '9999-99-99', index_code)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_result(row) for row in rows]
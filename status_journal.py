@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+状态转换日志模块 - 追加写入的状态转换记录
+替代整体重写的 trend_status_history.json：
+- status_journal.jsonl：每行一条状态转换，只追加，单次write写入整批记录
+- status_snapshot.json：压缩快照（各指数最新状态 + 按代码/按日期的行偏移索引），原子替换写入
+启动时加载快照，再只解析快照之后追加的日志尾部
+"""
+import os
+import json
+import logging
+from datetime import datetime
+from file_utils import write_json_atomic
+
+try:
+    import fcntl  # 仅POSIX可用，Windows下退化为O_APPEND单次写入
+except ImportError:
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('status_journal')
+
+
+def date_key(date):
+    """
+    统一日期键为 YYYY-MM-DD
+    :param date: '2025.7.8' / '2025-07-08' / datetime
+    """
+    if hasattr(date, 'strftime'):
+        return date.strftime('%Y-%m-%d')
+    parts = str(date).replace('-', '.').replace('/', '.').split('.')
+    return f"{int(parts[0]):04d}-{int(parts[1]):02d}-{int(parts[2]):02d}"
+
+
+def is_change_date(value):
+    """是否为确定的转换日期（转换时间未知的记录不写入日志、不建日期索引）"""
+    if not value:
+        return False
+    try:
+        date_key(value)
+    except (ValueError, IndexError):
+        return False
+    return True
+
+
+class StatusJournal:
+    """状态转换日志"""
+
+    def __init__(self, status_path='data/trend_status', compact_every=50):
+        """
+        :param status_path: 状态文件目录
+        :param compact_every: 快照之后累计多少行日志时重新生成快照
+        """
+        os.makedirs(status_path, exist_ok=True)
+        self.journal_file = os.path.join(status_path, 'status_journal.jsonl')
+        self.snapshot_file = os.path.join(status_path, 'status_snapshot.json')
+        self.lock_file = os.path.join(status_path, 'status_journal.lock')
+        self.compact_every = compact_every
+
+        self.offset = 0          # 已解析的日志字节数
+        self.snapshot_offset = 0  # 快照覆盖到的日志字节数
+        self.latest = {}         # 指数代码 -> 最新一条记录
+        self.by_code = {}        # 指数代码 -> [行偏移]
+        self.by_date = {}        # YYYY-MM-DD -> [行偏移]
+        self.tail_lines = 0      # 快照之后的日志行数
+        self._load()
+
+    def _load(self):
+        """加载快照并追读日志尾部"""
+        if os.path.exists(self.snapshot_file):
+            try:
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                journal_size = os.path.getsize(self.journal_file) if os.path.exists(self.journal_file) else 0
+                # 日志被截断或替换时快照失效，从头重建
+                if snapshot.get('offset', 0) <= journal_size:
+                    self.offset = self.snapshot_offset = snapshot['offset']
+                    self.latest = snapshot['latest']
+                    self.by_code = snapshot['by_code']
+                    self.by_date = snapshot['by_date']
+            except Exception as e:
+                logger.warning(f"加载状态快照失败，将从日志重建: {str(e)}")
+                self.offset = self.snapshot_offset = 0
+                self.latest, self.by_code, self.by_date = {}, {}, {}
+        self._read_tail()
+
+    def _index_entry(self, entry, offset):
+        if not is_change_date(entry.get('status_change_time')):
+            return
+        code = entry['index_code']
+        self.latest[code] = entry
+        self.by_code.setdefault(code, []).append(offset)
+        self.by_date.setdefault(date_key(entry['status_change_time']), []).append(offset)
+        if offset >= self.snapshot_offset:
+            self.tail_lines += 1
+
+    def _read_tail(self):
+        """解析上次读取位置之后追加的完整行（末尾未写完的行留待下次）"""
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        pos = 0
+        while True:
+            end = data.find(b'\n', pos)
+            if end < 0:
+                break
+            line = data[pos:end]
+            if line.strip():
+                try:
+                    self._index_entry(json.loads(line), self.offset + pos)
+                except Exception as e:
+                    logger.warning(f"跳过损坏的日志行@{self.offset + pos}: {str(e)}")
+            pos = end + 1
+        self.offset += pos
+
+    def refresh(self):
+        """追读其他进程新追加的记录"""
+        self._read_tail()
+
+    def append(self, entries):
+        """
+        追加状态转换记录（与该指数最新记录相同的重复转换、转换时间未知的记录会被忽略）
+        :param entries: [{'index_code', 'status', 'status_change_time', 'status_change_price'}, ...]
+        :return: 实际写入的条数
+        """
+        lock_fd = os.open(self.lock_file, os.O_CREAT | os.O_RDWR)
+        try:
+            if fcntl:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            # 加锁后先追上其他进程写入的记录，再去重
+            self._read_tail()
+            recorded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            new_entries = []
+            for entry in entries:
+                if not is_change_date(entry.get('status_change_time')):
+                    continue
+                last = self.latest.get(entry['index_code'])
+                if last and last['status'] == entry['status'] and last['status_change_time'] == entry['status_change_time']:
+                    continue
+                new_entries.append(dict(entry, recorded_at=recorded_at))
+            if not new_entries:
+                return 0
+
+            lines = [json.dumps(e, ensure_ascii=False).encode('utf-8') + b'\n' for e in new_entries]
+            fd = os.open(self.journal_file, os.O_CREAT | os.O_WRONLY | os.O_APPEND)
+            try:
+                offset = os.fstat(fd).st_size
+                os.write(fd, b''.join(lines))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            for entry, line in zip(new_entries, lines):
+                self._index_entry(entry, offset)
+                offset += len(line)
+            self.offset = offset
+
+            if self.tail_lines >= self.compact_every:
+                self.compact()
+            return len(new_entries)
+        finally:
+            if fcntl:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+
+    def compact(self):
+        """生成压缩快照（原子替换）"""
+        write_json_atomic(self.snapshot_file, {
+            'offset': self.offset,
+            'latest': self.latest,
+            'by_code': self.by_code,
+            'by_date': self.by_date
+        })
+        self.snapshot_offset = self.offset
+        self.tail_lines = 0
+        logger.info(f"状态快照已更新，日志偏移{self.offset}")
+
+    def _read_at(self, offsets):
+        """按行偏移读取记录"""
+        entries = []
+        if not offsets:
+            return entries
+        with open(self.journal_file, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                entries.append(json.loads(f.readline()))
+        return entries
+
+    def latest_status(self):
+        """各指数最新状态，格式与历史状态记录一致"""
+        return {
+            code: {
+                'status': e['status'],
+                'status_change_time': e['status_change_time'],
+                'status_change_price': e['status_change_price']
+            }
+            for code, e in self.latest.items()
+        }
+
+    def flips_for_code(self, index_code):
+        """某指数的全部状态转换记录（按时间顺序）"""
+        return self._read_at(self.by_code.get(index_code, []))
+
+    def flips_on_date(self, date):
+        """某日发生的全部状态转换记录"""
+        return self._read_at(sorted(self.by_date.get(date_key(date), [])))
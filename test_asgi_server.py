@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+ASGI服务测试：各接口的路由与方法、预压缩响应的ETag/304与HEAD、刷新限流、静态文件，以及推送连接的首个快照
+"""
+import asyncio
+import gzip
+import json
+import os
+
+import pytest
+
+import asgi_server
+import server
+from result_cache import FileCache
+
+DATA = {'update_time': '2025-07-10 15:30:00',
+        'results': [{'rank': i, 'index_code': f'{i:06d}', 'index_name': f'指数{i}', 'status': 'YES'}
+                    for i in range(1, 60)]}
+
+
+class Response:
+    def __init__(self, messages):
+        start = messages[0]
+        self.status = start['status']
+        self.headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in start['headers']}
+        self.body = b''.join(m.get('body', b'') for m in messages[1:])
+
+    def json(self):
+        return json.loads(self.body)
+
+
+async def request(method, path, query='', headers=None, body=b'', disconnect_after=None):
+    """以ASGI方式调用app，disconnect_after秒后模拟客户端断开"""
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode('utf-8'),
+             'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in (headers or {}).items()],
+             'client': ('1.2.3.4', 50000)}
+    incoming = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    messages = []
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        if disconnect_after is None:
+            await asyncio.Event().wait()  # 普通请求只读取一次请求体
+        await asyncio.sleep(disconnect_after)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi_server.app(scope, receive, send)
+    return Response(messages)
+
+
+def call(*args, **kwargs):
+    return asyncio.run(request(*args, **kwargs))
+
+
+@pytest.fixture
+def latest(monkeypatch, tmp_path):
+    path = tmp_path / 'latest.json'
+    path.write_text(json.dumps(DATA, ensure_ascii=False), encoding='utf-8')
+    cache = FileCache([path], lambda: json.loads(path.read_text(encoding='utf-8')))
+    monkeypatch.setattr(server, 'latest_cache', cache)
+    return path
+
+
+def test_latest_etag_head_and_errors(latest):
+    plain = call('GET', '/api/latest')
+    assert plain.status == 200 and plain.json()['data'] == DATA
+    assert plain.headers['content-type'] == 'application/json'
+    assert plain.headers['x-content-type-options'] == 'nosniff'
+    etag = plain.headers['etag']
+    not_modified = call('GET', '/api/latest', headers={'If-None-Match': etag})
+    assert (not_modified.status, not_modified.body) == (304, b'')
+
+    zipped = call('GET', '/api/latest', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['content-encoding'] == 'gzip' and zipped.headers['etag'] != etag
+    assert json.loads(gzip.decompress(zipped.body))['data'] == DATA
+    head = call('HEAD', '/api/latest', headers={'Accept-Encoding': 'gzip'})
+    assert head.body == b'' and head.headers['content-length'] == str(len(zipped.body))
+
+    # 查询参数与Flask版本一致：分页、参数错误为400
+    page = call('GET', '/api/latest', query='status=YES&limit=2')
+    assert [r['rank'] for r in page.json()['data']['results']] == [1, 2]
+    assert call('GET', '/api/latest', query='limit=0').status == 400
+    os.remove(latest)
+    assert call('GET', '/api/latest').status == 404
+
+
+def test_api_routes_and_methods(monkeypatch, latest):
+    calls = []
+    monkeypatch.setattr(server.refresh_limiter, 'hit', lambda client: (True, None))
+    monkeypatch.setattr(server, 'refresh', lambda payload: (calls.append(payload) or {'ok': True}, 202))
+    monkeypatch.setattr(server, 'job_status', lambda job_id: ({'ok': True, 'id': job_id}, 200))
+    monkeypatch.setattr(server, 'history_query', lambda args: ({'ok': True, 'args': args}, 200))
+
+    assert call('POST', '/api/refresh', body=b'{"run": true}').status == 202
+    assert call('POST', '/api/refresh', body=b'not json').status == 202
+    assert calls == [{'run': True}, {}]
+    assert call('GET', '/api/jobs/abc').json() == {'ok': True, 'id': 'abc'}
+    assert call('GET', '/api/history', query='code=399300&code=000300').json()['args'] == {'code': '399300'}
+    for method, path in (('GET', '/api/refresh'), ('POST', '/api/latest'), ('DELETE', '/api/history'),
+                         ('PUT', '/index.html')):
+        assert call(method, path).status == 405
+
+    # 刷新超出频率限制
+    monkeypatch.setattr(server.refresh_limiter, 'hit', lambda client: (False, 30))
+    limited = call('POST', '/api/refresh')
+    assert limited.status == 429 and limited.headers['retry-after'] == '30'
+    assert len(calls) == 2
+
+
+def test_static_files():
+    page = call('GET', '/')
+    assert page.status == 200 and page.headers['cache-control'] == 'no-cache'
+    assert page.headers['content-type'] == 'text/html; charset=utf-8'
+    assert call('GET', '/', headers={'If-None-Match': page.headers['etag']}).status == 304
+    assert call('GET', '/no-such-file.js').status == 404
+    assert call('GET', '/../server.py').status == 404
+
+
+def test_stream_sends_snapshot(monkeypatch, latest):
+    async def run():
+        broadcaster = asgi_server.ResultBroadcaster(server.latest_cache, interval=0.05)
+        monkeypatch.setattr(asgi_server, 'broadcaster', broadcaster)
+        try:
+            return await request('GET', '/api/stream', disconnect_after=0.3)
+        finally:
+            await broadcaster.stop()
+
+    response = asyncio.run(run())
+    assert response.status == 200 and response.headers['content-type'] == 'text/event-stream; charset=utf-8'
+    version = server.latest_cache.get().version
+    assert response.body.startswith(b'retry: 3000\n\n')
+    assert response.body.count(b'event: snapshot') == 1 and f'id: {version}'.encode() in response.body
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+成分股宽度测试：只回补均线窗口内确有缺失的股票，收盘前的当日价格不写入面板
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import constituent_breadth
+from constituent_breadth import ConstituentBreadth, ConstituentPanel
+
+CALENDAR = pd.bdate_range('2025-07-01', periods=8)
+SECIDS = ['0.000001', '0.000002', '1.600000']
+
+
+class Clock(datetime):
+    current = datetime(2025, 7, 10, 16, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+class FakeBreadth(ConstituentBreadth):
+    """成分股名单与日线由测试给定"""
+
+    def __init__(self, panel_path, members):
+        super().__init__({'399300': 'b:BK0500'}, ma_period=5, max_workers=2, panel_path=panel_path)
+        self.members = members
+        self.fetched = []
+
+    def fetch_members(self, fs):
+        return self.members
+
+    def _fetch_closes(self, secid):
+        self.fetched.append(secid)
+        return secid, [(f'{day:%Y-%m-%d}', '10.0') for day in CALENDAR]
+
+
+def seed_panel(path, days):
+    panel = ConstituentPanel(str(path))
+    for secid in SECIDS:
+        panel.upsert([secid] * len(days), days, np.full(len(days), 10.0))
+    panel.save()
+
+
+def members(day, prices=(11.0, 9.0, 12.0)):
+    return pd.DataFrame({'secid': SECIDS, 'price': prices, 'trade_date': pd.Timestamp(day)})
+
+
+def test_only_incomplete_constituents_are_backfilled(tmp_path, monkeypatch):
+    monkeypatch.setattr(constituent_breadth, 'datetime', Clock)
+    Clock.current = datetime(2025, 7, 10, 16, 0)
+    path = tmp_path / 'panel.npz'
+    seed_panel(path, CALENDAR[:-1])
+    panel = ConstituentPanel(str(path))
+    panel.closes[panel.dates.tolist().index(CALENDAR[-3].date()), 1] = np.nan  # 一只股票某日停牌数据缺失
+    panel.save()
+
+    breadth = FakeBreadth(str(path), members(CALENDAR[-1]))
+    breadth.update(CALENDAR)
+    assert breadth.fetched == ['0.000002']
+    # 收盘后最新价作为当日收盘价写入面板，下次运行无需回补
+    again = FakeBreadth(str(path), members(CALENDAR[-1]))
+    again.update(CALENDAR)
+    assert again.fetched == []
+    assert ConstituentPanel(str(path)).dates[-1] == np.datetime64(CALENDAR[-1].date())
+
+
+def test_intraday_price_is_not_saved(tmp_path, monkeypatch):
+    monkeypatch.setattr(constituent_breadth, 'datetime', Clock)
+    Clock.current = datetime(2025, 7, 10, 10, 30)
+    path = tmp_path / 'panel.npz'
+    seed_panel(path, CALENDAR[:-1])
+
+    breadth = FakeBreadth(str(path), members(CALENDAR[-1]))
+    members_by_index = breadth.update(CALENDAR)
+    assert breadth.fetched == []
+    # 本次计算用当日最新价，面板文件只保留已收盘的交易日
+    assert breadth.compute(members_by_index)['399300'] == {'constituent_breadth': 66.67, 'constituent_count': 3}
+    assert ConstituentPanel(str(path)).dates[-1] == np.datetime64(CALENDAR[-2].date())
+
+    # 收盘后再运行，当日价格写入面板
+    Clock.current = datetime(2025, 7, 10, 15, 30)
+    FakeBreadth(str(path), members(CALENDAR[-1], prices=(9.0, 9.0, 9.0))).update(CALENDAR)
+    saved = ConstituentPanel(str(path))
+    assert saved.dates[-1] == np.datetime64(CALENDAR[-1].date())
+    assert np.allclose(saved.closes[-1], 9.0)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+网页刷新任务测试：并发请求合并、失败记录、失效任务回收、运行进度合并，以及常驻进程不可用时回退子进程
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from job_manager import JobManager
+
+
+def wait_finished(manager, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job['status'] != 'running':
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def make_manager(tmp_path, runner, **kwargs):
+    return JobManager(tmp_path / 'jobs.json', tmp_path / 'progress.json', runner, **kwargs)
+
+
+def test_concurrent_submits_share_one_job(tmp_path):
+    release = threading.Event()
+    calls = []
+
+    def runner(job_id):
+        calls.append(job_id)
+        release.wait(5)
+        return {'count': 3}
+
+    manager = make_manager(tmp_path, runner)
+    job, merged = manager.submit()
+    again, merged_again = manager.submit()
+    assert (merged, merged_again) == (False, True)
+    assert again['id'] == job['id']
+    release.set()
+    finished = wait_finished(manager, job['id'])
+    assert finished['status'] == 'done' and finished['result'] == {'count': 3}
+    assert calls == [job['id']] and 'pid' not in finished
+    # 任务结束后的新请求开始新任务
+    assert manager.submit()[0]['id'] != job['id']
+
+
+def test_failed_runner_is_recorded(tmp_path):
+    def runner(job_id):
+        raise RuntimeError('main_trend.py exited with code 1')
+
+    manager = make_manager(tmp_path, runner)
+    job, _ = manager.submit()
+    finished = wait_finished(manager, job['id'])
+    assert finished['status'] == 'failed'
+    assert finished['error'] == 'main_trend.py exited with code 1'
+
+
+@pytest.mark.parametrize('lost', ['timed_out', 'dead_pid'])
+def test_stale_job_is_replaced(tmp_path, lost):
+    manager = make_manager(tmp_path, lambda job_id: None, stale_seconds=60)
+    if lost == 'dead_pid':
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        pid, started = process.pid, time.time()
+    else:
+        pid, started = os.getpid(), time.time() - 120
+    stale = {'id': 'stale', 'status': 'running', 'created_time': '2025-07-10 15:00:00', 'started': started,
+             'pid': pid}
+    with open(manager.state_file, 'w', encoding='utf-8') as f:
+        json.dump({'active': 'stale', 'jobs': {'stale': stale}}, f)
+    assert manager.get('stale')['status'] == 'failed'
+    job, merged = manager.submit()
+    assert not merged and job['id'] != 'stale'
+    with open(manager.state_file, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    assert state['jobs']['stale']['status'] == 'failed'
+    wait_finished(manager, job['id'])
+
+
+def test_running_job_includes_progress(tmp_path):
+    release = threading.Event()
+    manager = make_manager(tmp_path, lambda job_id: release.wait(5))
+    job, _ = manager.submit()
+    progress = {'job_id': job['id'], 'stage': 'fetching', 'done': 2, 'total': 5, 'current': '沪深300',
+                'provider': 'sina', 'update_time': '2025-07-10 15:00:00'}
+    with open(manager.progress_file, 'w', encoding='utf-8') as f:
+        json.dump(progress, f)
+    assert manager.get(job['id'])['progress'] == {key: progress[key]
+                                                  for key in ('stage', 'done', 'total', 'current', 'provider')}
+    # 其他任务的进度不合并
+    with open(manager.progress_file, 'w', encoding='utf-8') as f:
+        json.dump(dict(progress, job_id='other'), f)
+    assert 'progress' not in manager.get(job['id'])
+    release.set()
+    assert 'progress' not in wait_finished(manager, job['id'])
+    assert manager.get('missing') is None
+
+
+@pytest.mark.parametrize('error', [ConnectionRefusedError(), socket.timeout('timed out'), FileNotFoundError()])
+def test_run_main_falls_back_to_subprocess(monkeypatch, error):
+    import server
+
+    def request_daemon(*args, **kwargs):
+        raise error
+
+    commands = []
+
+    def run(command, cwd=None, timeout=None, env=None):
+        commands.append((command, timeout))
+        return subprocess.CompletedProcess(command, 0)
+
+    monkeypatch.setattr(server, 'request_daemon', request_daemon)
+    monkeypatch.setattr(server.subprocess, 'run', run)
+    monkeypatch.delenv('TZ', raising=False)  # run_main设置的时区在测试结束后还原
+    assert server.run_main('abc') is None
+    assert commands == [([os.environ.get('PYTHON', 'python'), str(server.MAIN_PY), '--job-id', 'abc'],
+                         server.RUN_TIMEOUT)]
+    # 只有一段会等满RUN_TIMEOUT
+    assert server.RUN_TIMEOUT < server.jobs.stale_seconds < 2 * server.RUN_TIMEOUT
+
+
+def test_daemon_without_response_fails_job(monkeypatch):
+    import server
+    from trend_daemon import request_daemon
+
+    # 常驻进程接受连接后不响应：任务失败，不再另起子进程重复计算
+    listener = socket.create_server(('127.0.0.1', 0))
+    port = listener.getsockname()[1]
+    monkeypatch.setattr(server, 'DAEMON_PORT', port)
+    monkeypatch.setattr(server, 'request_daemon',
+                        lambda message, **kwargs: request_daemon(message, **dict(kwargs, timeout=0.2)))
+    monkeypatch.setattr(server.subprocess, 'run', lambda *args, **kwargs: pytest.fail('不应回退为子进程'))
+    try:
+        with pytest.raises(RuntimeError, match='did not respond'):
+            server.run_main('abc')
+    finally:
+        listener.close()
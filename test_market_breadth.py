@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+市场宽度测试：空宽度序列不报错、滚动相关序列与逐窗口计算一致、增量缓存
+"""
+import numpy as np
+import pandas as pd
+
+from market_breadth import MarketBreadth, return_panel, rolling_average_correlation
+
+INDICES = [{'code': 'A', 'name': 'a'}, {'code': 'B', 'name': 'b'}, {'code': 'C', 'name': 'c'}]
+
+
+class FakeSource:
+    def __init__(self, days, seed=0):
+        rng = np.random.default_rng(seed)
+        dates = pd.bdate_range('2025-01-02', periods=days)
+        self.history = {
+            info['code']: pd.DataFrame({'trade_date': dates,
+                                        'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))})
+            for info in INDICES
+        }
+
+    def load_history(self, index_code):
+        return self.history[index_code]
+
+
+def test_empty_breadth_series(tmp_path):
+    # 历史不足均线周期：宽度序列为空，不应抛出IndexError
+    breadth = MarketBreadth(FakeSource(5), ma_period=20, correlation_window=4,
+                            cache_file=str(tmp_path / 'breadth.json'))
+    result = breadth.compute(INDICES)
+    assert result['breadth'] == {'latest': None, 'series': []}
+    assert result['correlation']['codes'] == ['A', 'B', 'C']
+
+
+def test_rolling_correlation_matches_windows():
+    source = FakeSource(80)
+    quotes = pd.concat([df.assign(index_code=code) for code, df in source.history.items()], ignore_index=True)
+    returns = return_panel(quotes)
+    series = rolling_average_correlation(returns, 20, 5)
+    assert len(series) == 5
+    for point in series:
+        window = returns.loc[:point['date']].iloc[-20:]
+        matrix = window.corr().to_numpy()
+        expected = matrix[~np.eye(3, dtype=bool)].mean()
+        assert abs(point['average'] - round(expected, 3)) < 1e-9
+
+
+def test_incremental_cache(tmp_path):
+    cache_file = str(tmp_path / 'breadth.json')
+    full = FakeSource(61)
+    source = FakeSource(61)
+    source.history = {code: df.iloc[:60] for code, df in full.history.items()}
+    first = MarketBreadth(source, ma_period=5, correlation_window=10, cache_file=cache_file).compute(INDICES, 10)
+    assert len(first['breadth']['series']) == 10
+    assert len(first['correlation']['series']) == 10
+
+    # 新增一个交易日：增量结果与不用缓存的全量计算一致
+    second = MarketBreadth(full, ma_period=5, correlation_window=10, cache_file=cache_file).compute(INDICES, 10)
+    fresh = MarketBreadth(full, ma_period=5, correlation_window=10,
+                          cache_file=str(tmp_path / 'fresh.json')).compute(INDICES, 10)
+    assert second == fresh
+    assert second['correlation']['series'][-1]['date'] == second['breadth']['latest']['date']
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+分钟K线重采样测试：与东方财富的K线结束时刻一致，午休/跨日断开，较长基础周期也能聚合
+"""
+import numpy as np
+import pandas as pd
+
+from minute_bar_store import make_bars, resample_bars, base_interval
+
+
+def session_times(day, step):
+    """A股一个交易日的K线结束时刻（9:30集合竞价 + 上午/下午连续交易）"""
+    morning = pd.date_range(f'{day} 09:30', f'{day} 11:30', freq=f'{step}min')
+    afternoon = pd.date_range(f'{day} 13:00', f'{day} 15:00', freq=f'{step}min')[1:]
+    if step > 1:
+        morning = morning[1:]
+    return morning.append(afternoon)
+
+
+def bars_for(days, step):
+    times = session_times(days[0], step)
+    for day in days[1:]:
+        times = times.append(session_times(day, step))
+    close = np.arange(1, len(times) + 1, dtype=float)
+    return make_bars(times, close, close + 0.5, close - 0.5, close, np.ones(len(times)))
+
+
+def end_times(bars):
+    return [f'{m // 60:02d}:{m % 60:02d}' for m in bars['minute']]
+
+
+def test_one_minute_to_sixty():
+    bars = bars_for(['2025-07-08'], 1)
+    hourly = resample_bars(bars, 60)
+    assert end_times(hourly) == ['10:30', '11:30', '14:00', '15:00']
+    # 9:30集合竞价K线并入第一根
+    assert hourly['open'][0] == bars['open'][0]
+    assert hourly['volume'].sum() == len(bars['minute'])
+
+
+def test_sixty_to_one_twenty():
+    bars = bars_for(['2025-07-08', '2025-07-09'], 60)
+    assert base_interval(bars) == 60
+    two_hour = resample_bars(bars, 120)
+    assert end_times(two_hour) == ['11:30', '15:00'] * 2
+    assert list(two_hour['open']) == [1, 3, 5, 7]
+    assert list(two_hour['close']) == [2, 4, 6, 8]
+    assert list(two_hour['high']) == [2.5, 4.5, 6.5, 8.5]
+    assert list(two_hour['volume']) == [2, 2, 2, 2]
+    # 显式传入基础周期结果相同
+    assert end_times(resample_bars(bars, 120, 60)) == end_times(two_hour)
+
+
+def test_sixty_to_two_forty_splits_at_lunch_and_day():
+    bars = bars_for(['2025-07-08', '2025-07-09'], 60)
+    four_hour = resample_bars(bars, 240)
+    assert end_times(four_hour) == ['11:30', '15:00'] * 2
+    assert list(four_hour['day'].astype(str)) == ['2025-07-08'] * 2 + ['2025-07-09'] * 2
+
+
+def test_five_to_thirty():
+    bars = bars_for(['2025-07-08'], 5)
+    half_hour = resample_bars(bars, 30)
+    assert end_times(half_hour)[:2] == ['10:00', '10:30']
+    assert end_times(half_hour)[-1] == '15:00'
+    assert len(half_hour['minute']) == 8
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+行情内存缓存测试：按字节限额淘汰最久未使用的条目，来源文件改写或删除后失效，返回副本
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from quote_cache import QuoteMemoryCache
+
+
+def frame(rows):
+    return pd.DataFrame({'trade_date': pd.bdate_range('2025-01-02', periods=rows),
+                         'close': np.arange(rows, dtype=float)})
+
+
+def size_of(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def touch(path, mtime):
+    path.write_text('x')
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_evicts_least_recently_used_by_bytes(tmp_path):
+    path = touch(tmp_path / 'A.csv', 1000)
+    df = frame(100)
+    cache = QuoteMemoryCache(max_bytes=3 * size_of(df))
+    for key in ('A', 'B', 'C'):
+        cache.put((key,), path, df)
+    assert cache.stats()['bytes'] == 3 * size_of(df)
+    # 读取A使其变为最近使用，写入D时淘汰最久未使用的B
+    assert cache.get(('A',), path) is not None
+    cache.put(('D',), path, df)
+    assert cache.get(('B',), path) is None
+    assert all(cache.get((key,), path) is not None for key in ('A', 'C', 'D'))
+    # 按字节而非条目数：一个大条目挤出多个小条目
+    cache.put(('E',), path, frame(250))
+    stats = cache.stats()
+    assert stats['bytes'] <= cache.max_bytes and (stats['entries'], stats['evictions']) == (1, 4)
+    assert cache.get(('E',), path) is not None
+    # 超过上限的单个条目不缓存，也不影响已有条目
+    cache.put(('F',), path, frame(1000))
+    assert cache.get(('F',), path) is None and cache.get(('E',), path) is not None
+
+
+def test_invalidated_by_file_change(tmp_path):
+    path = touch(tmp_path / 'A.csv', 1000)
+    cache = QuoteMemoryCache()
+    cache.put(('A', 'daily'), path, frame(10))
+    cached = cache.get(('A', 'daily'), path)
+    cached.loc[0, 'close'] = -1.0
+    assert cache.get(('A', 'daily'), path)['close'].iloc[0] == 0.0
+    # 其他进程改写文件后条目失效并释放占用
+    touch(path, 2000)
+    assert cache.get(('A', 'daily'), path) is None
+    assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
+    # 文件被删除：同样失效；文件不存在时不写入
+    cache.put(('A', 'daily'), path, frame(10))
+    path.unlink()
+    assert cache.get(('A', 'daily'), path) is None
+    cache.put(('A', 'daily'), path, frame(10))
+    assert cache.stats()['entries'] == 0
+
+
+def test_max_age_and_invalidate(tmp_path):
+    old = touch(tmp_path / 'A.csv', time.time() - 120)
+    fresh = touch(tmp_path / 'B.csv', time.time())
+    cache = QuoteMemoryCache()
+    cache.put(('A', 'quotes'), old, frame(5))
+    cache.put(('A', 'history'), fresh, frame(5))
+    cache.put(('B', 'quotes'), fresh, frame(5))
+    # 超过max_age视为未命中，但条目保留（不限时长的读取仍可命中）
+    assert cache.get(('A', 'quotes'), old, max_age=60) is None
+    assert cache.get(('A', 'quotes'), old) is not None
+    cache.invalidate('A')
+    assert cache.stats()['entries'] == 1
+    assert cache.get(('B', 'quotes'), fresh) is not None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (2, 1, 0.667)
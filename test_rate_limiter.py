@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+请求频率限制测试：窗口内限额、两桶加权的滑动估算、重试等待、空闲客户端清除，以及多个实例共用计数
+"""
+from rate_limiter import SlidingWindowLimiter
+
+START = 6000.0  # 窗口起点（60的整数倍）
+
+
+def test_denies_after_limit(tmp_path):
+    limiter = SlidingWindowLimiter(tmp_path / 'rate.db', 'refresh', max_requests=10, window=60)
+    assert all(limiter.hit('1.2.3.4', now=START + i)[0] for i in range(10))
+    allowed, retry_after = limiter.hit('1.2.3.4', now=START + 10)
+    assert not allowed and retry_after > 0
+    # 其他客户端与其他范围各自计数
+    assert limiter.hit('5.6.7.8', now=START + 10) == (True, None)
+    other = SlidingWindowLimiter(tmp_path / 'rate.db', 'series', max_requests=10, window=60)
+    assert other.hit('1.2.3.4', now=START + 10) == (True, None)
+
+
+def test_previous_window_is_weighted(tmp_path):
+    limiter = SlidingWindowLimiter(tmp_path / 'rate.db', 'refresh', max_requests=10, window=60)
+    for i in range(10):
+        assert limiter.hit('a', now=START + i)[0]
+    # 下一窗口过去一半：上一窗口的10次按一半计入，还可放行5次
+    now = START + 60 + 30
+    assert [limiter.hit('a', now=now)[0] for _ in range(6)] == [True] * 5 + [False]
+    # 再下一窗口之后：上一窗口只剩5次且权重随时间下降
+    assert limiter.hit('a', now=START + 120 + 1)[0]
+    # 空闲超过两个窗口的计数不再影响
+    assert [limiter.hit('b', now=START + i)[0] for i in range(11)][-1] is False
+    assert limiter.hit('b', now=START + 180)[0]
+
+
+def test_retry_after_is_enough(tmp_path):
+    limiter = SlidingWindowLimiter(tmp_path / 'rate.db', 'refresh', max_requests=10, window=60)
+    for i in range(10):
+        limiter.hit('a', now=START + 50)
+    allowed, retry_after = limiter.hit('a', now=START + 50)
+    assert not allowed and 0 < retry_after <= 2 * 60
+    # 按建议的时间重试时放行，提前重试仍被拒绝
+    assert not limiter.hit('a', now=START + 50 + retry_after - 2)[0]
+    assert limiter.hit('a', now=START + 50 + retry_after)[0]
+
+
+def test_evict_bounds_clients(tmp_path):
+    limiter = SlidingWindowLimiter(tmp_path / 'rate.db', 'refresh', max_clients=3)
+    for i in range(5):
+        limiter.hit(f'client{i}', now=START + i)
+    limiter.hit('idle', now=START - 200)
+    assert limiter.evict(now=START + 10) == 3
+    keys = [row[0] for row in limiter._connection().execute('SELECT key FROM rate_limit ORDER BY key')]
+    assert keys == ['refresh:client2', 'refresh:client3', 'refresh:client4']
+
+
+def test_instances_share_counts(tmp_path):
+    # 相当于两个gunicorn worker各持有一个限流器
+    first = SlidingWindowLimiter(tmp_path / 'rate.db', 'refresh', max_requests=4)
+    second = SlidingWindowLimiter(tmp_path / 'rate.db', 'refresh', max_requests=4)
+    results = [(first if i % 2 else second).hit('a', now=START + i)[0] for i in range(5)]
+    assert results == [True, True, True, True, False]
+    assert not first.hit('a', now=START + 5)[0]
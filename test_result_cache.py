@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+结果缓存测试：源文件签名不变时复用内存中的版本，预编码响应带强ETag，轮询时内容未变化返回无正文的304，
+按Accept-Encoding协商压缩编码
+"""
+import gzip
+import json
+import os
+
+import pytest
+
+import result_cache
+from result_cache import MIN_COMPRESS_SIZE, CachedBody, FileCache, choose_encoding
+
+ROWS = [{'rank': i, 'index_code': f'{i:06d}', 'index_name': f'指数{i}', 'status': 'YES'} for i in range(1, 60)]
+DATA = {'update_time': '2025-07-10 15:30:00', 'results': ROWS}
+
+
+def write(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+
+def test_file_cache_reloads_on_signature_change(tmp_path):
+    main, extra = tmp_path / 'latest.json', tmp_path / 'fingerprint.json'
+    cache = FileCache([main, extra], lambda: json.loads(main.read_text(encoding='utf-8')))
+    assert cache.get() is None
+    write(main, DATA)
+    first = cache.get()
+    assert cache.get() is first and cache.loads == 1
+    assert first.variant('latest', lambda data: b'x') is first.variant('latest', lambda data: b'y')
+    # 附属文件出现或变化同样触发重新读取，版本号随之变化
+    extra.write_text('{}')
+    second = cache.get()
+    assert second is not first and second.version != first.version and cache.loads == 2
+    write(main, dict(DATA, update_time='2025-07-11 15:30:00'))
+    os.utime(main, ns=(1, 1))
+    assert cache.get().data['update_time'] == '2025-07-11 15:30:00'
+    # 解析失败时不缓存，文件修复后恢复
+    main.write_text('{broken')
+    os.utime(main, ns=(2, 2))
+    with pytest.raises(json.JSONDecodeError):
+        cache.get()
+    write(main, DATA)
+    os.utime(main, ns=(3, 3))
+    assert cache.get().data == DATA
+
+
+def test_cached_body_encodes_once():
+    body = json.dumps(DATA).encode('utf-8')
+    cached = CachedBody(body)
+    gz, etag = cached.encoded('gzip')
+    assert gzip.decompress(gz) == body and etag == f'{cached.etag}-gzip'
+    assert cached.encoded('gzip')[0] is gz
+    assert cached.encoded(None) == (body, cached.etag)
+    # 过小的正文不压缩
+    small = CachedBody(b'x' * (MIN_COMPRESS_SIZE - 1))
+    assert small.encoded('gzip') == (small.body, small.etag)
+
+
+def test_api_latest_etag_and_304(monkeypatch, tmp_path):
+    import server
+
+    path = tmp_path / 'latest.json'
+    write(path, DATA)
+    cache = FileCache([path], lambda: json.loads(path.read_text(encoding='utf-8')))
+    monkeypatch.setattr(server, 'latest_cache', cache)
+    client = server.app.test_client()
+
+    plain = client.get('/api/latest')
+    assert plain.status_code == 200 and plain.get_json()['data'] == DATA
+    assert plain.headers['Cache-Control'] == 'no-cache' and plain.headers['Vary'] == 'Accept-Encoding'
+    etag = plain.headers['ETag']
+    assert client.get('/api/latest', headers={'If-None-Match': etag}).status_code == 304
+
+    # 各编码是不同的表示，ETag不同，不能互相命中
+    zipped = client.get('/api/latest', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip' and zipped.headers['ETag'] != etag
+    assert json.loads(gzip.decompress(zipped.get_data()))['data'] == DATA
+    not_modified = client.get('/api/latest',
+                              headers={'Accept-Encoding': 'gzip', 'If-None-Match': zipped.headers['ETag']})
+    assert not_modified.status_code == 304 and not_modified.get_data() == b''
+    assert client.get('/api/latest', headers={'If-None-Match': zipped.headers['ETag']}).status_code == 200
+
+    # 结果更新后旧ETag不再命中
+    write(path, dict(DATA, update_time='2025-07-11 15:30:00'))
+    os.utime(path, ns=(1, 1))
+    refreshed = client.get('/api/latest', headers={'If-None-Match': etag})
+    assert refreshed.status_code == 200 and refreshed.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('header, with_brotli, without_brotli', [
+    (None, None, None),
+    ('', None, None),
+    ('identity', None, None),
+    ('gzip', 'gzip', 'gzip'),
+    ('gzip, deflate, br', 'br', 'gzip'),
+    ('GZIP, BR', 'br', 'gzip'),
+    # q=0 表示拒绝；服务端按自身优先顺序选择，不按q值高低
+    ('br;q=0, gzip', 'gzip', 'gzip'),
+    ('br;q=0.1, gzip;q=1.0', 'br', 'gzip'),
+    ('gzip;q=0', None, None),
+    ('gzip;q=abc', None, None),
+    (' gzip ; q=0.5 ', 'gzip', 'gzip'),
+    ('*', 'br', 'gzip'),
+    ('*;q=0', None, None),
+    ('*, gzip;q=0', 'br', None),
+    ('deflate', None, None),
+])
+def test_choose_encoding(monkeypatch, header, with_brotli, without_brotli):
+    monkeypatch.setattr(result_cache, 'brotli', object())
+    assert choose_encoding(header) == with_brotli
+    monkeypatch.setattr(result_cache, 'brotli', None)
+    assert choose_encoding(header) == without_brotli
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+渐进发布测试：中间快照写入单独的文件，运行中止时上次的完整结果保持不变；
+行情未变化时沿用上次结果，跨日时重新判断新转YES/NO
+"""
+import json
+import os
+from argparse import Namespace
+from datetime import datetime
+
+import pytest
+
+import main_trend
+from index_trend_analyzer import IndexTrendAnalyzer
+from result_publisher import ProgressivePublisher
+
+INDICES = [{'code': 'A', 'name': '指数A'}, {'code': 'B', 'name': '指数B'}]
+PREVIOUS = {'update_time': '2025-07-08 15:30:00', 'partial': False, 'results': [{'index_code': 'A'}]}
+
+
+class FakeAnalyzer:
+    derive_status = True
+
+    def iter_quotes(self, indices, force_refresh=False, max_workers=4):
+        return iter([])
+
+    get_status_change_summary = IndexTrendAnalyzer.get_status_change_summary
+
+
+class FakeReporter:
+    def generate_text_report(self, results, title=None):
+        return ''
+
+
+class Clock(datetime):
+    current = datetime(2025, 7, 8, 20, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+def run(monkeypatch, tmp_path, compute):
+    """在临时目录中执行一次分析任务，compute替代compute_results"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/trend_status')
+    with open(main_trend.RESULT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(PREVIOUS, f)
+    monkeypatch.setattr(main_trend, 'compute_results', compute)
+    args = Namespace(task='analyze', force_refresh=False, job_id=None)
+    return main_trend.run_analysis(args, {'indices': INDICES}, None, FakeAnalyzer(), None)
+
+
+def test_snapshot_marks_pending_rows(tmp_path):
+    publisher = ProgressivePublisher(str(tmp_path / 'partial.json'), INDICES)
+    publisher.add(INDICES[1], None)
+    with open(publisher.snapshot_file, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert snapshot['partial'] is True
+    assert (snapshot['completed'], snapshot['total']) == (1, 2)
+    assert [(r['index_code'], r['done']) for r in snapshot['results']] == [('A', False)]
+    publisher.discard()
+    publisher.discard()
+    assert not os.path.exists(publisher.snapshot_file)
+
+
+def test_aborted_run_keeps_previous_result(monkeypatch, tmp_path):
+    snapshots = []
+
+    def compute(config, data_source, analyzer, quote_stream, force_refresh=False, on_result=None):
+        for info in config['indices']:
+            on_result(info, None)
+            snapshots.append(os.path.exists(main_trend.PARTIAL_FILE))
+        return None
+
+    assert run(monkeypatch, tmp_path, compute) is None
+    assert snapshots == [True, True]
+    with open(main_trend.RESULT_FILE, 'r', encoding='utf-8') as f:
+        assert json.load(f) == PREVIOUS
+    assert not os.path.exists(main_trend.PARTIAL_FILE)
+    with open(main_trend.PROGRESS_FILE, 'r', encoding='utf-8') as f:
+        assert json.load(f)['stage'] == 'failed'
+
+
+def test_crashed_run_discards_snapshot(monkeypatch, tmp_path):
+    def compute(config, data_source, analyzer, quote_stream, force_refresh=False, on_result=None):
+        on_result(config['indices'][0], None)
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        run(monkeypatch, tmp_path, compute)
+    with open(main_trend.RESULT_FILE, 'r', encoding='utf-8') as f:
+        assert json.load(f) == PREVIOUS
+    assert not os.path.exists(main_trend.PARTIAL_FILE)
+
+
+def run_unchanged(monkeypatch, tmp_path, last_time):
+    """上次结果在last_time生成（A当天转YES），本次行情指纹不变"""
+    rows = [{'rank': 1, 'index_code': 'A', 'index_name': '指数A', 'status': 'YES', 'status_change_time': '2025.7.8'},
+            {'rank': 2, 'index_code': 'B', 'index_name': '指数B', 'status': 'NO', 'status_change_time': '2025.6.3'}]
+    summary = {'total': 2, 'yes_count': 1, 'no_count': 1, 'new_yes': ['指数A'], 'new_no': []}
+    previous = {'update_time': last_time, 'partial': False, 'summary': summary, 'results': rows}
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/trend_status')
+    with open(main_trend.RESULT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(previous, f)
+    settings = main_trend.run_settings({'indices': INDICES}, FakeAnalyzer())
+    with open(main_trend.FINGERPRINT_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'update_time': last_time, 'fingerprint': {'settings': settings, 'quotes': {}}}, f)
+
+    def compute(*args, **kwargs):
+        raise AssertionError('行情未变化时不应重新分析')
+
+    monkeypatch.setattr(main_trend, 'compute_results', compute)
+    monkeypatch.setattr(main_trend, 'datetime', Clock)
+    monkeypatch.setattr('index_trend_analyzer.datetime', Clock)
+    args = Namespace(task='analyze', force_refresh=False, job_id=None)
+    outcome = main_trend.run_analysis(args, {'indices': INDICES}, None, FakeAnalyzer(), FakeReporter())
+    with open(main_trend.RESULT_FILE, 'r', encoding='utf-8') as f:
+        return outcome, json.load(f)
+
+
+def test_unchanged_run_reuses_result(monkeypatch, tmp_path):
+    Clock.current = datetime(2025, 7, 8, 20, 0)
+    outcome, saved = run_unchanged(monkeypatch, tmp_path, '2025-07-08 15:30:00')
+    assert outcome == {'update_time': '2025-07-08 15:30:00', 'unchanged': True, 'count': 2}
+    assert saved['update_time'] == '2025-07-08 15:30:00' and saved['summary']['new_yes'] == ['指数A']
+
+
+def test_unchanged_run_on_next_day_clears_new_flips(monkeypatch, tmp_path):
+    Clock.current = datetime(2025, 7, 9, 9, 0)
+    outcome, saved = run_unchanged(monkeypatch, tmp_path, '2025-07-08 15:30:00')
+    assert outcome['unchanged'] is False and outcome['update_time'] == '2025-07-09 09:00:00'
+    assert saved['update_time'] == '2025-07-09 09:00:00'
+    assert (saved['summary']['new_yes'], saved['summary']['new_no']) == ([], [])
+    assert [r['index_code'] for r in saved['results']] == ['A', 'B']
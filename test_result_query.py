@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+结果查询测试：过滤、搜索、排序（缺失值排最后）、cursor分页，以及换了查询条件或结果已更新的cursor
+"""
+import json
+import os
+
+import pytest
+
+from result_cache import FAST_LEVELS, FileCache
+from result_query import ResultIndex, parse_query
+
+ROWS = [
+    {'rank': 1, 'index_code': '000300', 'index_name': '沪深300', 'status': 'YES', 'deviation_rate': 1.5},
+    {'rank': 2, 'index_code': '000905', 'index_name': '中证500', 'status': 'YES', 'deviation_rate': 3.2},
+    {'rank': 3, 'index_code': '000852', 'index_name': '中证1000', 'status': 'NO'},
+    {'rank': 4, 'index_code': '399006', 'index_name': '创业板指', 'status': 'NO', 'deviation_rate': -2.1},
+    {'rank': 5, 'index_code': 'HSTECH', 'index_name': '恒生科技', 'status': 'YES', 'deviation_rate': 0.4},
+]
+DATA = {'update_time': '2025-07-10 15:30:00', 'results': ROWS}
+
+
+def page(index, args):
+    body = index.page(*parse_query(args, index.version)).body
+    return json.loads(body)['data']
+
+
+def codes(data):
+    return [row['index_code'] for row in data['results']]
+
+
+def test_filter_search_and_sort():
+    index = ResultIndex(DATA, 'v1')
+    data = page(index, {'status': 'yes'})
+    assert codes(data) == ['000300', '000905', 'HSTECH']
+    assert (data['total'], data['matched'], data['update_time']) == (5, 3, DATA['update_time'])
+    assert codes(page(index, {'q': '中证'})) == ['000905', '000852']
+    assert codes(page(index, {'q': 'hstech'})) == ['HSTECH']
+    # 缺失值无论升降序都排在最后
+    assert codes(page(index, {'sort': '-deviation_rate'})) == ['000905', '000300', 'HSTECH', '399006', '000852']
+    assert codes(page(index, {'sort': 'deviation_rate'})) == ['399006', 'HSTECH', '000300', '000905', '000852']
+    assert codes(page(index, {'sort': '-index_code', 'status': 'NO'})) == ['399006', '000852']
+
+
+def test_cursor_pages_through_results():
+    index = ResultIndex(DATA, 'v1')
+    args = {'sort': '-deviation_rate', 'limit': '2'}
+    seen = []
+    data = page(index, args)
+    while True:
+        seen += codes(data)
+        if data['next_cursor'] is None:
+            break
+        data = page(index, dict(args, cursor=data['next_cursor']))
+    assert seen == codes(page(index, {'sort': '-deviation_rate'}))
+    # 相同查询复用同一正文，分页正文用较快的压缩级别
+    first = index.page(*parse_query(args, 'v1'))
+    assert index.page(*parse_query(args, 'v1')) is first
+    assert first.levels == FAST_LEVELS
+
+
+def test_cursor_must_match_query():
+    index = ResultIndex(DATA, 'v1')
+    cursor = page(index, {'status': 'YES', 'sort': '-deviation_rate', 'limit': '1'})['next_cursor']
+    # 状态大小写不同但规范化后相同的查询可继续翻页
+    assert parse_query({'status': 'yes', 'sort': '-deviation_rate', 'cursor': cursor}, 'v1')[4] == 1
+    for args in ({}, {'status': 'YES'}, {'status': 'NO', 'sort': '-deviation_rate'},
+                 {'status': 'YES', 'sort': 'deviation_rate'}, {'status': 'YES', 'sort': '-deviation_rate', 'q': '中证'}):
+        with pytest.raises(ValueError):
+            parse_query(dict(args, cursor=cursor), 'v1')
+    with pytest.raises(LookupError):
+        parse_query({'status': 'YES', 'sort': '-deviation_rate', 'cursor': cursor}, 'v2')
+    for bad in ('v1-12', 'v1-abc-x', 'garbage'):
+        with pytest.raises(ValueError):
+            parse_query({'cursor': bad}, 'v1')
+
+
+def test_invalid_parameters():
+    for args in ({'status': 'MAYBE'}, {'sort': 'volume'}, {'limit': '0'}, {'limit': 'ten'}, {'offset': '-1'}):
+        with pytest.raises(ValueError):
+            parse_query(args, 'v1')
+
+
+def test_api_status_codes(monkeypatch, tmp_path):
+    import server
+
+    path = tmp_path / 'latest.json'
+    path.write_text(json.dumps(DATA), encoding='utf-8')
+    cache = FileCache([path], lambda: json.loads(path.read_text(encoding='utf-8')))
+    monkeypatch.setattr(server, 'latest_cache', cache)
+    client = server.app.test_client()
+    response = client.get('/api/latest?status=YES&limit=1')
+    assert response.status_code == 200
+    cursor = response.get_json()['data']['next_cursor']
+    assert client.get(f'/api/latest?status=YES&limit=1&cursor={cursor}').status_code == 200
+    assert client.get(f'/api/latest?limit=1&cursor={cursor}').status_code == 400
+    # 结果更新后旧cursor已失效
+    path.write_text(json.dumps(dict(DATA, update_time='2025-07-11 15:30:00')), encoding='utf-8')
+    os.utime(path, ns=(1, 1))
+    assert client.get(f'/api/latest?status=YES&limit=1&cursor={cursor}').status_code == 410
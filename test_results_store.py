@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+历史结果库测试：运行的交易日取结果中最新的交易日，按交易日区间与指数查询时每个交易日取最后一次运行
+"""
+from results_store import ResultsStore
+
+
+def result(code, rank, status, trade_date, **extra):
+    return dict({'rank': rank, 'index_code': code, 'index_name': f'指数{code}', 'status': status,
+                 'current_price': 10.0 + rank, 'trade_date': trade_date}, **extra)
+
+
+def test_run_trade_date_and_extra_fields(tmp_path):
+    store = ResultsStore(tmp_path / 'results.db')
+    # 个别指数停牌时行情日期较早，运行的交易日取最新的
+    run_id = store.save_run([result('A', 1, 'YES', '2025-07-08', flip_price=9.5),
+                             result('B', 2, 'NO', '2025-07-07')],
+                            summary={'yes_count': 1}, run_time='2025-07-08 20:00:00')
+    run = store.get_run(run_id)
+    assert (run['trade_date'], run['summary']) == ('2025-07-08', {'yes_count': 1})
+    assert [r['index_code'] for r in run['results']] == ['A', 'B']
+    # 没有独立列的字段存入extra，读出时原样合并
+    assert run['results'][0]['flip_price'] == 9.5 and 'flip_price' not in run['results'][1]
+    assert run['results'][1]['trade_date'] == '2025-07-07'
+    # 结果不带交易日时取运行日期
+    empty = store.save_run([{'rank': 1, 'index_code': 'A'}], run_time='2025-07-09 09:00:00')
+    assert store.get_run(empty)['trade_date'] == '2025-07-09'
+    assert store.get_run(999) is None
+
+
+def test_queries_take_last_run_per_trade_date(tmp_path):
+    store = ResultsStore(tmp_path / 'results.db')
+    store.save_run([result('A', 2, 'NO', '2025-07-07'), result('B', 1, 'YES', '2025-07-07')],
+                   run_time='2025-07-07 15:30:00')
+    store.save_run([result('A', 1, 'YES', '2025-07-08'), result('B', 2, 'YES', '2025-07-08')],
+                   run_time='2025-07-08 11:00:00')
+    last = store.save_run([result('A', 2, 'NO', '2025-07-08'), result('B', 1, 'YES', '2025-07-08')],
+                          run_time='2025-07-08 15:30:00')
+    store.save_run([result('A', 1, 'YES', '2025-07-09')], run_time='2025-07-09 15:30:00')
+
+    runs = store.get_runs('2025-07-08', '2025-07-08')
+    assert [r['run_time'] for r in runs] == ['2025-07-08 11:00:00', '2025-07-08 15:30:00']
+    assert len(store.get_runs()) == 4 and len(store.get_runs(start_date='2025-07-09')) == 1
+
+    by_date = store.get_results_by_date('2025-07-08')
+    assert by_date['run_id'] == last
+    assert [(r['index_code'], r['status']) for r in by_date['results']] == [('B', 'YES'), ('A', 'NO')]
+    assert store.get_results_by_date('2025-07-10') is None
+
+    history = store.get_index_history('A')
+    assert [(r['trade_date'], r['status'], r['rank']) for r in history] == [
+        ('2025-07-07', 'NO', 2), ('2025-07-08', 'NO', 2), ('2025-07-09', 'YES', 1)]
+    assert [r['trade_date'] for r in store.get_index_history('A', '2025-07-08', '2025-07-08')] == ['2025-07-08']
+    assert [r['trade_date'] for r in store.get_index_history('B', start_date='2025-07-08')] == ['2025-07-08']
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+历史序列接口测试：LTTB降采样、均线与状态、区间截取，以及按历史文件签名失效的响应缓存
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from series import SeriesCache, build_series, load_series, lttb
+
+
+def write_history(path, closes, start='2024-01-01'):
+    dates = pd.bdate_range(start, periods=len(closes))
+    pd.DataFrame({'trade_date': dates.strftime('%Y-%m-%d'), 'open': closes, 'close': closes}).to_csv(path, index=False)
+
+
+def test_lttb_keeps_shape():
+    rng = np.random.default_rng(7)
+    y = np.cumsum(rng.normal(size=2000))
+    y[777], y[1444] = y.max() + 50, y.min() - 50
+    picked = lttb(y, 100)
+    assert len(picked) == 100
+    assert picked[0] == 0 and picked[-1] == len(y) - 1
+    assert np.all(np.diff(picked) > 0)
+    assert 777 in picked and 1444 in picked
+    # 点数不超过目标或目标过小时原样返回
+    assert np.array_equal(lttb(y[:50], 100), np.arange(50))
+    assert np.array_equal(lttb(y, 2), np.arange(len(y)))
+
+
+def test_load_series_ma_and_status(tmp_path):
+    closes = np.linspace(10, 30, 60) + np.sin(np.arange(60))
+    write_history(tmp_path / 'A.csv', closes)
+    series = load_series(tmp_path / 'A.csv', 20)
+    expected = pd.Series(closes).rolling(20).mean().to_numpy()
+    assert np.allclose(series['ma'], expected, equal_nan=True)
+    assert np.all(series['status'][:19] == -1)
+    assert np.array_equal(series['status'][19:], (closes[19:] >= expected[19:]).astype(np.int8))
+
+
+def test_build_series_range(tmp_path):
+    write_history(tmp_path / 'A.csv', np.arange(1, 41, dtype=float))
+    series = load_series(tmp_path / 'A.csv', 5)
+    data = build_series(series, 'A', 5, start_date='2024-01-08', end_date='2024-01-19', points=500)
+    assert (data['from'], data['to'], data['total']) == ('2024-01-08', '2024-01-19', 10)
+    assert data['columns']['close'][0] == 6.0 and data['columns']['ma'][0] == 4.0
+    assert data['columns']['status'][0] == 'YES'
+    early = build_series(series, 'A', 5, end_date='2024-01-02')
+    assert early['columns']['ma'] == [None, None] and early['columns']['status'] == [None, None]
+    empty = build_series(series, 'A', 5, start_date='2030-01-01')
+    assert (empty['from'], empty['total'], empty['columns']['date']) == (None, 0, [])
+
+
+def test_cache_reuses_and_invalidates(tmp_path):
+    write_history(tmp_path / 'A.csv', np.arange(1, 41, dtype=float))
+    cache = SeriesCache(tmp_path, ma_period=5)
+    first = cache.get('A', points=10)
+    assert cache.get('A', points=10) is first
+    assert cache.get('A', points=20) is not first
+    assert json.loads(first.body)['data']['points'] == 10
+    assert cache.get('B') is None
+    # 历史库重写后重新读取
+    write_history(tmp_path / 'A.csv', np.arange(1, 42, dtype=float))
+    os.utime(tmp_path / 'A.csv', ns=(1, 1))
+    refreshed = cache.get('A', points=10)
+    assert refreshed is not first
+    assert json.loads(refreshed.body)['data']['total'] == 41
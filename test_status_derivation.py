@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+状态转换推导测试：从行情历史推导最近一次翻转，历史内无翻转时不伪造翻转点
+"""
+import numpy as np
+import pandas as pd
+
+from index_data_source import IndexDataSource
+from index_trend_analyzer import IndexTrendAnalyzer
+
+
+class FakeSource:
+    """本地历史库固定为给定行情"""
+    merge_quotes = staticmethod(IndexDataSource.merge_quotes)
+
+    def __init__(self, history=None):
+        self.history = history if history is not None else pd.DataFrame()
+
+    def load_history(self, index_code):
+        return self.history
+
+
+def make_quotes(closes):
+    dates = pd.bdate_range('2025-01-02', periods=len(closes))
+    return pd.DataFrame({'trade_date': dates, 'close': np.asarray(closes, dtype=float)})
+
+
+def test_flip_inside_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    analyzer = IndexTrendAnalyzer(FakeSource(), ma_period=5, derive_status=True)
+    closes = [10] * 10 + [8] * 3 + [12] * 5
+    derived = analyzer.derive_status_change('T1', make_quotes(closes))
+    assert derived['status'] == 'YES'
+    assert derived['flip_date'] == '2025-01-21'
+    assert derived['flip_price'] == 12.0
+
+
+def test_no_flip_is_unknown(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    analyzer = IndexTrendAnalyzer(FakeSource(), ma_period=5, derive_status=True)
+    quotes = make_quotes(np.arange(1, 31))
+    derived = analyzer.derive_status_change('T2', quotes)
+    assert derived['flip_date'] is None and derived['flip_price'] is None
+    assert derived['since_date'] == '2025-01-08'
+
+    # 增量扫描（缓存命中后追加新K线）保持未知，不回退为首根K线
+    more = make_quotes(np.arange(1, 33))
+    derived = analyzer.derive_status_change('T2', more)
+    assert derived['flip_date'] is None
+    assert derived['since_date'] == '2025-01-08'
+
+    analyzer.data_source = FakeSource(more)
+    result = analyzer.analyze_index_trend('T2', 'test', rank=1, quote_df=more)
+    assert result['status_change_time'] is None
+    assert result['status_change_before'] == '2025.1.8'
+    assert result['interval_change_pct'] == 0
+
+    # 转换时间未知的记录不写入状态转换日志
+    analyzer._save_history_status()
+    assert 'T2' not in analyzer.journal.latest
+
+
+def test_derive_mode_does_not_write_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    closes = [10] * 10 + [8] * 3 + [12] * 5
+    analyzer = IndexTrendAnalyzer(FakeSource(make_quotes(closes)), ma_period=5, derive_status=True)
+    results = analyzer.analyze_all_indices([{'code': 'T3', 'name': 'test'}],
+                                           quote_stream=[({'code': 'T3', 'name': 'test'}, make_quotes(closes))])
+    assert results[0]['status_change_time'] == '2025.1.21'
+    assert not (tmp_path / 'data' / 'trend_status' / 'status_journal.jsonl').exists()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+状态转换日志测试：只追加写入、重复转换去重、快照压缩后重新加载、损坏行与未写完的尾行
+"""
+import json
+import os
+
+from status_journal import StatusJournal, date_key
+
+
+def entry(code, status, time, price=1.0):
+    return {'index_code': code, 'status': status, 'status_change_time': time, 'status_change_price': price}
+
+
+def test_date_key():
+    assert date_key('2025.7.8') == '2025-07-08'
+    assert date_key('2025-07-08') == '2025-07-08'
+
+
+def test_unknown_change_time_is_not_journaled(tmp_path):
+    journal = StatusJournal(str(tmp_path))
+    assert journal.append([entry('A', 'YES', None, None), entry('B', 'NO', '早于2025.7.8', None),
+                           entry('C', 'YES', '2025.7.8')]) == 1
+    assert set(journal.latest) == {'C'}
+    assert journal.flips_on_date('2025-07-08') == [dict(entry('C', 'YES', '2025.7.8'),
+                                                        recorded_at=journal.latest['C']['recorded_at'])]
+    # 旧日志中已有的占位记录重新加载时也不建索引
+    with open(journal.journal_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry('D', 'NO', '早于2025.7.8', None), ensure_ascii=False) + '\n')
+    reloaded = StatusJournal(str(tmp_path))
+    assert set(reloaded.latest) == {'C'} and len(reloaded.flips_on_date('2025.7.8')) == 1
+
+
+def test_append_only_and_dedup(tmp_path):
+    journal = StatusJournal(str(tmp_path))
+    assert journal.append([entry('A', 'YES', '2025.7.8'), entry('B', 'NO', '2025.7.8')]) == 2
+    with open(journal.journal_file, 'rb') as f:
+        before = f.read()
+    # 与最新记录相同的转换不再写入
+    assert journal.append([entry('A', 'YES', '2025.7.8')]) == 0
+    assert os.path.getsize(journal.journal_file) == len(before)
+    assert journal.append([entry('A', 'NO', '2025.7.10', 2.0)]) == 1
+    with open(journal.journal_file, 'rb') as f:
+        assert f.read().startswith(before)  # 之前的内容未被改写
+
+    assert journal.latest_status()['A'] == {'status': 'NO', 'status_change_time': '2025.7.10', 'status_change_price': 2.0}
+    assert [e['status'] for e in journal.flips_for_code('A')] == ['YES', 'NO']
+    assert {e['index_code'] for e in journal.flips_on_date('2025-07-08')} == {'A', 'B'}
+
+
+def test_compaction_and_reload(tmp_path):
+    journal = StatusJournal(str(tmp_path), compact_every=3)
+    for day in range(1, 6):
+        journal.append([entry('A', 'YES' if day % 2 else 'NO', f'2025.7.{day}')])
+    assert os.path.exists(journal.snapshot_file)
+    with open(journal.snapshot_file, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert 0 < snapshot['offset'] < os.path.getsize(journal.journal_file)
+
+    # 重新加载：快照 + 快照之后的日志尾部
+    reloaded = StatusJournal(str(tmp_path), compact_every=3)
+    assert reloaded.latest_status() == journal.latest_status()
+    assert len(reloaded.flips_for_code('A')) == 5
+    assert reloaded.tail_lines == journal.tail_lines
+
+
+def test_refresh_reads_other_writer_and_skips_partial_line(tmp_path):
+    reader = StatusJournal(str(tmp_path))
+    writer = StatusJournal(str(tmp_path))
+    writer.append([entry('A', 'YES', '2025.7.8')])
+    with open(writer.journal_file, 'ab') as f:
+        f.write(b'not json\n{"index_code": "B"')  # 损坏行 + 未写完的行
+    reader.refresh()
+    assert set(reader.latest) == {'A'}
+    with open(writer.journal_file, 'ab') as f:
+        f.write(b', "status": "NO", "status_change_time": "2025.7.9", "status_change_price": 1.0}\n')
+    reader.refresh()
+    assert reader.latest['B']['status'] == 'NO'
+
+
+def test_truncated_journal_invalidates_snapshot(tmp_path):
+    journal = StatusJournal(str(tmp_path), compact_every=1)
+    journal.append([entry('A', 'YES', '2025.7.8')])
+    os.remove(journal.journal_file)
+    assert StatusJournal(str(tmp_path)).latest == {}
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+多周期状态测试：周线/月线由日线重采样，与整段重采样的结果一致；已完成周期收盘价的缓存增量更新，
+历史被修正时重新计算
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from index_data_source import IndexDataSource
+from index_trend_analyzer import TIMEFRAMES, IndexTrendAnalyzer
+
+TIMEFRAME_PERIODS = {'weekly': 4, 'monthly': 3}
+
+
+class FakeSource:
+    """本地历史库固定为给定日线"""
+    merge_quotes = staticmethod(IndexDataSource.merge_quotes)
+
+    def __init__(self, history):
+        self.history = history
+
+    def ensure_history(self, index_code, start_date):
+        return self.history
+
+
+def make_history(days, seed=3):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2025-01-02', periods=days)
+    return pd.DataFrame({'trade_date': dates, 'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))})
+
+
+def expected(history):
+    """整段重采样：每周期取最后一根日线收盘，当前周期以最新日线为临时收盘"""
+    result = {}
+    for name, period in TIMEFRAME_PERIODS.items():
+        closes = history.groupby(history['trade_date'].dt.to_period(TIMEFRAMES[name][0]))['close'].last()
+        threshold = closes.iloc[-period:].mean()
+        result[f'{name}_status'] = 'YES' if closes.iloc[-1] >= threshold else 'NO'
+        result[f'{name}_threshold'] = round(threshold, 2)
+    return result
+
+
+def analyze(history):
+    analyzer = IndexTrendAnalyzer(FakeSource(history), ma_period=5, timeframes=TIMEFRAME_PERIODS)
+    return analyzer.analyze_timeframes('A', history.tail(1))
+
+
+def load_cache():
+    with open(os.path.join('data/trend_status/timeframe_cache', 'A.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_resample_matches_full_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    history = make_history(120)
+    assert analyze(history) == expected(history)
+    cache = load_cache()
+    # 只缓存已完成周期中均线需要的N-1个收盘价
+    assert len(cache['weekly']['closes']) == TIMEFRAME_PERIODS['weekly'] - 1
+    assert len(cache['monthly']['closes']) == TIMEFRAME_PERIODS['monthly'] - 1
+    assert cache['weekly']['last_period_end'] < f"{history['trade_date'].iloc[-1]:%Y-%m-%d}"
+
+
+def test_cache_is_extended_and_invalidated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    full = make_history(130)
+    analyze(full.iloc[:100])
+    # 逐日增加行情（跨过周末与月末）：沿用缓存的结果与整段重采样一致
+    for end in range(101, 131):
+        assert analyze(full.iloc[:end]) == expected(full.iloc[:end])
+    assert load_cache()['weekly']['last_period_end'] < f"{full['trade_date'].iloc[-1]:%Y-%m-%d}"
+
+    # 已完成周期的收盘价被修正（如复权）：缓存失效，按修正后的历史重算
+    revised = full.copy()
+    last_end = max(pd.Timestamp(entry['last_period_end']) for entry in load_cache().values())
+    revised.loc[revised['trade_date'] <= last_end, 'close'] *= 1.5
+    assert analyze(revised) == expected(revised)
+    revised_close = revised.loc[revised['trade_date'] <= last_end, 'close'].iloc[-1]
+    assert np.isclose(load_cache()['monthly']['last_close'], revised_close)
+
+
+def test_short_history_has_no_status(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = analyze(make_history(8))
+    assert result == {'weekly_status': None, 'weekly_threshold': None,
+                      'monthly_status': None, 'monthly_threshold': None}
+    empty = analyze(pd.DataFrame({'trade_date': pd.to_datetime([]), 'close': []}))
+    assert empty['weekly_status'] is None and empty['monthly_status'] is None
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+历史日期重建测试：与实时分析（--derive-status）在同一行情历史上结果一致，停牌/退市指数不列入，日期参数校验
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import trend_panel
+from index_data_source import IndexDataSource
+from index_trend_analyzer import IndexTrendAnalyzer
+from main_trend import parse_date
+
+INDICES = [{'code': 'FLIP', 'name': '有翻转'}, {'code': 'RISE', 'name': '无翻转'}, {'code': 'DOWN', 'name': '下跌'}]
+COMPARED = ('rank', 'index_code', 'index_name', 'status', 'price_change_pct', 'current_price', 'threshold',
+            'deviation_rate', 'status_change_time', 'status_change_before', 'interval_change_pct', 'flip_price',
+            'flip_distance_pct', 'next_flip_price', 'trade_date')
+
+
+class FakeSource:
+    """本地历史库固定为给定行情"""
+    merge_quotes = staticmethod(IndexDataSource.merge_quotes)
+
+    def __init__(self, histories):
+        self.histories = histories
+
+    def load_history(self, index_code):
+        return self.histories.get(index_code, pd.DataFrame())
+
+
+def make_quotes(closes, start='2025-01-02'):
+    dates = pd.bdate_range(start, periods=len(closes))
+    return pd.DataFrame({'trade_date': dates, 'close': np.asarray(closes, dtype=float)})
+
+
+def histories():
+    return {
+        'FLIP': make_quotes([10] * 10 + [8] * 3 + [12] * 5 + [12.5, 13]),
+        'RISE': make_quotes(np.arange(1, 21)),
+        'DOWN': make_quotes(np.arange(40, 20, -1)),
+    }
+
+
+def test_as_of_matches_live_analysis(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = FakeSource(histories())
+    analyzer = IndexTrendAnalyzer(source, ma_period=5, derive_status=True)
+    live = analyzer.analyze_all_indices(INDICES, quote_stream=[(info, source.histories[info['code']])
+                                                               for info in INDICES])
+
+    metrics = trend_panel.compute_trend_metrics(trend_panel.load_quote_panel(source, INDICES), 5)
+    last_date = source.histories['FLIP']['trade_date'].iloc[-1]
+    rebuilt = trend_panel.rank_as_of(metrics, INDICES, [last_date])[last_date]
+
+    assert [{k: r.get(k) for k in COMPARED} for r in rebuilt] == [{k: r.get(k) for k in COMPARED} for r in live]
+    by_code = {r['index_code']: r for r in rebuilt}
+    assert by_code['FLIP']['status_change_time'] == '2025.1.21'
+    # 历史内无翻转：不以首根有效K线冒充翻转点
+    assert by_code['RISE']['status_change_time'] is None
+    assert by_code['RISE']['status_change_before'] == '2025.1.8'
+    assert by_code['RISE']['interval_change_pct'] == 0
+
+
+def test_stale_instrument_is_dropped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = histories()
+    data['RISE'] = make_quotes(np.arange(1, 81))  # 比其他指数多约两个月行情
+    source = FakeSource(data)
+    metrics = trend_panel.compute_trend_metrics(trend_panel.load_quote_panel(source, INDICES), 5)
+    last = data['FLIP']['trade_date'].iloc[-1]
+    near, far = last + pd.Timedelta(days=10), last + pd.Timedelta(days=30)
+    tables = trend_panel.rank_as_of(metrics, INDICES, [last, near, far])
+    assert {r['index_code'] for r in tables[last]} == {'FLIP', 'RISE', 'DOWN'}
+    # 长假内沿用最后一根K线，停更超过MAX_STALE_DAYS后不再列入
+    assert {r['index_code'] for r in tables[near]} == {'FLIP', 'RISE', 'DOWN'}
+    assert [r['index_code'] for r in tables[far]] == ['RISE']
+    assert [r['rank'] for r in tables[far]] == [1]
+
+
+def test_parse_date():
+    assert parse_date('2025-10-30') == '2025-10-30'
+    for bad in ('2025-13-01', '20251030', 'yesterday'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_date(bad)
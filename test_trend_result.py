@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+紧凑结果表示测试：TrendResult的dict式读写、ResultTable的二进制往返、float64退回与缺失字段
+"""
+import json
+
+import numpy as np
+import pytest
+
+from trend_result import FIELDS, ResultTable, TrendResult, dumps_document
+
+RECORDS = [
+    {'rank': 1, 'index_code': '000300', 'index_name': '沪深300', 'status': 'YES', 'price_change_pct': 1.23,
+     'current_price': 3912.45, 'threshold': 3850.1, 'deviation_rate': 1.62, 'status_change_time': '2025.7.8',
+     'interval_change_pct': 2.5, 'trade_date': '2025-07-10', 'update_time': '2025-07-10 15:30:00',
+     'h4_status': 'YES'},
+    {'rank': 2, 'index_code': '399006', 'index_name': '创业板指', 'status': 'NO', 'price_change_pct': -0.5,
+     'current_price': 2100.0, 'threshold': 2150.33, 'deviation_rate': -2.34, 'status_change_before': '2025.6.3',
+     'trade_date': '2025-07-10', 'update_time': '2025-07-10 15:30:00'},
+]
+
+
+def test_trend_result_mapping():
+    result = TrendResult(RECORDS[0])
+    assert result.to_dict() == RECORDS[0]
+    # 固定字段按FIELDS顺序在前，附加字段在后
+    assert list(result) == [f for f in FIELDS if f in RECORDS[0]] + ['h4_status']
+    assert result['h4_status'] == 'YES' and len(result) == len(RECORDS[0])
+    result['breadth'] = 55.0
+    del result['h4_status']
+    del result['status_change_time']
+    assert 'status_change_time' not in result and result.get('h4_status') is None
+    assert result['breadth'] == 55.0
+    with pytest.raises(KeyError):
+        result['flip_price']
+    with pytest.raises(KeyError):
+        del result['missing']
+
+
+def test_bytes_round_trip():
+    table = ResultTable.from_records([TrendResult(r) for r in RECORDS])
+    restored = ResultTable.from_bytes(table.to_bytes())
+    assert restored.to_records() == table.to_records() == RECORDS
+    assert restored.to_columns() == table.to_columns()
+    assert restored.columns['status'].dtype == np.int8
+    assert restored.columns['current_price'].dtype == np.float32
+    # 缺失字段（第二行无区间涨幅、均未计算翻转价）不输出
+    assert 'interval_change_pct' not in restored.to_records()[1]
+    assert restored.to_columns()['columns']['flip_price'] == [None, None]
+
+
+def test_large_values_fall_back_to_float64():
+    records = [dict(RECORDS[0], current_price=70123.45), RECORDS[1]]
+    table = ResultTable.from_bytes(ResultTable.from_records(records).to_bytes())
+    assert table.columns['current_price'].dtype == np.float64
+    assert table.columns['threshold'].dtype == np.float32
+    assert [r['current_price'] for r in table.to_records()] == [70123.45, 2100.0]
+
+
+def test_missing_rank_and_status():
+    table = ResultTable.from_records([{'index_code': 'A', 'index_name': '指数A', 'done': False}])
+    assert table.to_records() == [{'index_code': 'A', 'index_name': '指数A', 'done': False}]
+    assert ResultTable.from_records([]).to_records() == []
+
+
+def test_dumps_document():
+    table = ResultTable.from_records(RECORDS)
+    document = {'update_time': '2025-07-10 15:30:00', 'summary': {'yes_count': 1}}
+    from_table = dumps_document(dict(document, results=table))
+    assert from_table == dumps_document(dict(document, results=[TrendResult(r) for r in RECORDS]))
+    assert json.loads(from_table) == dict(document, results=RECORDS)
+    assert json.loads(dumps_document(document)) == document
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+盘中监控测试：翻转后的多笔行情保持首次穿越的时间与价格，状态回到基准时恢复基准记录，
+以及按刷新间隔计算的N分钟线状态
+"""
+from datetime import datetime
+
+import trend_watcher
+from trend_watcher import TrendWatcher
+
+
+class FakeAnalyzer:
+    ma_period = 5
+    history_status = {}
+
+    def __init__(self):
+        self.minute_calls = []
+
+    def analyze_minute_trend(self, index_code, bar_minutes=60):
+        self.minute_calls.append((index_code, bar_minutes))
+        if index_code == 'B':
+            raise ValueError('no minute bars')
+        return {'status': 'YES', 'threshold': 9.9, 'flip_price': 9.8, 'bar_time': '2025-07-08 10:30:00'}
+
+
+class Clock(datetime):
+    """可拨动的当前时间"""
+    current = datetime(2025, 7, 8, 10, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+def make_watcher(base):
+    watcher = TrendWatcher(FakeAnalyzer(), [{'code': 'A', 'name': '指数A'}])
+    watcher.rows['A'] = dict(base, index_code='A', index_name='指数A')
+    watcher.state['A'] = {
+        'symbol': 'sh000001', 'field': 3,
+        'prior_sum': 40.0,  # 翻转价 10
+        'prev_close': 9.5,
+        'base_status': base['status'],
+        'base_change_time': base.get('status_change_time'),
+        'base_change_before': base.get('status_change_before'),
+        'base_change_price': 11.0 if base.get('status_change_time') else None,
+        'live_change_time': None,
+        'live_change_price': None
+    }
+    return watcher
+
+
+def tick(watcher, monkeypatch, when, price):
+    Clock.current = when
+    monkeypatch.setattr(trend_watcher, 'datetime', Clock)
+    watcher._update_row('A', price)
+    return dict(watcher.rows['A'])
+
+
+def test_flip_keeps_first_crossing(monkeypatch):
+    watcher = make_watcher({'status': 'NO', 'status_change_time': '2025.6.20'})
+    row = tick(watcher, monkeypatch, datetime(2025, 7, 8, 10, 0), 9.8)
+    assert (row['status'], row['status_change_time'], row['interval_change_pct']) == ('NO', '2025.6.20', -10.91)
+
+    first = tick(watcher, monkeypatch, datetime(2025, 7, 8, 10, 5), 10.2)
+    assert (first['status'], first['status_change_time'], first['interval_change_pct']) == ('YES', '2025.7.8', 0)
+    # 之后的行情（跨日也一样）沿用首次穿越的时间与价格，区间涨幅随价格变化
+    later = tick(watcher, monkeypatch, datetime(2025, 7, 9, 10, 0), 10.71)
+    assert (later['status_change_time'], later['interval_change_pct']) == ('2025.7.8', 5.0)
+    assert tick(watcher, monkeypatch, datetime(2025, 7, 9, 10, 1), 10.0)['status_change_time'] == '2025.7.8'
+
+    # 回到基准状态：恢复基准记录；再次穿越时重新记录
+    back = tick(watcher, monkeypatch, datetime(2025, 7, 9, 11, 0), 9.9)
+    assert (back['status'], back['status_change_time']) == ('NO', '2025.6.20')
+    again = tick(watcher, monkeypatch, datetime(2025, 7, 10, 10, 0), 10.4)
+    assert (again['status_change_time'], again['interval_change_pct']) == ('2025.7.10', 0)
+
+
+def test_unknown_base_change_time(monkeypatch):
+    watcher = make_watcher({'status': 'NO', 'status_change_time': None, 'status_change_before': '2025.1.8'})
+    flipped = tick(watcher, monkeypatch, datetime(2025, 7, 8, 10, 0), 10.5)
+    assert flipped['status_change_time'] == '2025.7.8' and 'status_change_before' not in flipped
+    back = tick(watcher, monkeypatch, datetime(2025, 7, 8, 10, 5), 9.0)
+    assert back['status_change_time'] is None and back['status_change_before'] == '2025.1.8'
+    assert back['interval_change_pct'] == 0
+
+
+def test_minute_trend_is_throttled(monkeypatch):
+    watcher = TrendWatcher(FakeAnalyzer(), [], minute_bars=60, minute_refresh=300)
+    watcher.rows = {'A': {'index_name': '指数A'}, 'B': {'index_name': '指数B'}}
+    now = [1000.0]
+    monkeypatch.setattr(trend_watcher.time, 'time', lambda: now[0])
+    watcher.update_minute_trend()
+    assert watcher.rows['A']['minute_status'] == 'YES' and watcher.rows['A']['minute_flip_price'] == 9.8
+    # 单个指数失败不影响其他指数
+    assert watcher.rows['B']['minute_status'] is None
+    assert watcher.analyzer.minute_calls == [('A', 60), ('B', 60)]
+    now[0] += 299
+    watcher.update_minute_trend()
+    assert len(watcher.analyzer.minute_calls) == 2
+    now[0] += 1
+    watcher.update_minute_trend()
+    assert len(watcher.analyzer.minute_calls) == 4
+
+    # 未配置分钟线时不请求
+    plain = TrendWatcher(FakeAnalyzer(), [])
+    plain.rows = {'A': {'index_name': '指数A'}}
+    plain.update_minute_trend()
+    assert plain.analyzer.minute_calls == [] and 'minute_status' not in plain.rows['A']
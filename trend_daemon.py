@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+分析常驻进程模块 - 保持数据源、分析器及其缓存常驻内存，通过本地TCP端口接收运行请求
+协议为按行分隔的JSON：每个连接发送一行请求，返回一行响应
+    请求 {"task": "analyze", "force_refresh": false}  ->  {"ok": true, "result": {...}, "elapsed": 1.23}
+    请求 {"cmd": "ping"}                              ->  {"ok": true, "pong": true, "runs": 3}
+本模块只依赖标准库，网页服务端可直接导入request_daemon作为客户端
+"""
+import json
+import time
+import socket
+import logging
+import threading
+import socketserver
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('trend_daemon')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+def request_daemon(message, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=600, connect_timeout=5):
+    """
+    向常驻进程发送一个请求并等待响应
+    :param message: 请求dict
+    :param timeout: 连接后等待响应的超时（秒）
+    :param connect_timeout: 建立连接的超时（秒）
+    :return: 响应dict
+    :raises OSError: 连接失败（常驻进程未运行），请求未送达
+    :raises RuntimeError: 已连接但未收到响应（超时或连接中断），常驻进程可能仍在执行该请求
+    """
+    conn = socket.create_connection((host, port), timeout=connect_timeout)
+    with conn:
+        try:
+            conn.settimeout(timeout)
+            conn.sendall((json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8'))
+            line = conn.makefile('r', encoding='utf-8').readline()
+        except OSError as e:
+            raise RuntimeError(f'trend daemon did not respond ({type(e).__name__}: {e})') from e
+    if not line:
+        raise RuntimeError('trend daemon closed connection without response')
+    return json.loads(line)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """单个连接：读一行请求，写一行响应"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            response = self.server.daemon.dispatch(json.loads(line.decode('utf-8')))
+        except Exception as e:
+            logger.error(f"处理请求失败: {str(e)}", exc_info=True)
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write((json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8'))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class TrendDaemon:
+    """分析常驻进程"""
+
+    def __init__(self, handler, host=DEFAULT_HOST, port=DEFAULT_PORT, tasks=('analyze', 'report', 'html', 'push')):
+        """
+        :param handler: 执行一次运行的回调 handler(request) -> 可JSON序列化的结果
+        :param host: 监听地址（只应监听本机）
+        :param port: 监听端口
+        :param tasks: 允许的任务类型
+        """
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.tasks = tasks
+        self.runs = 0
+        # 分析器非线程安全，运行请求串行执行
+        self._lock = threading.Lock()
+
+    def dispatch(self, request):
+        """处理一个请求"""
+        if request.get('cmd') == 'ping':
+            return {'ok': True, 'pong': True, 'runs': self.runs}
+
+        task = request.get('task', 'analyze')
+        if task not in self.tasks:
+            return {'ok': False, 'error': f'unsupported task: {task}'}
+
+        with self._lock:
+            start = time.time()
+            result = self.handler(dict(request, task=task))
+            self.runs += 1
+            elapsed = round(time.time() - start, 3)
+        logger.info(f"任务{task}完成，耗时{elapsed}秒")
+        return {'ok': result is not None, 'result': result, 'elapsed': elapsed}
+
+    def serve_forever(self):
+        """监听并处理请求，直到进程被终止"""
+        with _Server((self.host, self.port), _RequestHandler) as server:
+            server.daemon = self
+            logger.info(f"分析常驻进程已启动: {self.host}:{self.port}")
+            server.serve_forever()
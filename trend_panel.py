@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+趋势面板计算模块 - 基于本地行情历史库，一次性向量化计算所有指数、所有交易日的趋势指标
+用于按历史日期重建排名表（不联网），状态转换时间/价格由行情推导
+"""
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from index_trend_analyzer import format_change_date
+from trend_result import TrendResult
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('trend_panel')
+
+# 最后一根K线与重建日期相隔超过该自然日数时视为无行情（覆盖春节、国庆等长假休市）
+MAX_STALE_DAYS = 15
+
+
+def load_quote_panel(data_source, index_list):
+    """
+    读取所有指数的本地历史行情，拼成长表
+    :param data_source: IndexDataSource实例（只读本地历史库）
+    :param index_list: 指数列表 [{'code': 'xxx', 'name': 'xxx'}, ...]
+    :return: DataFrame [index_code, trade_date, close]，按指数、日期排序
+    """
+    frames = []
+    for index_info in index_list:
+        history = data_source.load_history(index_info['code'])
+        if history.empty:
+            logger.warning(f"{index_info['name']}({index_info['code']})本地无历史行情")
+            continue
+        frame = history[['trade_date', 'close']].copy()
+        frame['index_code'] = index_info['code']
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=['index_code', 'trade_date', 'close'])
+    quotes = pd.concat(frames, ignore_index=True)
+    quotes['trade_date'] = pd.to_datetime(quotes['trade_date']).dt.normalize()
+    return quotes.sort_values(['index_code', 'trade_date'], kind='stable').reset_index(drop=True)
+
+
+def compute_trend_metrics(quotes, ma_period):
+    """
+    按K线计算趋势指标（分组滚动/位移，全部指数一次完成）
+    :param quotes: load_quote_panel返回的长表
+    :param ma_period: 均线周期
+    :return: DataFrame，在quotes基础上增加 threshold/status/deviation_rate/price_change_pct/
+             flip_price/next_flip_price/flip_date/change_price/interval_change_pct/since_date 列；均线不足的K线threshold为NaN；
+             此前未出现翻转的K线flip_date/change_price为空（与derive_status_change一致），since_date为首根可计算均线的K线日期
+    """
+    df = quotes.copy()
+    by_code = df.groupby('index_code', sort=False)['close']
+    df['threshold'] = by_code.rolling(ma_period).mean().reset_index(level=0, drop=True)
+    valid = df['threshold'].notna()
+
+    df['status'] = np.where(df['close'] >= df['threshold'], 'YES', 'NO')
+    df['deviation_rate'] = (df['close'] - df['threshold']) / df['threshold'] * 100
+    prev_close = by_code.shift(1)
+    df['price_change_pct'] = ((df['close'] - prev_close) / prev_close * 100).fillna(0)
+    
+    # 翻转价：当前K线之前N-1根收盘价均值；下一根K线为最近N-1根收盘价均值
+    df['next_flip_price'] = by_code.rolling(ma_period - 1).mean().reset_index(level=0, drop=True)
+    df['flip_price'] = df.groupby('index_code', sort=False)['next_flip_price'].shift(1)
+
+    # 状态翻转：与上一根有效K线状态不同（首根有效K线不是翻转，之前的状态未知）
+    is_yes = (df['status'] == 'YES').where(valid)
+    prev_yes = is_yes.groupby(df['index_code'], sort=False).shift(1)
+    marker = valid & prev_yes.notna() & (is_yes != prev_yes)
+    df['since_date'] = df['trade_date'].where(valid).groupby(df['index_code'], sort=False).transform('first')
+    flip_pos = pd.Series(np.where(marker, np.arange(len(df)), np.nan), index=df.index)
+    flip_pos = flip_pos.groupby(df['index_code'], sort=False).ffill()
+
+    has_flip = flip_pos.notna().to_numpy()
+    pos = flip_pos.fillna(0).to_numpy(dtype=int)
+    df['flip_date'] = df['trade_date'].to_numpy()[pos]
+    df['change_price'] = np.where(has_flip, df['close'].to_numpy()[pos], np.nan)
+    df.loc[~has_flip, 'flip_date'] = pd.NaT
+    df['interval_change_pct'] = (df['close'] - df['change_price']) / df['change_price'] * 100
+    return df
+
+
+def rank_as_of(metrics, index_list, as_of_dates, max_stale_days=MAX_STALE_DAYS):
+    """
+    按多个历史日期同时生成排名表：每个指数取不晚于该日期的最后一根K线
+    排序规则与IndexTrendAnalyzer.analyze_all_indices一致（YES在前，偏离率降序，同值保持配置顺序）
+    :param metrics: compute_trend_metrics返回的指标表
+    :param index_list: 指数列表（决定同值时的顺序及名称）
+    :param as_of_dates: 日期列表
+    :param max_stale_days: 最后一根K线早于该日期超过这么多自然日的指数（停牌、退市、历史库未更新）不列入
+    :return: dict {日期(Timestamp): 结果列表}
+    """
+    codes = [info['code'] for info in index_list]
+    names = {info['code']: info['name'] for info in index_list}
+    dates = pd.DatetimeIndex(pd.to_datetime(as_of_dates)).normalize().sort_values().unique()
+
+    valid = metrics[metrics['threshold'].notna()].assign(bar_date=lambda x: x['trade_date'])
+    calendar = valid['trade_date'].drop_duplicates().sort_values()
+    calendar = pd.DatetimeIndex(calendar).union(dates)
+
+    def wide(column):
+        table = valid.pivot(index='trade_date', columns='index_code', values=column)
+        return table.reindex(index=calendar, columns=codes).ffill().loc[dates]
+
+    close = wide('close').to_numpy(dtype=float)
+    threshold = wide('threshold').to_numpy(dtype=float)
+    price_change = wide('price_change_pct').to_numpy(dtype=float)
+    interval_change = wide('interval_change_pct').to_numpy(dtype=float)
+    flip_price = wide('flip_price').to_numpy(dtype=float)
+    next_flip_price = wide('next_flip_price').to_numpy(dtype=float)
+    bar_date = wide('bar_date')
+    flip_date = wide('flip_date')
+    since_date = wide('since_date')
+
+    stale = (dates.to_numpy()[:, None] - bar_date.to_numpy(dtype='datetime64[ns]')) > np.timedelta64(max_stale_days, 'D')
+    missing = np.isnan(close) | stale
+    deviation = np.round((close - threshold) / threshold * 100, 2)
+    is_no = close < threshold
+
+    # 按行排序：主键缺失→状态→偏离率降序→配置顺序（lexsort稳定，最后一个键为主键）
+    order = np.lexsort((
+        np.broadcast_to(np.arange(len(codes)), close.shape),
+        -np.nan_to_num(deviation),
+        is_no,
+        missing
+    ), axis=-1)
+
+    update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    tables = {}
+    for d, date in enumerate(dates):
+        rows = []
+        for col in order[d]:
+            if missing[d, col]:
+                break
+            code = codes[col]
+            # 此前未出现翻转：转换时间与价格未知，只记早于哪一天（与实时分析一致）
+            known = not pd.isna(flip_date.iat[d, col])
+            row = TrendResult({
+                'rank': len(rows) + 1,
+                'index_code': code,
+                'index_name': names[code],
+                'status': 'NO' if is_no[d, col] else 'YES',
+                'price_change_pct': round(float(price_change[d, col]), 2),
+                'current_price': round(float(close[d, col]), 2),
+                'threshold': round(float(threshold[d, col]), 2),
+                'deviation_rate': float(deviation[d, col]),
+                'status_change_time': format_change_date(flip_date.iat[d, col]) if known else None,
+                'interval_change_pct': round(float(np.nan_to_num(interval_change[d, col])), 2),
+                'flip_price': round(float(flip_price[d, col]), 2),
+                'flip_distance_pct': round(float((close[d, col] - flip_price[d, col]) / flip_price[d, col] * 100), 2),
+                'next_flip_price': round(float(next_flip_price[d, col]), 2),
+                'trade_date': bar_date.iat[d, col].strftime('%Y-%m-%d'),
+                'update_time': update_time
+            })
+            if not known:
+                row['status_change_before'] = format_change_date(since_date.iat[d, col])
+            rows.append(row)
+        tables[date] = rows
+    return tables
+
+
+def summarize_as_of(results, as_of_date):
+    """
+    历史日期的状态摘要（与get_status_change_summary同结构，新转换以该日K线为准）
+    :param results: 某日的排名表
+    :param as_of_date: 日期
+    """
+    day = format_change_date(as_of_date)
+    return {
+        'total': len(results),
+        'yes_count': len([r for r in results if r['status'] == 'YES']),
+        'no_count': len([r for r in results if r['status'] == 'NO']),
+        'new_yes': [r['index_name'] for r in results if r['status'] == 'YES' and r['status_change_time'] == day],
+        'new_no': [r['index_name'] for r in results if r['status'] == 'NO' and r['status_change_time'] == day]
+    }
+
+
+def trading_days(metrics, start_date, end_date):
+    """区间内任一指数有K线的交易日"""
+    days = metrics.loc[metrics['threshold'].notna(), 'trade_date']
+    days = days[(days >= pd.Timestamp(start_date)) & (days <= pd.Timestamp(end_date))]
+    return sorted(days.unique())
@@ -9,20 +9,40 @@ from tabulate import tabulate
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('trend_reporter')
 
+# 多周期状态列（结果中存在时才显示）
+TIMEFRAME_COLUMNS = [('weekly_status', '周线'), ('monthly_status', '月线')]
+
+
+def _timeframe_columns(results):
+    """结果中包含的多周期状态列"""
+    return [(key, label) for key, label in TIMEFRAME_COLUMNS if results and key in results[0]]
+
+def change_time_text(result):
+    """状态转变时间的显示文本：转换时间未知时显示早于哪一天"""
+    if result.get('status_change_time'):
+        return result['status_change_time']
+    if result.get('status_change_before'):
+        return f"早于{result['status_change_before']}"
+    return '-'
+
 class TrendReporter:
     """趋势报告生成器"""
     
     def __init__(self, notifier=None):
         self.notifier = notifier
     
-    def generate_text_report(self, results, title="鱼盆趋势模型v2.0"):
+    def generate_text_report(self, results, title="鱼盆趋势模型v2.0", report_date=None):
         """
         生成文本格式报告
         :param results: 分析结果列表
         :param title: 报告标题
+        :param report_date: 报告日期（重建历史报告时使用），默认今天
         :return: str, 报告文本
         """
-        today = datetime.now().strftime('%Y.%m.%d')
+        today = (report_date or datetime.now()).strftime('%Y.%m.%d')
+        
+        timeframe_cols = _timeframe_columns(results)
+        has_flip = bool(results) and 'flip_price' in results[0]
         
         # 构建表格数据
         table_data = []
@@ -49,14 +69,22 @@ class TrendReporter:
                 result['current_price'],
                 result['threshold'],
                 deviation_str,
-                result['status_change_time'],
+                change_time_text(result),
                 interval_change_str
             ]
+            if has_flip:
+                row.append(f"{result['flip_price']} ({result['flip_distance_pct']:+.2f}%)")
+            for key, _ in timeframe_cols:
+                tf_status = result.get(key)
+                row.append('\033[32mYES\033[0m' if tf_status == 'YES' else ('\033[31mNO\033[0m' if tf_status == 'NO' else '-'))
             table_data.append(row)
         
         # 表头
         headers = ['趋势\n强度', '代码', '名称', '状态', '涨幅%', '现价', 
                    '临界\n值点', '偏离率%', '状态转\n变时间', '区间涨幅\n%']
+        if has_flip:
+            headers.append('翻转价\n(距离%)')
+        headers += [label for _, label in timeframe_cols]
         
         # 生成表格
         report = f"{title}    日期: {today}\n"
@@ -99,7 +127,12 @@ class TrendReporter:
                 report += f"   现价: {r['current_price']}, 临界值: {r['threshold']}\n"
                 report += f"   偏离率: {r['deviation_rate']:.2f}%\n"
                 report += f"   区间涨幅: {r['interval_change_pct']:+.2f}%\n"
-                report += f"   状态转变时间: {r['status_change_time']}\n"
+                report += f"   状态转变时间: {change_time_text(r)}\n"
+                if 'flip_price' in r:
+                    report += f"   翻转价: {r['flip_price']}（距离{r['flip_distance_pct']:+.2f}%）\n"
+                timeframe_text = ', '.join(f"{label}: {r.get(key) or '-'}" for key, label in _timeframe_columns([r]))
+                if timeframe_text:
+                    report += f"   {timeframe_text}\n"
             report += "\n"
         
         # NO状态指数
@@ -111,18 +144,28 @@ class TrendReporter:
                 report += f"   现价: {r['current_price']}, 临界值: {r['threshold']}\n"
                 report += f"   偏离率: {r['deviation_rate']:.2f}%\n"
                 report += f"   区间跌幅: {r['interval_change_pct']:+.2f}%\n"
-                report += f"   状态转变时间: {r['status_change_time']}\n"
+                report += f"   状态转变时间: {change_time_text(r)}\n"
+                if 'flip_price' in r:
+                    report += f"   翻转价: {r['flip_price']}（距离{r['flip_distance_pct']:+.2f}%）\n"
+                timeframe_text = ', '.join(f"{label}: {r.get(key) or '-'}" for key, label in _timeframe_columns([r]))
+                if timeframe_text:
+                    report += f"   {timeframe_text}\n"
         
         return report
     
-    def generate_html_report(self, results, title="鱼盆趋势模型v2.0"):
+    def generate_html_report(self, results, title="鱼盆趋势模型v2.0", report_date=None):
         """
         生成HTML格式报告
         :param results: 分析结果列表
         :param title: 报告标题
+        :param report_date: 报告日期（重建历史报告时使用），默认今天
         :return: str, HTML文本
         """
-        today = datetime.now().strftime('%Y.%m.%d')
+        today = (report_date or datetime.now()).strftime('%Y.%m.%d')
+        timeframe_cols = _timeframe_columns(results)
+        has_flip = bool(results) and 'flip_price' in results[0]
+        extra_headers = '\n                <th>翻转价(距离%)</th>' if has_flip else ''
+        extra_headers += ''.join(f"\n                <th>{label}</th>" for _, label in timeframe_cols)
         
         html = f"""
 <!DOCTYPE html>
@@ -235,7 +278,7 @@ class TrendReporter:
                 <th>临界值点</th>
                 <th>偏离率</th>
                 <th>状态转变时间</th>
-                <th>区间涨幅%</th>
+                <th>区间涨幅%</th>{extra_headers}
             </tr>
         </thead>
         <tbody>
@@ -245,6 +288,13 @@ class TrendReporter:
             status_class = 'status-yes' if result['status'] == 'YES' else 'status-no'
             price_change_class = 'positive' if result['price_change_pct'] >= 0 else 'negative'
             interval_change_class = 'positive' if result['interval_change_pct'] >= 0 else 'negative'
+            extra_cells = ''
+            if has_flip:
+                extra_cells += f"\n                <td>{result['flip_price']} ({result['flip_distance_pct']:+.2f}%)</td>"
+            for key, _ in timeframe_cols:
+                tf_status = result.get(key)
+                tf_class = 'status-yes' if tf_status == 'YES' else ('status-no' if tf_status == 'NO' else '')
+                extra_cells += f'\n                <td class="{tf_class}">{tf_status or "-"}</td>'
             
             html += f"""
             <tr>
@@ -256,8 +306,8 @@ class TrendReporter:
                 <td>{result['current_price']}</td>
                 <td>{result['threshold']}</td>
                 <td>{result['deviation_rate']:.2f}%</td>
-                <td>{result['status_change_time']}</td>
-                <td class="{interval_change_class}">{result['interval_change_pct']:+.2f}%</td>
+                <td>{change_time_text(result)}</td>
+                <td class="{interval_change_class}">{result['interval_change_pct']:+.2f}%</td>{extra_cells}
             </tr>
 """
         
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+趋势结果模块 - 紧凑的结果表示
+TrendResult：单个指数的结果记录（__slots__，支持dict式读写，可直接替代原结果dict）
+ResultTable：一组结果的列式表示（状态为int8类别编码、数值列float32），
+提供向量化的JSON序列化（按行或按列）与npz二进制格式
+"""
+import io
+import json
+import logging
+import numpy as np
+from collections.abc import MutableMapping
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('trend_result')
+
+TEXT_FIELDS = ('index_code', 'index_name', 'status_change_time', 'trade_date', 'update_time')
+NUMERIC_FIELDS = ('price_change_pct', 'current_price', 'threshold', 'deviation_rate', 'interval_change_pct',
+                  'flip_price', 'flip_distance_pct', 'next_flip_price')
+# 字段顺序与原结果dict一致
+FIELDS = ('rank', 'index_code', 'index_name', 'status', 'price_change_pct', 'current_price', 'threshold',
+          'deviation_rate', 'status_change_time', 'interval_change_pct', 'flip_price', 'flip_distance_pct',
+          'next_flip_price', 'trade_date', 'update_time')
+STATUS_CATEGORIES = ('NO', 'YES')
+# float32在65536以下的间距小于0.005，保留两位小数无误差；超过时该列退回float64
+FLOAT32_LIMIT = 65536
+
+
+class TrendResult(MutableMapping):
+    """单个指数的趋势结果：固定字段存于slots，其余字段（多周期状态、成分股宽度等）存于_extra"""
+
+    __slots__ = FIELDS + ('_extra',)
+
+    def __init__(self, *args, **kwargs):
+        self._extra = None
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __iter__(self):
+        for key in FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for key in FIELDS if hasattr(self, key)) + len(self._extra or ())
+
+    def __repr__(self):
+        return f"TrendResult({self.to_dict()!r})"
+
+    def to_dict(self):
+        """转为普通dict"""
+        return dict(self)
+
+
+class ResultTable:
+    """一组趋势结果的列式表示"""
+
+    def __init__(self, columns, extras):
+        """
+        :param columns: 字段名 -> numpy数组（文本列空串、数值列NaN、rank/status为-1表示该行无此字段）
+        :param extras: 每行的附加字段dict列表
+        """
+        self.columns = columns
+        self.extras = extras
+
+    def __len__(self):
+        return len(self.extras)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        由结果记录（TrendResult或dict）构建
+        :param records: 结果列表
+        """
+        records = list(records)
+        columns = {
+            'rank': np.array([r.get('rank', -1) for r in records], dtype=np.int32),
+            'status': np.array([STATUS_CATEGORIES.index(r['status']) if r.get('status') in STATUS_CATEGORIES else -1
+                                for r in records], dtype=np.int8)
+        }
+        for field in TEXT_FIELDS:
+            columns[field] = np.array([r.get(field) or '' for r in records], dtype=str)
+        for field in NUMERIC_FIELDS:
+            values = np.array([r.get(field, np.nan) for r in records], dtype=np.float64)
+            small = not len(values) or np.nanmax(np.abs(values), initial=0) < FLOAT32_LIMIT
+            columns[field] = values.astype(np.float32) if small else values
+        extras = [{k: v for k, v in r.items() if k not in FIELDS} for r in records]
+        return cls(columns, extras)
+
+    @property
+    def nbytes(self):
+        """列数据占用字节数（不含附加字段）"""
+        return sum(col.nbytes for col in self.columns.values())
+
+    def _column_lists(self):
+        """各列转为Python列表，缺失值为None，数值保留两位小数"""
+        lists = {}
+        for field in FIELDS:
+            col = self.columns[field]
+            if field in NUMERIC_FIELDS:
+                rounded = np.round(col.astype(np.float64), 2)
+                lists[field] = np.where(np.isnan(rounded), None, rounded).tolist()
+            elif field == 'status':
+                categories = np.array((None,) + STATUS_CATEGORIES, dtype=object)
+                lists[field] = categories[col + 1].tolist()
+            elif field == 'rank':
+                lists[field] = np.where(col < 0, None, col).tolist()
+            else:
+                lists[field] = np.where(col == '', None, col).tolist()
+        return lists
+
+    def to_records(self):
+        """按行输出为普通dict列表（缺失字段不输出），供JSON序列化"""
+        lists = self._column_lists()
+        records = []
+        for i, extra in enumerate(self.extras):
+            record = {field: lists[field][i] for field in FIELDS if lists[field][i] is not None}
+            if extra:
+                record.update(extra)
+            records.append(record)
+        return records
+
+    def to_results(self):
+        """按行还原为TrendResult列表"""
+        return [TrendResult(record) for record in self.to_records()]
+
+    def to_columns(self):
+        """按列输出：{'fields': [...], 'columns': {字段: 列表}, 'extras': [...]}，比按行输出更小"""
+        return {'fields': list(FIELDS), 'columns': self._column_lists(), 'extras': self.extras}
+
+    def to_bytes(self):
+        """npz二进制格式（压缩，附加字段以JSON文本存放）"""
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, extras=np.array(json.dumps(self.extras, ensure_ascii=False)), **self.columns)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """由to_bytes的输出还原"""
+        with np.load(io.BytesIO(data)) as npz:
+            columns = {field: npz[field] for field in FIELDS}
+            extras = json.loads(str(npz['extras']))
+        return cls(columns, extras)
+
+
+def dumps_document(document, indent=None):
+    """
+    序列化结果文档（含results列表的dict）为JSON文本，results经列式表向量化处理
+    :param document: 如 {'update_time': ..., 'summary': ..., 'results': [...]}，results也可为ResultTable
+    :param indent: 缩进，默认紧凑输出
+    """
+    document = dict(document)
+    results = document.get('results')
+    if results is not None:
+        table = results if isinstance(results, ResultTable) else ResultTable.from_records(results)
+        document['results'] = table.to_records()
+    separators = None if indent else (',', ':')
+    return json.dumps(document, ensure_ascii=False, indent=indent, separators=separators)
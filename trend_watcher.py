@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+盘中监控模块 - 交易时段内轮询批量实时行情，增量更新各指数的临时K线与状态
+开盘前做一次完整分析得到各指数的前N-1根收盘价，之后每笔行情只需O(1)计算：
+价格 >= 翻转价 即为YES，临时均线 = (前N-1根收盘价之和 + 现价) / N
+可选同时给出N分钟K线（如60分钟线）的盘中状态，按同样的均线逻辑由分钟K线重采样计算
+"""
+import time
+import logging
+from datetime import datetime, timedelta, time as dtime
+from market_data_source import MarketDataSource
+from index_trend_analyzer import IndexTrendAnalyzer, format_change_date, status_at_price
+from file_utils import write_text_atomic
+from trend_result import dumps_document
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('trend_watcher')
+
+# 交易时段（覆盖A股与港股，北京时间）
+TRADING_SESSIONS = [(dtime(9, 30), dtime(12, 0)), (dtime(13, 0), dtime(16, 10))]
+
+
+def in_trading_session(now):
+    """是否处于交易时段"""
+    if now.weekday() >= 5:
+        return False
+    return any(start <= now.time() <= end for start, end in TRADING_SESSIONS)
+
+
+def session_finished(now):
+    """当日交易时段是否已全部结束"""
+    return now.weekday() >= 5 or now.time() > TRADING_SESSIONS[-1][1]
+
+
+class TrendWatcher:
+    """盘中趋势监控"""
+
+    def __init__(self, analyzer, index_list, interval=10,
+                 result_file='data/trend_status/latest_trend_result.json', minute_bars=None, minute_refresh=300):
+        """
+        :param analyzer: IndexTrendAnalyzer实例
+        :param index_list: 指数列表 [{'code': 'xxx', 'name': 'xxx'}, ...]
+        :param interval: 轮询间隔（秒）
+        :param result_file: 结果发布文件
+        :param minute_bars: 盘中N分钟K线状态的K线分钟数（如60），None为不计算
+        :param minute_refresh: N分钟K线状态的刷新间隔（秒）
+        """
+        self.analyzer = analyzer
+        self.index_list = index_list
+        self.interval = interval
+        self.result_file = result_file
+        self.minute_bars = minute_bars
+        self.minute_refresh = minute_refresh
+        self._minute_checked = None
+        self.state = {}       # 指数代码 -> 盘中计算所需的前置数据
+        self.rows = {}        # 指数代码 -> 当前结果行
+        self.published = {}   # 指数代码 -> 上次发布的(状态, 现价)
+
+    def prepare(self, force_refresh=False):
+        """
+        完整分析一次作为基准，并为每个指数准备前N-1根收盘价之和与昨收
+        :return: 基准结果列表
+        """
+        results = self.analyzer.analyze_all_indices(self.index_list, force_refresh=force_refresh)
+        today = datetime.now().strftime('%Y-%m-%d')
+        start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
+        n = self.analyzer.ma_period
+
+        for result in results:
+            code = result['index_code']
+            self.rows[code] = result
+            symbol = MarketDataSource.sina_realtime_symbol(code)
+            if not symbol:
+                logger.warning(f"{result['index_name']}({code})无实时行情代码，盘中保持基准结果")
+                continue
+            # 与分析器相同参数，命中当日行情缓存
+            quote_df = self.analyzer.data_source.get_index_quote(code, start_date, today)
+            closes = quote_df['close'].to_numpy(dtype=float)
+            # 基准已包含今日K线（盘中启动）时，今日K线为临时K线，前置数据取其之前
+            if result.get('trade_date') == today:
+                closes = closes[:-1]
+            if len(closes) < n - 1:
+                continue
+            self.state[code] = {
+                'symbol': symbol[0],
+                'field': symbol[1],
+                'prior_sum': float(closes[-(n - 1):].sum()),
+                'prev_close': float(closes[-1]),
+                'base_status': result['status'],
+                'base_change_time': result.get('status_change_time'),
+                'base_change_before': result.get('status_change_before'),
+                # 翻转早于本地历史时无转换价格（None），区间涨幅记为0
+                'base_change_price': self.analyzer.history_status[code].get('status_change_price'),
+                # 盘中首次穿越翻转价的时间与价格（状态回到基准时清空）
+                'live_change_time': None,
+                'live_change_price': None
+            }
+        self.update_minute_trend()
+        self.publish(force=True)
+        return results
+
+    def update_minute_trend(self):
+        """
+        按N分钟K线的均线逻辑更新各指数的分钟线状态（minute_status/minute_threshold/minute_flip_price/minute_bar_time），
+        每minute_refresh秒最多一次
+        """
+        if not self.minute_bars:
+            return
+        if self._minute_checked is not None and time.time() - self._minute_checked < self.minute_refresh:
+            return
+        self._minute_checked = time.time()
+        for code, row in self.rows.items():
+            try:
+                minute = self.analyzer.analyze_minute_trend(code, self.minute_bars)
+            except Exception as e:
+                logger.warning(f"{row['index_name']}({code}){self.minute_bars}分钟线状态计算失败: {str(e)}")
+                minute = None
+            row.update({
+                'minute_status': minute['status'] if minute else None,
+                'minute_threshold': minute['threshold'] if minute else None,
+                'minute_flip_price': minute['flip_price'] if minute else None,
+                'minute_bar_time': minute['bar_time'] if minute else None
+            })
+
+    def _update_row(self, code, price):
+        """用一笔实时价格更新临时K线（O(1)）"""
+        state = self.state[code]
+        n = self.analyzer.ma_period
+        flip_price = state['prior_sum'] / (n - 1)
+        threshold = (state['prior_sum'] + price) / n
+        status = status_at_price(price, flip_price)
+
+        row = self.rows[code]
+        if status != state['base_status']:
+            # 转换时间与价格取盘中首次穿越时的值，之后的行情不再改写
+            if state['live_change_time'] is None:
+                state['live_change_time'], state['live_change_price'] = format_change_date(datetime.now()), price
+            change_time, change_price = state['live_change_time'], state['live_change_price']
+            row.pop('status_change_before', None)
+        else:
+            state['live_change_time'] = state['live_change_price'] = None
+            change_time, change_price = state['base_change_time'], state['base_change_price']
+            if state['base_change_before']:
+                row['status_change_before'] = state['base_change_before']
+
+        row.update({
+            'status': status,
+            'price_change_pct': round((price - state['prev_close']) / state['prev_close'] * 100, 2),
+            'current_price': round(price, 2),
+            'threshold': round(threshold, 2),
+            'deviation_rate': round((price - threshold) / threshold * 100, 2),
+            'status_change_time': change_time,
+            'interval_change_pct': round((price - change_price) / change_price * 100, 2) if change_price else 0,
+            'flip_price': round(flip_price, 2),
+            'flip_distance_pct': round((price - flip_price) / flip_price * 100, 2),
+            'trade_date': datetime.now().strftime('%Y-%m-%d'),
+            'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'provisional': True
+        })
+
+    def poll_once(self):
+        """
+        拉取一次批量行情并更新
+        :return: 是否有变化并已发布
+        """
+        symbols = sorted({s['symbol'] for s in self.state.values()})
+        if not symbols:
+            return False
+        quotes = MarketDataSource.get_batch_quotes(symbols)
+        for code, state in self.state.items():
+            fields = quotes.get(state['symbol'])
+            try:
+                price = float(fields[state['field']]) if fields else 0
+            except (ValueError, IndexError):
+                continue
+            if price > 0:
+                self._update_row(code, price)
+        self.update_minute_trend()
+        return self.publish()
+
+    def publish(self, force=False):
+        """状态或价格有变化时重新排名并原子写入结果文件"""
+        snapshot = {code: (r['status'], r['current_price'], r.get('minute_status')) for code, r in self.rows.items()}
+        if not force and snapshot == self.published:
+            return False
+        results = IndexTrendAnalyzer.rank_results(list(self.rows.values()))
+        write_text_atomic(self.result_file, dumps_document({
+            'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'intraday': True,
+            **({'minute_bars': self.minute_bars} if self.minute_bars else {}),
+            'summary': self.analyzer.get_status_change_summary(results),
+            'results': results
+        }))
+
+        changed = [code for code, value in snapshot.items() if self.published.get(code, value)[0] != value[0]]
+        for code in changed:
+            logger.info(f"盘中状态变化: {self.rows[code]['index_name']} -> {self.rows[code]['status']}")
+        self.published = snapshot
+        return True
+
+    def run(self, force_refresh=False):
+        """交易时段内持续轮询，收盘后退出"""
+        self.prepare(force_refresh=force_refresh)
+        logger.info(f"盘中监控启动，{len(self.state)}个指数，轮询间隔{self.interval}秒")
+        while True:
+            now = datetime.now()
+            if session_finished(now):
+                logger.info("交易时段已结束，盘中监控退出")
+                break
+            if in_trading_session(now):
+                self.poll_once()
+            time.sleep(self.interval)
@@ -0,0 +1,249 @@
+"""
+网页服务的ASGI版本（纯ASGI，不依赖框架）：与 server.py 提供相同的接口与静态文件，
+直接复用其结果缓存、预压缩正文、事件编码与刷新/历史查询逻辑。
+推送连接(/api/stream)只占用一个协程，单进程即可保持数千个空闲连接；结果文件的变化由
+一个后台任务每秒检查一次后通知所有连接，检查次数与连接数无关。
+
+运行（在web目录下）：
+    uvicorn asgi_server:app --host 127.0.0.1 --port 5000
+"""
+import asyncio
+import functools
+import json
+from urllib.parse import parse_qs
+
+import server
+from result_cache import choose_encoding, etag_matches
+
+
+async def run_sync(func, *args):
+    """在线程池中执行阻塞调用（文件读取、SQLite查询等）"""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args))
+
+
+class ResultBroadcaster:
+    """后台检查结果版本，变化时唤醒所有等待中的推送连接"""
+
+    def __init__(self, cache, interval=server.STREAM_POLL_INTERVAL):
+        self.cache = cache
+        self.interval = interval
+        self.content = None
+        self.changed = None  # 当前版本的asyncio.Event，版本变化时set并换成新的Event
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self.changed = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                content = await run_sync(self.cache.get)
+            except Exception as e:
+                print(f'[WARN] Stream read failed: {str(e)}')
+                content = None
+            if content is not None and (self.content is None or content.version != self.content.version):
+                self.content = content
+                changed, self.changed = self.changed, asyncio.Event()
+                changed.set()
+            await asyncio.sleep(self.interval)
+
+
+broadcaster = ResultBroadcaster(server.latest_cache)
+API_ROUTES = {'/api/stream', '/api/latest', '/api/refresh', '/api/history'}
+
+
+def request_headers(scope):
+    """请求头dict（小写名）"""
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+
+
+def query_args(scope):
+    """查询参数dict（同名参数取第一个）"""
+    return {key: values[0] for key, values in parse_qs(scope['query_string'].decode('utf-8')).items()}
+
+
+async def read_body(receive):
+    """读取完整请求体"""
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return body
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+def encode_headers(headers):
+    """响应头（附加安全响应头）编码为ASGI格式"""
+    headers = dict(server.SECURITY_HEADERS, **headers)
+    return [(k.lower().encode('latin-1'), str(v).encode('latin-1')) for k, v in headers.items()]
+
+
+def client_address(scope):
+    """客户端地址（代理后需以 uvicorn --proxy-headers 运行）"""
+    client = scope.get('client')
+    return client[0] if client else None
+
+
+async def send_response(send, status, body=b'', headers=None, head=False):
+    """发送完整响应"""
+    headers = dict(headers or {}, **{'Content-Length': len(body)})
+    await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+    await send({'type': 'http.response.body', 'body': b'' if head else body})
+
+
+async def send_json(send, data, status=200, head=False, headers=None):
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    await send_response(send, status, body, dict(headers or {}, **{'Content-Type': 'application/json'}), head)
+
+
+def with_charset(mimetype):
+    return f'{mimetype}; charset=utf-8' if mimetype.startswith('text/') else mimetype
+
+
+async def send_cached(send, headers, cached, mimetype, cache_control='no-cache', head=False):
+    """预编码正文的响应，与server.cached_response相同：协商压缩编码、强ETag、命中时304"""
+    encoding = choose_encoding(headers.get('accept-encoding'))
+    body, etag = cached.encoded(encoding)
+    response_headers = {'Vary': 'Accept-Encoding', 'Cache-Control': cache_control, 'ETag': f'"{etag}"'}
+    if etag_matches(headers.get('if-none-match'), etag):
+        await send_response(send, 304, b'', response_headers, head)
+        return
+    response_headers['Content-Type'] = with_charset(mimetype)
+    if body is not cached.body:
+        response_headers['Content-Encoding'] = encoding
+    await send_response(send, 200, body, response_headers, head)
+
+
+async def serve_static(send, headers, filename, head=False):
+    entry = await run_sync(server.static_entry, filename)
+    if entry is None:
+        await send_json(send, {'ok': False, 'error': 'not found'}, 404, head)
+        return
+    path, mimetype, cache_control, cached = entry
+    if cached is not None:
+        await send_cached(send, headers, cached, mimetype, cache_control, head)
+        return
+    with open(path, 'rb') as f:
+        body = await run_sync(f.read)
+    await send_response(send, 200, body, {'Content-Type': with_charset(mimetype), 'Cache-Control': cache_control},
+                        head)
+
+
+async def api_stream(scope, receive, send):
+    """结果推送，事件内容与server.api_stream相同；连接不设时长上限"""
+    broadcaster.start()
+    last_event_id = request_headers(scope).get('last-event-id')
+    await send({'type': 'http.response.start', 'status': 200, 'headers': encode_headers({
+        'Content-Type': 'text/event-stream; charset=utf-8',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # 关闭Nginx代理缓冲
+    })})
+    await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+
+    # 请求体已读完，下一条消息即为断开
+    disconnected = asyncio.ensure_future(receive())
+    sent = None
+    try:
+        while not disconnected.done():
+            changed = broadcaster.changed
+            content = broadcaster.content
+            event = b''
+            if content is not None and (sent is None or content.version != sent.version):
+                if sent is None and content.version == last_event_id:
+                    event = b''  # 重连且客户端已是最新版本
+                elif sent is None:
+                    event = server.snapshot_event(content)
+                else:
+                    event = server.update_event(sent, content)
+                sent = content
+            if event:
+                await send({'type': 'http.response.body', 'body': event, 'more_body': True})
+            waiter = asyncio.ensure_future(changed.wait())
+            done, _ = await asyncio.wait({waiter, disconnected}, timeout=server.STREAM_HEARTBEAT,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if not done:
+                await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+    except OSError:
+        pass  # 客户端已断开
+    finally:
+        disconnected.cancel()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            broadcaster.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await broadcaster.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI入口"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    path = scope['path']
+    method = scope['method']
+    head = method == 'HEAD'
+    body = await read_body(receive)
+    headers = request_headers(scope)
+    try:
+        if path == '/api/stream' and method == 'GET':
+            await api_stream(scope, receive, send)
+        elif path == '/api/latest' and method in ('GET', 'HEAD'):
+            args = query_args(scope)
+            cached, error = await run_sync(server.latest_body, args.get('format'), args)
+            if error:
+                await send_json(send, error[0], error[1], head)
+            else:
+                await send_cached(send, headers, cached, 'application/json', head=head)
+        elif path == '/api/refresh' and method == 'POST':
+            allowed, retry_after = await run_sync(server.refresh_limiter.hit, client_address(scope))
+            if not allowed:
+                result, status, limit_headers = server.rate_limited_response(retry_after)
+                await send_json(send, result, status, headers=limit_headers)
+                return
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                payload = {}
+            result, status = await run_sync(server.refresh, payload if isinstance(payload, dict) else {})
+            await send_json(send, result, status)
+        elif path.startswith('/api/series/') and method in ('GET', 'HEAD'):
+            cached, error = await run_sync(server.series_body, path[len('/api/series/'):], query_args(scope))
+            if error:
+                await send_json(send, error[0], error[1], head)
+            else:
+                await send_cached(send, headers, cached, 'application/json', head=head)
+        elif path.startswith('/api/jobs/') and method in ('GET', 'HEAD'):
+            result, status = await run_sync(server.job_status, path[len('/api/jobs/'):])
+            await send_json(send, result, status, head)
+        elif path == '/api/history' and method in ('GET', 'HEAD'):
+            result, status = await run_sync(server.history_query, query_args(scope))
+            await send_json(send, result, status, head)
+        elif path in API_ROUTES:
+            await send_json(send, {'ok': False, 'error': 'method not allowed'}, 405)
+        elif method in ('GET', 'HEAD'):
+            await serve_static(send, headers, 'index.html' if path == '/' else path.lstrip('/'), head)
+        else:
+            await send_json(send, {'ok': False, 'error': 'method not allowed'}, 405)
+    except Exception as e:
+        print(f'[ERROR] {method} {path}: {str(e)}')
+        await send_json(send, {'ok': False, 'error': f'Unexpected error: {str(e)}'}, 500)
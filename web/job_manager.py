@@ -0,0 +1,148 @@
+"""
+网页刷新任务管理：
+- 并发的刷新请求合并为同一个进行中的任务；多个gunicorn worker之间通过任务状态文件与文件锁协调
+- 任务在后台线程中执行（交给分析常驻进程，未运行时回退为子进程），结束后记录结果或错误
+- 查询任务状态时合并运行进度文件（已完成数/总数、正在获取的指数与数据源）
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows下只在进程内加锁
+    fcntl = None
+
+from file_utils import write_json_atomic
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class JobManager:
+    """刷新任务管理器"""
+
+    def __init__(self, state_file, progress_file, runner, max_jobs=20, stale_seconds=900):
+        """
+        :param state_file: 任务状态文件（各worker共享）
+        :param progress_file: 分析程序写入的运行进度文件
+        :param runner: runner(job_id) -> 可JSON序列化的结果，抛出异常视为失败
+        :param max_jobs: 保留的任务记录数
+        :param stale_seconds: 超过该时长仍未结束的任务视为已失效（如worker被重启），应不小于runner的最长运行时长
+        """
+        self.state_file = str(state_file)
+        self.progress_file = str(progress_file)
+        self.runner = runner
+        self.max_jobs = max_jobs
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """进程内线程锁 + 跨进程文件锁"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(self.state_file + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault('active', None)
+        state.setdefault('jobs', {})
+        return state
+
+    def _save(self, state):
+        # 只保留最近max_jobs个任务
+        jobs = sorted(state['jobs'].values(), key=lambda job: job['started'])
+        state['jobs'] = {job['id']: job for job in jobs[-self.max_jobs:]}
+        write_json_atomic(self.state_file, state)
+
+    def _stale(self, job):
+        return time.time() - job['started'] > self.stale_seconds or not _pid_alive(job['pid'])
+
+    def submit(self):
+        """
+        提交刷新任务：已有进行中的任务时直接返回该任务
+        :return: (任务dict, 是否合并到已有任务)
+        """
+        with self._locked():
+            state = self._load()
+            active = state['jobs'].get(state['active']) if state['active'] else None
+            if active and active['status'] == 'running':
+                if not self._stale(active):
+                    return active, True
+                active.update(status='failed', error='job lost (worker exited or timed out)',
+                              finished_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            job = {
+                'id': secrets.token_hex(8),
+                'status': 'running',
+                'created_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'started': time.time(),
+                'pid': os.getpid()
+            }
+            state['jobs'][job['id']] = job
+            state['active'] = job['id']
+            self._save(state)
+        threading.Thread(target=self._run, args=(job['id'],), daemon=True).start()
+        return job, False
+
+    def _run(self, job_id):
+        result, error = None, None
+        try:
+            result = self.runner(job_id)
+        except Exception as e:
+            error = str(e)
+            print(f'[ERROR] Refresh job {job_id} failed: {error}')
+        with self._locked():
+            state = self._load()
+            job = state['jobs'].get(job_id)
+            if job is not None:
+                job.update(status='failed' if error else 'done', result=result, error=error,
+                           finished_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            if state['active'] == job_id:
+                state['active'] = None
+            self._save(state)
+
+    def get(self, job_id):
+        """
+        任务状态；进行中的任务附带运行进度 {'stage', 'done', 'total', 'current', 'provider'}
+        :return: dict，任务不存在为None
+        """
+        job = self._load()['jobs'].get(job_id)
+        if job is None:
+            return None
+        job = dict(job)
+        if job['status'] == 'running':
+            if self._stale(job):
+                job.update(status='failed', error='job lost (worker exited or timed out)')
+            try:
+                with open(self.progress_file, 'r', encoding='utf-8') as f:
+                    progress = json.load(f)
+                if progress.get('job_id') == job_id:
+                    job['progress'] = {key: progress.get(key) for key in ('stage', 'done', 'total', 'current', 'provider')}
+            except (OSError, ValueError):
+                pass
+        job.pop('pid', None)
+        return job
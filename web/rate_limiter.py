@@ -0,0 +1,124 @@
+"""
+跨worker共享的请求频率限制：
+- 计数存于SQLite（WAL模式），多个gunicorn worker共用同一份计数，限额不会随worker数放大
+- 每个客户端只保存两个固定窗口的计数（上一窗口与当前窗口），按时间加权估算滑动窗口内的请求数，
+  每次请求只按主键读写一行，开销与请求历史长短无关
+- 空闲超过两个窗口的客户端定期清除；客户端数超过上限时按最近访问时间淘汰最久未访问的
+SQLite出错时放行请求（限流失效好过接口不可用）
+"""
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limit (
+    key TEXT PRIMARY KEY,
+    bucket INTEGER NOT NULL,
+    current INTEGER NOT NULL,
+    previous INTEGER NOT NULL,
+    last_seen REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rate_limit_last_seen ON rate_limit(last_seen);
+"""
+
+# 每个进程每处理这么多次请求清理一次空闲客户端
+EVICT_EVERY = 256
+
+
+class SlidingWindowLimiter:
+    """滑动窗口限流器（两桶近似）"""
+
+    def __init__(self, db_path, scope, max_requests=10, window=60, max_clients=10000):
+        """
+        :param db_path: SQLite数据库文件路径（各worker共用）
+        :param scope: 限流范围名，不同接口各自计数
+        :param max_requests: 窗口内最多请求数
+        :param window: 窗口长度（秒）
+        :param max_clients: 最多保留的客户端数
+        """
+        self.db_path = str(db_path)
+        self.scope = scope
+        self.max_requests = max_requests
+        self.window = window
+        self.max_clients = max_clients
+        self._local = threading.local()  # 每个线程一个连接
+        self._calls = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _estimate(self, previous, current, elapsed):
+        """滑动窗口内的估算请求数：上一窗口按未过去的比例计入"""
+        return previous * (1 - elapsed / self.window) + current
+
+    def _retry_after(self, previous, current, elapsed):
+        """估算数降到限额以下还需等待的秒数（期间无新请求）"""
+        if current < self.max_requests and previous:
+            # 当前窗口内：上一窗口的权重下降到足够小
+            wait = (1 - (self.max_requests - current) / previous) * self.window - elapsed
+        else:
+            # 下一窗口：当前窗口的计数成为上一窗口，按权重下降
+            wait = (self.window - elapsed) + (1 - self.max_requests / max(current, 1)) * self.window
+        return max(1, int(wait) + 1)
+
+    def hit(self, client, now=None):
+        """
+        记录一次请求并判断是否放行（被拒绝的请求不计数）
+        :param client: 客户端标识（如IP）
+        :return: (是否放行, 被拒绝时建议的重试等待秒数)
+        """
+        now = time.time() if now is None else now
+        bucket = int(now // self.window)
+        elapsed = now - bucket * self.window
+        key = f'{self.scope}:{client}'
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT bucket, current, previous FROM rate_limit WHERE key = ?',
+                                   (key,)).fetchone()
+                previous, current = 0, 0
+                if row is not None:
+                    if row[0] == bucket:
+                        current, previous = row[1], row[2]
+                    elif row[0] == bucket - 1:
+                        previous = row[1]
+                allowed = self._estimate(previous, current, elapsed) < self.max_requests
+                if allowed:
+                    current += 1
+                conn.execute('INSERT OR REPLACE INTO rate_limit (key, bucket, current, previous, last_seen) '
+                             'VALUES (?, ?, ?, ?, ?)', (key, bucket, current, previous, now))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            self._calls += 1
+            if self._calls % EVICT_EVERY == 0:
+                self.evict(now)
+        except sqlite3.Error as e:
+            print(f'[WARN] Rate limiter unavailable, allowing request: {str(e)}')
+            return True, None
+        return allowed, None if allowed else self._retry_after(previous, current, elapsed)
+
+    def evict(self, now=None):
+        """
+        清除空闲超过两个窗口的客户端（其计数已不影响判断），超过上限时再淘汰最久未访问的
+        :return: 清除的客户端数
+        """
+        now = time.time() if now is None else now
+        conn = self._connection()
+        removed = conn.execute('DELETE FROM rate_limit WHERE last_seen < ?', (now - 2 * self.window,)).rowcount
+        excess = conn.execute('SELECT COUNT(*) FROM rate_limit').fetchone()[0] - self.max_clients
+        if excess > 0:
+            removed += conn.execute('DELETE FROM rate_limit WHERE key IN '
+                                    '(SELECT key FROM rate_limit ORDER BY last_seen LIMIT ?)', (excess,)).rowcount
+        return removed
@@ -0,0 +1,181 @@
+"""
+结果文件的进程内缓存：
+- 解析后的数据与预编码的响应字节常驻内存，只有源文件的 mtime/inode/size 变化时才重新加载
+- 每个内容版本带强ETag，未变化的轮询可直接返回304
+- 每个版本的gzip/brotli压缩结果只生成一次（brotli为可选依赖，未安装时只提供gzip）
+每个gunicorn worker各持有一份，互不共享
+"""
+import gzip
+import hashlib
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 小于该字节数的响应不压缩（压缩收益不抵头部开销）
+MIN_COMPRESS_SIZE = 1024
+# 压缩级别：每个版本只压缩一次的完整结果用最高级别；按请求参数生成、命中率低的正文（查询分页等）用较快的级别
+BEST_LEVELS = {'br': 11, 'gzip': 9}
+FAST_LEVELS = {'br': 5, 'gzip': 6}
+
+
+def available_encodings():
+    """可提供的压缩编码，按优先顺序"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding):
+    """
+    按Accept-Encoding请求头选择压缩编码（优先brotli），不接受压缩时为None
+    :param accept_encoding: 请求头的值，如 'gzip, deflate, br;q=0.9'
+    """
+    qualities = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.partition(';')
+        name = name.strip()
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            qualities[name.lower()] = q
+    for encoding in available_encodings():
+        if qualities.get(encoding, qualities.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match请求头是否包含该ETag（不含引号）"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or f'"{etag}"' in tags or f'W/"{etag}"' in tags
+
+
+class CachedBody:
+    """一个响应正文及其压缩版本；各编码是不同的表示，ETag互不相同"""
+
+    __slots__ = ('body', 'etag', 'levels', '_encoded', '_lock')
+
+    def __init__(self, body, levels=BEST_LEVELS):
+        """
+        :param body: 未压缩的正文
+        :param levels: 各编码的压缩级别，BEST_LEVELS或FAST_LEVELS
+        """
+        self.body = body
+        self.levels = levels
+        self.etag = hashlib.sha1(body).hexdigest()
+        self._encoded = {}  # 编码 -> 压缩后的字节
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        """
+        某一编码的正文与ETag，首次调用时压缩
+        :param encoding: 'br'、'gzip' 或 None（不压缩）
+        :return: (body, etag)
+        """
+        if encoding is None or len(self.body) < MIN_COMPRESS_SIZE:
+            return self.body, self.etag
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    if encoding == 'br':
+                        data = brotli.compress(self.body, quality=self.levels['br'])
+                    else:
+                        data = gzip.compress(self.body, compresslevel=self.levels['gzip'], mtime=0)
+                    self._encoded[encoding] = data
+        return data, f'{self.etag}-{encoding}'
+
+
+class CachedContent:
+    """某一版本的缓存内容"""
+
+    __slots__ = ('data', 'version', '_variants', '_lock')
+
+    def __init__(self, data, version):
+        self.data = data
+        self.version = version
+        self._variants = {}  # 变体名 -> CachedBody或派生对象
+        self._lock = threading.Lock()
+
+    def derived(self, name, build):
+        """
+        由数据派生的对象（如查询索引），每个版本只构建一次
+        :param name: 派生对象名
+        :param build: build(data) -> 任意对象
+        """
+        value = self._variants.get(name)
+        if value is None:
+            with self._lock:
+                value = self._variants.get(name)
+                if value is None:
+                    value = build(self.data)
+                    self._variants[name] = value
+        return value
+
+    def variant(self, name, encode):
+        """
+        某一响应变体的预编码正文（每个版本只编码一次）
+        :param name: 变体名，如 'latest'、'columns'
+        :param encode: encode(data) -> bytes
+        :return: CachedBody
+        """
+        return self.derived(name, lambda data: CachedBody(encode(data)))
+
+
+def file_signature(path):
+    """文件的 (mtime_ns, inode, size)，不存在为None；原子替换写入后inode必然变化"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+
+class FileCache:
+    """按源文件签名失效的缓存"""
+
+    def __init__(self, paths, load):
+        """
+        :param paths: 源文件列表，第一个为主文件（不存在时get返回None），其余任一变化也触发重新加载
+        :param load: load() -> data，读取并解析源文件
+        """
+        self.paths = list(paths)
+        self.load = load
+        self.loads = 0
+        self._content = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def signature(self):
+        return tuple(file_signature(p) for p in self.paths)
+
+    def get(self):
+        """
+        当前内容，源文件未变化时直接返回内存中的版本
+        :return: CachedContent，主文件不存在为None
+        :raises: load抛出的异常（如JSON解析失败），此时不缓存
+        """
+        signature = self.signature()
+        if signature[0] is None:
+            return None
+        content = self._content
+        if content is not None and signature == self._signature:
+            return content
+        with self._lock:
+            if self._content is None or signature != self._signature:
+                data = self.load()
+                version = hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:16]
+                self._content, self._signature = CachedContent(data, version), signature
+                self.loads += 1
+            return self._content
@@ -0,0 +1,148 @@
+"""
+结果行的服务端查询（/api/latest 的 status/q/sort/limit/offset/cursor 参数）：
+- 每个结果版本构建一次查询索引：各排序字段的升序/降序位置数组、各状态的过滤后排序结果
+- 每次请求只需取出排序数组（按状态过滤的结果同样预先算好）、按需做一次向量化的代码/名称匹配，再切片
+- 同一版本内相同查询的响应正文缓存复用（分页正文按请求生成，用较快的压缩级别）
+- cursor记录结果版本、查询条件的摘要与下一页位置，换了查询条件或结果已更新的cursor都会被拒绝
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from result_cache import FAST_LEVELS, CachedBody
+from trend_result import NUMERIC_FIELDS, ResultTable
+
+QUERY_PARAMS = ('status', 'q', 'sort', 'limit', 'offset', 'cursor')
+SORT_FIELDS = ('rank', 'index_code', 'index_name', 'status') + NUMERIC_FIELDS
+STATUSES = ('YES', 'NO')
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MAX_CACHED_PAGES = 64
+
+
+def is_query(args):
+    """查询参数中是否包含结果查询参数（不含时返回完整结果）"""
+    return any(args.get(name) for name in QUERY_PARAMS)
+
+
+def query_digest(status, q, sort, descending):
+    """决定结果顺序的查询条件（状态、搜索词、排序）的摘要，写入cursor"""
+    normalized = json.dumps([status, q, sort, descending], ensure_ascii=False)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+def make_cursor(version, digest, offset):
+    return f'{version}-{digest}-{offset}'
+
+
+def parse_query(args, version):
+    """
+    解析并校验查询参数
+    :param args: 查询参数mapping
+    :param version: 当前结果版本，cursor必须来自同一版本
+    :return: (status, q, sort, descending, offset, limit)
+    :raises: ValueError 参数无效或cursor与查询条件不符，LookupError cursor已过期（消息可直接返回给客户端）
+    """
+    status = (args.get('status') or '').upper() or None
+    if status is not None and status not in STATUSES:
+        raise ValueError(f'status must be one of {", ".join(STATUSES)}')
+    q = (args.get('q') or '').strip().lower() or None
+    sort = args.get('sort') or 'rank'
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+    if sort not in SORT_FIELDS:
+        raise ValueError(f'sort must be one of {", ".join(SORT_FIELDS)} (prefix - for descending)')
+    try:
+        limit = int(args.get('limit') or DEFAULT_LIMIT)
+        offset = int(args.get('offset') or 0)
+    except ValueError:
+        raise ValueError('limit and offset must be integers') from None
+    if not 1 <= limit <= MAX_LIMIT or offset < 0:
+        raise ValueError(f'limit must be between 1 and {MAX_LIMIT}, offset must not be negative')
+    cursor = args.get('cursor')
+    if cursor:
+        parts = cursor.split('-')
+        if len(parts) != 3 or not parts[2].isdigit():
+            raise ValueError('invalid cursor')
+        cursor_version, digest, cursor_offset = parts
+        if cursor_version != version:
+            raise LookupError('cursor is from an older result version, restart from the first page')
+        if digest != query_digest(status, q, sort, descending):
+            raise ValueError('cursor does not match the query, send the same status, q and sort as the previous page')
+        offset = int(cursor_offset)
+    return status, q, sort, descending, offset, limit
+
+
+class ResultIndex:
+    """某一结果版本的查询索引"""
+
+    def __init__(self, data, version):
+        """
+        :param data: 结果文档 {'update_time', 'summary', 'results', ...}
+        :param version: 结果版本（FileCache的版本号）
+        """
+        self.version = version
+        self.rows = data.get('results') or []
+        self.meta = {k: v for k, v in data.items() if k != 'results'}
+        self._keys = {}
+        for field in SORT_FIELDS:
+            if field in NUMERIC_FIELDS or field == 'rank':
+                values = np.array([r.get(field) for r in self.rows], dtype=np.float64)
+                missing = np.isnan(values)
+            else:
+                text = np.array([r.get(field) or '' for r in self.rows], dtype=str)
+                values = np.unique(text, return_inverse=True)[1].astype(np.float64) if len(text) else text
+                missing = text == ''
+            self._keys[field] = (values, missing)
+        self._status = np.array([r.get('status') or '' for r in self.rows], dtype=str)
+        self._search = np.char.lower(np.array([f"{r.get('index_code') or ''}\t{r.get('index_name') or ''}"
+                                               for r in self.rows], dtype=str))
+        self._orders = {}  # (字段, 是否降序, 状态) -> 位置数组
+        self._pages = OrderedDict()  # 查询参数 -> CachedBody
+        self._lock = threading.Lock()
+
+    def order(self, sort, descending=False, status=None):
+        """
+        排序（缺失值排最后，相同值保持原顺序）并按状态过滤后的位置数组，每个版本每种组合只计算一次
+        """
+        key = (sort, descending, status)
+        order = self._orders.get(key)
+        if order is None:
+            values, missing = self._keys[sort]
+            order = np.lexsort((-values if descending else values, missing)) if len(values) else np.arange(0)
+            if status is not None:
+                order = order[self._status[order] == status]
+            self._orders[key] = order
+        return order
+
+    def page(self, status=None, q=None, sort='rank', descending=False, offset=0, limit=DEFAULT_LIMIT, fmt=None):
+        """
+        一页查询结果的预编码正文
+        :return: CachedBody，正文 {'ok': True, 'data': {...元信息, 'results', 'total', 'matched', 'offset', 'limit', 'next_cursor'}}
+        """
+        key = (status, q, sort, descending, offset, limit, fmt)
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached is not None:
+                self._pages.move_to_end(key)
+                return cached
+        order = self.order(sort, descending, status)
+        if q:
+            order = order[np.char.find(self._search[order], q) >= 0]
+        rows = [self.rows[i] for i in order[offset:offset + limit]]
+        end = offset + len(rows)
+        data = dict(self.meta,
+                    results=ResultTable.from_records(rows).to_columns() if fmt == 'columns' else rows,
+                    total=len(self.rows), matched=len(order), offset=offset, limit=limit,
+                    next_cursor=make_cursor(self.version, query_digest(status, q, sort, descending), end)
+                    if end < len(order) else None)
+        cached = CachedBody(json.dumps({'ok': True, 'data': data}, ensure_ascii=False,
+                                       separators=(',', ':')).encode('utf-8'), levels=FAST_LEVELS)
+        with self._lock:
+            self._pages[key] = cached
+            while len(self._pages) > MAX_CACHED_PAGES:
+                self._pages.popitem(last=False)
+        return cached
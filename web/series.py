@@ -0,0 +1,155 @@
+"""
+指数历史序列接口的数据处理：
+- 从本地日线历史库（data/index_quote/history/<code>.csv）读取收盘价，计算均线与站上/跌破状态
+- 按请求的点数用LTTB（Largest-Triangle-Three-Buckets）降采样，保留价格走势的形状与极值
+- 按列输出（字段名只出现一次）；解析后的序列按历史文件签名缓存，响应按 (代码, 区间, 点数) 缓存
+"""
+import json
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from result_cache import CachedBody, FileCache
+
+CODE_PATTERN = re.compile(r'^[A-Za-z0-9]{1,16}$')
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+SERIES_FIELDS = ('date', 'close', 'ma', 'status')
+
+
+def lttb(y, threshold):
+    """
+    LTTB降采样：首尾点必选，其余每个桶选出与前一选中点、后一桶均值构成三角形面积最大的点
+    :param y: 数值序列（横坐标为位置）
+    :param threshold: 目标点数
+    :return: 选中点的位置数组（升序）
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64)
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def load_series(history_file, ma_period):
+    """
+    读取历史库并计算均线与状态（均线在区间过滤之前按完整历史计算）
+    :return: {'dates': 'YYYY-MM-DD'数组, 'close', 'ma', 'status'}，ma/status数据不足处为NaN/-1
+    """
+    df = pd.read_csv(history_file, usecols=['trade_date', 'close'], parse_dates=['trade_date'])
+    df = df.dropna(subset=['close']).sort_values('trade_date')
+    closes = df['close'].to_numpy(dtype=np.float64)
+    ma = np.full(len(closes), np.nan)
+    if len(closes) >= ma_period:
+        csum = np.concatenate(([0.0], np.cumsum(closes)))
+        ma[ma_period - 1:] = (csum[ma_period:] - csum[:-ma_period]) / ma_period
+    status = np.where(np.isnan(ma), -1, (closes >= ma).astype(np.int8)).astype(np.int8)
+    return {
+        'dates': df['trade_date'].dt.strftime('%Y-%m-%d').to_numpy(dtype=str),
+        'close': closes,
+        'ma': ma,
+        'status': status
+    }
+
+
+def _rounded(values):
+    rounded = np.round(values, 2)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+def build_series(series, code, ma_period, start_date=None, end_date=None, points=DEFAULT_POINTS):
+    """
+    截取区间并降采样，输出列式dict
+    :param series: load_series的结果
+    :return: {'code', 'ma_period', 'from', 'to', 'total', 'points', 'fields', 'columns'}
+    """
+    dates = series['dates']
+    lo = np.searchsorted(dates, start_date, side='left') if start_date else 0
+    hi = np.searchsorted(dates, end_date, side='right') if end_date else len(dates)
+    close = series['close'][lo:hi]
+    picked = lttb(close, points) + lo
+    categories = np.array((None, 'NO', 'YES'), dtype=object)
+    return {
+        'code': code,
+        'ma_period': ma_period,
+        'from': dates[lo] if hi > lo else None,
+        'to': dates[hi - 1] if hi > lo else None,
+        'total': int(hi - lo),
+        'points': len(picked),
+        'fields': list(SERIES_FIELDS),
+        'columns': {
+            'date': dates[picked].tolist(),
+            'close': _rounded(series['close'][picked]),
+            'ma': _rounded(series['ma'][picked]),
+            'status': categories[series['status'][picked] + 1].tolist()
+        }
+    }
+
+
+class SeriesCache:
+    """历史序列缓存：每个指数的解析结果按文件签名失效，响应按 (代码, 区间, 点数, 版本) 做LRU缓存"""
+
+    def __init__(self, history_dir, ma_period=20, max_responses=256):
+        """
+        :param history_dir: 日线历史库目录
+        :param ma_period: 均线周期
+        :param max_responses: 最多缓存的响应数
+        """
+        self.history_dir = history_dir
+        self.ma_period = ma_period
+        self.max_responses = max_responses
+        self._files = {}  # 代码 -> FileCache
+        self._responses = OrderedDict()  # (代码, from, to, points, 版本) -> CachedBody
+        self._lock = threading.Lock()
+
+    def _file_cache(self, code):
+        cache = self._files.get(code)
+        if cache is None:
+            path = self.history_dir / f'{code}.csv'
+            cache = FileCache([path], lambda: load_series(path, self.ma_period))
+            with self._lock:
+                cache = self._files.setdefault(code, cache)
+        return cache
+
+    def get(self, code, start_date=None, end_date=None, points=DEFAULT_POINTS):
+        """
+        某指数区间序列的预编码响应
+        :return: CachedBody，历史库中无该指数为None
+        """
+        if not (self.history_dir / f'{code}.csv').exists():
+            return None
+        content = self._file_cache(code).get()
+        if content is None:
+            return None
+        key = (code, start_date, end_date, points, content.version)
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached is not None:
+                self._responses.move_to_end(key)
+                return cached
+        data = build_series(content.data, code, self.ma_period, start_date, end_date, points)
+        cached = CachedBody(json.dumps({'ok': True, 'data': data}, ensure_ascii=False,
+                                       separators=(',', ':')).encode('utf-8'))
+        with self._lock:
+            self._responses[key] = cached
+            while len(self._responses) > self.max_responses:
+                self._responses.popitem(last=False)
+        return cached
@@ -1,13 +1,16 @@
-from flask import Flask, send_from_directory, jsonify, request
+from flask import Flask, send_from_directory, jsonify, request, Response, abort, stream_with_context
 from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.utils import safe_join
+import mimetypes
 from pathlib import Path
 import json
+import re
 import subprocess
-import threading
 import os
+import sys
 import secrets
 from functools import wraps
-from time import time
+from time import time, sleep
 from datetime import datetime
 import pytz
 
@@ -15,6 +18,36 @@ import pytz
 WEB_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = WEB_DIR.parent
 DATA_PATH = PROJECT_ROOT / 'data' / 'trend_status' / 'latest_trend_result.json'
+# 分析过程中的中间快照（partial=true），比结果文件新时表示正在运行
+PARTIAL_PATH = PROJECT_ROOT / 'data' / 'trend_status' / 'latest_trend_result.partial.json'
+RESULTS_DB_PATH = PROJECT_ROOT / 'data' / 'trend_status' / 'trend_results.db'
+# 上次运行的输入指纹，无新K线的运行只更新其中的检查时间
+FINGERPRINT_PATH = PROJECT_ROOT / 'data' / 'trend_status' / 'run_fingerprint.json'
+# 最终结果的列式二进制表，?format=columns 时直接读取
+RESULT_TABLE_PATH = PROJECT_ROOT / 'data' / 'trend_status' / 'latest_trend_result.npz'
+# 刷新任务状态（各worker共享）与分析程序写入的运行进度
+JOBS_PATH = PROJECT_ROOT / 'data' / 'trend_status' / 'refresh_jobs.json'
+PROGRESS_PATH = PROJECT_ROOT / 'data' / 'trend_status' / 'run_progress.json'
+# 日线历史库（/api/series 的数据来源）与分析配置（均线周期）
+HISTORY_DIR = PROJECT_ROOT / 'data' / 'index_quote' / 'history'
+CONFIG_PATH = PROJECT_ROOT / 'config' / 'index_config.json'
+# 请求频率计数（各worker共享）
+RATE_LIMIT_DB_PATH = PROJECT_ROOT / 'data' / 'trend_status' / 'rate_limit.db'
+
+# 复用项目根目录下的模块（历史结果库等）
+sys.path.insert(0, str(PROJECT_ROOT))
+from results_store import ResultsStore
+from trend_daemon import request_daemon, DEFAULT_HOST, DEFAULT_PORT
+from trend_result import ResultTable
+from result_cache import FileCache, choose_encoding
+from job_manager import JobManager
+from rate_limiter import SlidingWindowLimiter
+from result_query import ResultIndex, is_query, parse_query
+from series import CODE_PATTERN, DEFAULT_POINTS, MAX_POINTS, SeriesCache
+
+# 分析常驻进程地址（main_trend.py --task daemon），未运行时回退为启动子进程
+DAEMON_HOST = os.environ.get('TREND_DAEMON_HOST', DEFAULT_HOST)
+DAEMON_PORT = int(os.environ.get('TREND_DAEMON_PORT', DEFAULT_PORT))
 
 print(f'''
 [STARTUP] Server configuration:
@@ -30,125 +63,500 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)  # 支持代理服务
 # 生成随机密钥
 app.config['SECRET_KEY'] = secrets.token_hex(32)
 
+# 安全相关的响应头（ASGI版本共用）
+SECURITY_HEADERS = {
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'SAMEORIGIN',
+    'X-XSS-Protection': '1; mode=block',
+    'Content-Security-Policy': "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'"
+}
+
 # 设置安全相关的响应头
 @app.after_request
 def add_security_headers(response):
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'SAMEORIGIN'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Content-Security-Policy'] = "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'"
+    response.headers.update(SECURITY_HEADERS)
     return response
 
-# 限制请求频率
-request_history = {}
-def rate_limit(max_requests=10, window=60):  # 每分钟最多10次请求
+# 限制请求频率（计数存于SQLite，各worker共享）
+refresh_limiter = SlidingWindowLimiter(RATE_LIMIT_DB_PATH, 'refresh', max_requests=10, window=60)  # 每分钟最多10次请求
+
+
+def rate_limited_response(retry_after):
+    """超出频率限制的响应（ASGI版本共用响应内容）"""
+    return {'ok': False, 'error': 'Too many requests'}, 429, {'Retry-After': str(retry_after)}
+
+
+def rate_limit(limiter):
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
-            now = time()
-            remote_addr = request.remote_addr
-            
-            # 清理过期的请求记录
-            if remote_addr in request_history:
-                request_history[remote_addr] = [t for t in request_history[remote_addr] if t > now - window]
-            
-            # 检查请求频率
-            if remote_addr in request_history and len(request_history[remote_addr]) >= max_requests:
-                return jsonify({'error': 'Too many requests'}), 429
-            
-            # 记录新请求
-            request_history.setdefault(remote_addr, []).append(now)
+            allowed, retry_after = limiter.hit(request.remote_addr)
+            if not allowed:
+                result, status, headers = rate_limited_response(retry_after)
+                return jsonify(result), status, headers
             return f(*args, **kwargs)
         return wrapped
     return decorator
 
 
+def attach_checked_time(data):
+    """附加最近一次运行的检查时间（无新K线时结果不重写，网页据此判断运行已结束）"""
+    try:
+        if FINGERPRINT_PATH.exists():
+            with FINGERPRINT_PATH.open('r', encoding='utf-8') as f:
+                fingerprint = json.load(f)
+            if fingerprint.get('update_time') == data.get('update_time'):
+                data['checked_time'] = fingerprint.get('checked_time')
+    except Exception as e:
+        print(f'[WARN] Read fingerprint failed: {str(e)}')
+    return data
+
+
+def partial_snapshot():
+    """正在运行的分析的中间快照（比结果文件新时才有效），否则为None"""
+    try:
+        if PARTIAL_PATH.stat().st_mtime_ns > DATA_PATH.stat().st_mtime_ns:
+            with PARTIAL_PATH.open('r', encoding='utf-8') as f:
+                return json.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f'[WARN] Read partial result failed: {str(e)}')
+    return None
+
+
+def load_latest():
+    """读取结果文件并附加检查时间，分析进行中时改为读取中间快照（只在文件变化时由缓存调用）"""
+    data = partial_snapshot()
+    if data is not None:
+        print(f'[INFO] Loaded {PARTIAL_PATH.name}, completed: {data.get("completed")}/{data.get("total")}')
+        return data
+    with DATA_PATH.open('r', encoding='utf-8') as f:
+        data = attach_checked_time(json.load(f))
+    print(f'[INFO] Loaded {DATA_PATH.name}, update_time: {data.get("update_time")}')
+    return data
+
+
+# 结果文件、中间快照与指纹文件任一变化才重新读取；列式表变化影响 ?format=columns
+latest_cache = FileCache([DATA_PATH, PARTIAL_PATH, FINGERPRINT_PATH, RESULT_TABLE_PATH], load_latest)
+
+
+def encode_latest(data):
+    return json.dumps({'ok': True, 'data': data}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_latest_columns(data):
+    return encode_latest(dict(data, results=columnar_results(data)))
+
+
+# 静态文件：这些类型预压缩后从内存返回，其余类型直接发送文件
+COMPRESSIBLE_EXTENSIONS = {'.html', '.js', '.css', '.json', '.svg', '.txt'}
+# 页面本身每次都需校验（内联了脚本与样式），service worker脚本需及时更新，其他静态文件可缓存较长时间
+NO_CACHE_FILES = {'index.html', 'sw.js'}
+STATIC_MAX_AGE = 7 * 24 * 3600
+static_caches = {}  # 文件名 -> FileCache
+
+
+def cached_response(cached, mimetype, cache_control='no-cache'):
+    """
+    预编码正文的响应：按协商结果选用预压缩版本，带强ETag，If-None-Match命中时返回无正文的304
+    :param cached: result_cache.CachedBody
+    """
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    body, etag = cached.encoded(encoding)
+    response = Response(body, mimetype=mimetype)
+    if body is not cached.body:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def static_entry(filename):
+    """
+    查找静态文件
+    :return: (路径, mimetype, Cache-Control, CachedBody) 不可压缩类型的CachedBody为None；文件不存在为None
+    """
+    path = safe_join(str(WEB_DIR), filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    name = os.path.basename(path)
+    cache_control = 'no-cache' if name in NO_CACHE_FILES else f'public, max-age={STATIC_MAX_AGE}'
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS:
+        return path, mimetype, cache_control, None
+    cache = static_caches.get(path)
+    if cache is None:
+        cache = static_caches.setdefault(path, FileCache([path], Path(path).read_bytes))
+    content = cache.get()
+    if content is None:
+        return None
+    return path, mimetype, cache_control, content.variant('file', bytes)
+
+
+def serve_static(filename):
+    """静态文件：可压缩类型从内存缓存返回（文件变化时重新读取），其余直接发送"""
+    entry = static_entry(filename)
+    if entry is None:
+        abort(404)
+    path, mimetype, cache_control, cached = entry
+    if cached is None:
+        response = send_from_directory(str(WEB_DIR), filename, max_age=STATIC_MAX_AGE)
+        response.headers['Cache-Control'] = cache_control
+        return response
+    return cached_response(cached, mimetype, cache_control)
+
+
+def columnar_results(data):
+    """结果转为按列输出；二进制表与JSON对应同一次结果时直接读取，否则由JSON中的行构建"""
+    try:
+        if (not data.get('partial') and RESULT_TABLE_PATH.exists()
+                and RESULT_TABLE_PATH.stat().st_mtime >= DATA_PATH.stat().st_mtime):
+            return ResultTable.from_bytes(RESULT_TABLE_PATH.read_bytes()).to_columns()
+    except Exception as e:
+        print(f'[WARN] Read result table failed: {str(e)}')
+    return ResultTable.from_records(data.get('results') or []).to_columns()
+
+
 @app.route('/')
 def index():
-    return send_from_directory(str(WEB_DIR), 'index.html')
+    return serve_static('index.html')
 
 
 @app.route('/<path:filename>')
 def static_files(filename):
-    return send_from_directory(str(WEB_DIR), filename)
+    return serve_static(filename)
 
 
-@app.route('/api/latest')
-def api_latest():
+def latest_body(fmt=None, args=None):
+    """
+    /api/latest 的预编码正文（Flask与ASGI版本共用）
+    :param fmt: 'columns' 时按列输出结果
+    :param args: 查询参数mapping；含 status/q/sort/limit/offset/cursor 时只返回一页结果，见result_query
+    :return: (CachedBody, None) 或 (None, (错误dict, 状态码))
+    """
     try:
-        print(f'[DEBUG] Trying to read data from: {DATA_PATH}')
-        if not DATA_PATH.exists():
-            error_msg = f'latest_trend_result.json not found at {DATA_PATH}'
-            print(f'[ERROR] {error_msg}')
-            return jsonify({'ok': False, 'error': error_msg}), 404
         try:
-            with DATA_PATH.open('r', encoding='utf-8') as f:
-                data = json.load(f)
-            
+            content = latest_cache.get()
+            if content is None:
+                error_msg = f'latest_trend_result.json not found at {DATA_PATH}'
+                print(f'[ERROR] {error_msg}')
+                return None, ({'ok': False, 'error': error_msg}, 404)
             # 原始数据中的时间就是北京时间，无需转换
-            
-            print(f'[DEBUG] Successfully read data, update_time: {data.get("update_time")}')
-            return jsonify({'ok': True, 'data': data})
+            # 查询参数：过滤/搜索/排序/分页，由每个版本构建一次的索引切片
+            if args is not None and is_query(args):
+                try:
+                    query = parse_query(args, content.version)
+                except ValueError as ve:
+                    return None, ({'ok': False, 'error': str(ve)}, 400)
+                except LookupError as le:
+                    return None, ({'ok': False, 'error': str(le)}, 410)
+                index = content.derived('index', lambda data: ResultIndex(data, content.version))
+                return index.page(*query, fmt=fmt), None
+            # ?format=columns 按列输出结果（字段名只出现一次，响应更小）
+            if fmt == 'columns':
+                return content.variant('columns', encode_latest_columns), None
+            return content.variant('latest', encode_latest), None
         except json.JSONDecodeError as je:
             error_msg = f'JSON parse error: {str(je)}'
             print(f'[ERROR] {error_msg}')
-            return jsonify({'ok': False, 'error': error_msg}), 500
+            return None, ({'ok': False, 'error': error_msg}, 500)
         except IOError as io:
             error_msg = f'File read error: {str(io)}'
             print(f'[ERROR] {error_msg}')
-            return jsonify({'ok': False, 'error': error_msg}), 500
+            return None, ({'ok': False, 'error': error_msg}, 500)
     except Exception as e:
         error_msg = f'Unexpected error: {str(e)}'
         print(f'[ERROR] {error_msg}')
-        return jsonify({'ok': False, 'error': error_msg}), 500
+        return None, ({'ok': False, 'error': error_msg}, 500)
 
 
-@app.route('/api/refresh', methods=['POST'])
-def api_refresh():
-    """If JSON payload has {"run":true} we try to run main_trend.py in background, then return latest JSON if available."""
-    payload = request.get_json(silent=True) or {}
-    run = bool(payload.get('run'))
-    result = {'ok': True, 'triggered_run': run}
+@app.route('/api/latest')
+def api_latest():
+    cached, error = latest_body(request.args.get('format'), request.args)
+    if error:
+        return jsonify(error[0]), error[1]
+    return cached_response(cached, 'application/json')
 
-    if run:
-        main_py = PROJECT_ROOT / 'main_trend.py'
-        if not main_py.exists():
-            return jsonify({'ok': False, 'error': 'main_trend.py not found', 'path': str(main_py)}), 404
 
-        def run_main():
+def load_ma_period():
+    """与分析程序一致的均线周期"""
+    try:
+        with CONFIG_PATH.open('r', encoding='utf-8') as f:
+            return int(json.load(f).get('ma_period', 20))
+    except Exception as e:
+        print(f'[WARN] Read ma_period from config failed: {str(e)}')
+        return 20
+
+
+series_cache = SeriesCache(HISTORY_DIR, load_ma_period())
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def series_body(code, args):
+    """
+    /api/series/<code>?from=2024-01-01&to=2025-12-31&points=500 的预编码正文（Flask与ASGI版本共用）：
+    区间内的收盘价、均线与状态，按列输出，超过points个交易日时降采样
+    :param args: 查询参数mapping
+    :return: (CachedBody, None) 或 (None, (错误dict, 状态码))
+    """
+    if not CODE_PATTERN.match(code):
+        return None, ({'ok': False, 'error': f'invalid index code: {code}'}, 400)
+    start_date, end_date = args.get('from') or None, args.get('to') or None
+    for value in (start_date, end_date):
+        if value and not DATE_PATTERN.match(value):
+            return None, ({'ok': False, 'error': f'invalid date: {value}, expected YYYY-MM-DD'}, 400)
+    try:
+        points = int(args.get('points') or DEFAULT_POINTS)
+    except ValueError:
+        return None, ({'ok': False, 'error': 'points must be an integer'}, 400)
+    if not 3 <= points <= MAX_POINTS:
+        return None, ({'ok': False, 'error': f'points must be between 3 and {MAX_POINTS}'}, 400)
+    try:
+        cached = series_cache.get(code, start_date, end_date, points)
+    except Exception as e:
+        error_msg = f'Series error: {str(e)}'
+        print(f'[ERROR] {error_msg}')
+        return None, ({'ok': False, 'error': error_msg}, 500)
+    if cached is None:
+        return None, ({'ok': False, 'error': f'no history for {code}'}, 404)
+    return cached, None
+
+
+@app.route('/api/series/<code>')
+def api_series(code):
+    cached, error = series_body(code, request.args)
+    if error:
+        return jsonify(error[0]), error[1]
+    return cached_response(cached, 'application/json')
+
+
+# 推送通道：每秒检查一次结果文件（只有stat开销），无变化时每15秒发送一次心跳；
+# 连接5分钟后由服务端关闭，浏览器按retry自动重连，避免长期占用worker线程
+STREAM_POLL_INTERVAL = 1.0
+STREAM_HEARTBEAT = 15
+STREAM_MAX_SECONDS = 300
+
+
+def sse_event(event, data, event_id):
+    """编码一条SSE事件"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {event}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+def diff_results(previous, current):
+    """
+    两个版本结果之间的变化：变化的顶层字段、变化的行（按指数代码比较）及当前的行顺序
+    :return: dict，无任何变化时为None
+    """
+    prev_rows = {r.get('index_code'): r for r in previous.get('results') or []}
+    rows = [r for r in current.get('results') or [] if prev_rows.get(r.get('index_code')) != r]
+    meta = {k: v for k, v in current.items() if k != 'results' and previous.get(k) != v}
+    meta.update({k: None for k in previous if k != 'results' and k not in current})
+    codes = [r.get('index_code') for r in current.get('results') or []]
+    if not rows and not meta and codes == list(prev_rows):
+        return None
+    return {'meta': meta, 'rows': rows, 'codes': codes}
+
+
+def snapshot_event(content):
+    """某版本的完整快照事件"""
+    return content.variant('event:snapshot', lambda data: sse_event('snapshot', data, content.version)).body
+
+
+def update_event(previous, content):
+    """从previous版本到content版本的增量事件，无变化时为空"""
+    def encode(data):
+        diff = diff_results(previous.data, data)
+        return sse_event('update', diff, content.version) if diff else b''
+    return content.variant(f'event:update:{previous.version}', encode).body
+
+
+@app.route('/api/stream')
+def api_stream():
+    """
+    结果推送（Server-Sent Events）：连接后先推送完整快照(snapshot)，之后每发布一次结果
+    （含渐进发布的中间快照）推送一次增量(update)，只含变化的字段与行。
+    编码后的事件按版本缓存，同一版本只编码一次
+    """
+    last_event_id = request.headers.get('Last-Event-ID')
+
+    def generate():
+        yield b'retry: 3000\n\n'
+        sent = None
+        started = last_write = time()
+        while time() - started < STREAM_MAX_SECONDS:
             try:
-                # Set timezone to Asia/Shanghai before running
-                os.environ['TZ'] = 'Asia/Shanghai'
-                # Respect PYTHON env var if provided, otherwise use default 'python'
-                python_exe = os.environ.get('PYTHON', 'python')
-                # Set PYTHONIOENCODING to ensure correct character encoding
-                my_env = os.environ.copy()
-                my_env['PYTHONIOENCODING'] = 'utf-8'
-                my_env['TZ'] = 'Asia/Shanghai'
-                subprocess.run([python_exe, str(main_py)], 
-                            cwd=str(PROJECT_ROOT), 
-                            timeout=600,
-                            env=my_env)
+                content = latest_cache.get()
             except Exception as e:
-                print('Error running main_trend.py:', e)
+                print(f'[WARN] Stream read failed: {str(e)}')
+                content = None
+            if content is not None and (sent is None or content.version != sent.version):
+                if sent is None and content.version == last_event_id:
+                    event = b''  # 重连且客户端已是最新版本
+                elif sent is None:
+                    event = snapshot_event(content)
+                else:
+                    event = update_event(sent, content)
+                sent = content
+                if event:
+                    yield event
+                    last_write = time()
+            if time() - last_write >= STREAM_HEARTBEAT:
+                yield b': ping\n\n'
+                last_write = time()
+            sleep(STREAM_POLL_INTERVAL)
 
-        t = threading.Thread(target=run_main, daemon=True)
-        t.start()
-        result['message'] = 'started background run of main_trend.py'
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 关闭Nginx代理缓冲
+    return response
 
-    # Return latest data if available
+
+def history_query(args):
+    """
+    历史结果查询（不重新计算）：
+    - ?code=399300&from=2025-01-01&to=2025-12-31  某指数区间内每个交易日的结果
+    - ?date=2025-10-30                             某交易日的完整排名
+    - ?from=...&to=...                             区间内的运行列表及摘要
+    :param args: 查询参数mapping
+    :return: (响应dict, 状态码)
+    """
+    if not RESULTS_DB_PATH.exists():
+        return {'ok': False, 'error': 'history store not found'}, 404
     try:
-        if DATA_PATH.exists():
-            with DATA_PATH.open('r', encoding='utf-8') as f:
-                data = json.load(f)
-            result['data'] = data
+        store = ResultsStore(RESULTS_DB_PATH)
+        code = args.get('code')
+        date = args.get('date')
+        start_date = args.get('from')
+        end_date = args.get('to')
+        if code:
+            data = store.get_index_history(code, start_date, end_date)
+        elif date:
+            data = store.get_results_by_date(date)
+            if data is None:
+                return {'ok': False, 'error': f'no results for {date}'}, 404
         else:
-            result['data'] = None
+            data = store.get_runs(start_date, end_date)
+        return {'ok': True, 'data': data}, 200
+    except Exception as e:
+        error_msg = f'History query error: {str(e)}'
+        print(f'[ERROR] {error_msg}')
+        return {'ok': False, 'error': error_msg}, 500
+
+
+@app.route('/api/history')
+def api_history():
+    """历史结果查询，参数见history_query"""
+    result, status = history_query(request.args)
+    return jsonify(result), status
+
+
+MAIN_PY = PROJECT_ROOT / 'main_trend.py'
+# 单次分析的最长等待（常驻进程请求与子进程各自的超时）
+RUN_TIMEOUT = 600
+# 刷新任务最长可能运行的时长：只在连接常驻进程失败时回退子进程，两者最多等满一次RUN_TIMEOUT；
+# 超过该时长仍为running的任务，其执行者必然已被终止，可视为已失效
+JOB_STALE_SECONDS = RUN_TIMEOUT + 60
+
+
+def run_main(job_id=None):
+    """
+    执行一次分析：优先交给常驻进程执行（无需冷启动），连接不上时启动子进程
+    :return: 常驻进程返回的运行结果（子进程为None）
+    :raises: 运行失败；常驻进程已接受请求但超时未响应时同样视为失败（它可能仍在运行，不再另起子进程）
+    """
+    try:
+        response = request_daemon({'task': 'analyze', 'job_id': job_id}, host=DAEMON_HOST, port=DAEMON_PORT,
+                                  timeout=RUN_TIMEOUT)
+    except ConnectionRefusedError:
+        print('[INFO] Trend daemon not running, falling back to subprocess')
+    except OSError as e:
+        # 连接超时、地址不可用等：请求未送达常驻进程，同样回退为子进程
+        print(f'[WARN] Trend daemon connect failed ({type(e).__name__}: {e}), falling back to subprocess')
+    else:
+        print(f"[INFO] Daemon run finished: {response}")
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error') or 'analysis failed')
+        return response.get('result')
+    # Set timezone to Asia/Shanghai before running
+    os.environ['TZ'] = 'Asia/Shanghai'
+    # Respect PYTHON env var if provided, otherwise use default 'python'
+    python_exe = os.environ.get('PYTHON', 'python')
+    # Set PYTHONIOENCODING to ensure correct character encoding
+    my_env = os.environ.copy()
+    my_env['PYTHONIOENCODING'] = 'utf-8'
+    my_env['TZ'] = 'Asia/Shanghai'
+    command = [python_exe, str(MAIN_PY)] + (['--job-id', job_id] if job_id else [])
+    try:
+        completed = subprocess.run(command, 
+                    cwd=str(PROJECT_ROOT), 
+                    timeout=RUN_TIMEOUT,
+                    env=my_env)
+        if completed.returncode != 0:
+            raise RuntimeError(f'main_trend.py exited with code {completed.returncode}')
+    except Exception:
+        # 子进程被终止时来不及清理中间快照，由这里删除，网页回到上次的完整结果
+        PARTIAL_PATH.unlink(missing_ok=True)
+        raise
+    return None
+
+
+# 并发的刷新请求合并为同一个任务
+jobs = JobManager(JOBS_PATH, PROGRESS_PATH, run_main, stale_seconds=JOB_STALE_SECONDS)
+
+
+def refresh(payload):
+    """
+    If JSON payload has {"run":true} we try to run main_trend.py in background, then return latest JSON if available.
+    :return: (响应dict, 状态码)
+    """
+    run = bool(payload.get('run'))
+    result = {'ok': True, 'triggered_run': run}
+
+    if run:
+        if not MAIN_PY.exists():
+            return {'ok': False, 'error': 'main_trend.py not found', 'path': str(MAIN_PY)}, 404
+
+        job, coalesced = jobs.submit()
+        result['job_id'] = job['id']
+        result['coalesced'] = coalesced
+        result['message'] = 'joined running job' if coalesced else 'started background run of main_trend.py'
+
+    # Return latest data if available
+    try:
+        content = latest_cache.get()
+        result['data'] = content.data if content is not None else None
     except Exception as e:
         result['ok'] = False
         result['error'] = str(e)
 
-    return jsonify(result)
+    return result, 200
+
+
+@app.route('/api/refresh', methods=['POST'])
+@rate_limit(refresh_limiter)
+def api_refresh():
+    result, status = refresh(request.get_json(silent=True) or {})
+    return jsonify(result), status
+
+
+def job_status(job_id):
+    """
+    刷新任务状态：status 为 running/done/failed，进行中的任务附带 progress
+    :return: (响应dict, 状态码)
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        return {'ok': False, 'error': f'job not found: {job_id}'}, 404
+    return {'ok': True, 'data': job}, 200
+
+
+@app.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    result, status = job_status(job_id)
+    return jsonify(result), status
 
 
 if __name__ == '__main__':
@@ -0,0 +1,78 @@
+// 离线缓存：页面本身（脚本与样式已内联）与最近一次 /api/latest 的结果。
+// - 页面：先返回缓存立即显示，同时在后台重新获取并更新缓存（下次打开生效）
+// - /api/latest：优先请求网络并保存成功的完整结果（不含计算中的中间快照），网络不可用时返回缓存
+//   （页面轮询依赖该接口判断新结果，不能先返回旧数据；打开时的缓存显示由页面自己读取缓存完成）
+// - 推送、刷新、历史等其他接口不经过缓存
+const SHELL_CACHE = 'fishbowl-shell-v1';
+const DATA_CACHE = 'fishbowl-data-v1';
+const SHELL_URLS = ['/', '/index.html'];
+const LATEST_URL = '/api/latest';
+
+self.addEventListener('install', event => {
+  event.waitUntil(
+    caches.open(SHELL_CACHE)
+      .then(cache => cache.addAll(SHELL_URLS))
+      .then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener('activate', event => {
+  // 清理旧版本的缓存
+  const keep = new Set([SHELL_CACHE, DATA_CACHE]);
+  event.waitUntil(
+    caches.keys()
+      .then(keys => Promise.all(keys.filter(key => !keep.has(key)).map(key => caches.delete(key))))
+      .then(() => self.clients.claim())
+  );
+});
+
+// 请求网络，成功的响应写入缓存；accept 可进一步检查响应内容，返回false时不缓存
+async function fetchAndCache(cacheName, request, cacheKey, accept) {
+  const response = await fetch(request);
+  if (response.ok && (!accept || await accept(response.clone()))) {
+    const cache = await caches.open(cacheName);
+    await cache.put(cacheKey || request, response.clone());
+  }
+  return response;
+}
+
+// 计算中的中间快照（partial）不缓存，离线时展示的始终是最近一次完整结果（与页面的 saveLatest 一致）
+async function isComplete(response) {
+  try {
+    const body = await response.json();
+    return !(body.data && body.data.partial);
+  } catch (err) {
+    return false;
+  }
+}
+
+async function shell(event) {
+  const cached = await caches.match(event.request, {ignoreSearch: true}) || await caches.match('/index.html');
+  const network = fetchAndCache(SHELL_CACHE, event.request);
+  if (cached) {
+    event.waitUntil(network.catch(() => {}));
+    return cached;
+  }
+  return network;
+}
+
+async function latest(request) {
+  try {
+    return await fetchAndCache(DATA_CACHE, request, LATEST_URL, isComplete);
+  } catch (err) {
+    const cached = await caches.match(LATEST_URL);
+    if (cached) return cached;
+    throw err;
+  }
+}
+
+self.addEventListener('fetch', event => {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (request.method !== 'GET' || url.origin !== self.location.origin) return;
+  if (SHELL_URLS.includes(url.pathname)) {
+    event.respondWith(shell(event));
+  } else if (url.pathname === LATEST_URL && !url.search) {
+    event.respondWith(latest(request));
+  }
+});